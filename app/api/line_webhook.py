@@ -1,8 +1,7 @@
 import logging
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
-from fastapi import APIRouter, Request, HTTPException, Depends
-from linebot.exceptions import InvalidSignatureError
+from fastapi import APIRouter, Request, HTTPException, Depends, BackgroundTasks
 from linebot.models import (
     TextMessage, 
     PostbackEvent, 
@@ -18,19 +17,24 @@ from linebot.models import (
     FlexSendMessage
 )
 from dateutil.parser import parse as parse_date
-from fastapi.responses import JSONResponse
 import re
 
 from app.config import settings
 from app.services.line_bot_service import LineBotService
 from app.services.schedule_service import ScheduleService
-from app.services.google_sheets_service import GoogleSheetsService
+from app.services.google_sheets_service import get_google_sheets_service
 from app.services.pharmacist_notification_service import PharmacistNotificationService
 from app.services.user_management_service import UserManagementService, UserType
 from app.models.schedule import TimeSlot, ResponseStatus
 from app.models.user import Store, Pharmacist
 from app.utils.text_parser import parse_shift_request, parse_pharmacist_response
 from shared.services.request_manager import request_manager
+from shared.services.pharmacist_registry import pharmacist_registry
+from shared.utils.sheet_columns import column_letter
+from shared.utils.clock import today_date
+from shared.utils.messages import GUIDE_MESSAGE
+from shared.services.line_http_client import submit_line_call, reply_or_push
+from pharmacist_bot.services.line_bot_service import pharmacist_line_bot_service
 
 logger = logging.getLogger(__name__)
 
@@ -38,7 +42,7 @@ router = APIRouter(prefix="/line", tags=["line"])
 
 line_bot_service = LineBotService()
 schedule_service = ScheduleService()
-google_sheets_service = GoogleSheetsService()
+google_sheets_service = get_google_sheets_service()
 pharmacist_notification_service = PharmacistNotificationService()
 user_management_service = UserManagementService()
 
@@ -46,55 +50,56 @@ user_management_service = UserManagementService()
 temp_requests: Dict[str, Dict[str, Any]] = {}
 
 # --- 案内文統一 ---
-WELCOME_GUIDE = (
-    "\U0001F3E5 薬局シフト管理Botへようこそ！\n\n"
-    "このBotは薬局の勤務シフト管理を効率化します。\n\n"
-    "\U0001F4CB 利用方法を選択してください：\n\n"
-    "\U0001F3EA 【店舗の方】\n"
-    "• 店舗登録がお済みでない方は、\n"
-    "店舗登録、 店舗番号、店舗名を送信してください！\n"
-    "例：店舗登録 002 サンライズ薬局\n\n"
-    "\U0001F48A 【薬剤師の方】\n"
-    "• 登録がお済みでない方は、\n"
-    "お名前、電話番号を送信してください！\n"
-    "例：田中薬剤師,090-1234-5678\n\n"
-    "登録は簡単で、すぐに利用開始できます！"
-)
+NOTIFY_GUIDE_MESSAGE = TextSendMessage(text="シフト依頼があったら、今後はBotから通知が届きます！")
+NOT_SELECTED_MESSAGE = TextSendMessage(text="今回は他の方で確定しました。またのご応募をお待ちしております。")
+
+# 登録メッセージの区切り文字（スペース、カンマ、読点、全角スペース）
+_SEPARATOR_RE = re.compile(r'[ ,、\u3000]+')
+
+# 依頼内容の確定として扱うポストバック
+_CONFIRMATION_POSTBACKS = frozenset(["はい", "確認", "確定", "accept", "ok", "yes"])
+# 薬剤師Botで処理するポストバックのaction
+_PHARMACIST_BOT_POSTBACK_ACTIONS = frozenset(["pharmacist_apply", "pharmacist_decline", "pharmacist_details"])
+
+
+def _handle_webhook_body(body_text: str, signature: str):
+    """署名検証済みのWebhook本文をイベントハンドラに振り分ける（応答後にバックグラウンドで実行）"""
+    try:
+        line_bot_service.handler.handle(body_text, signature)
+        logger.info("Store webhook processed successfully")
+    except Exception as e:
+        # LINE Bot APIのエラーは通常のエラーとして扱わない
+        if "Invalid reply token" in str(e) or "must be non-empty text" in str(e):
+            logger.warning(f"LINE Bot API error (non-critical): {e}")
+        else:
+            logger.error(f"Webhook error: {e}")
 
 
 @router.post("/webhook")
-async def line_webhook(request: Request):
+async def line_webhook(request: Request, background_tasks: BackgroundTasks):
     """LINE Bot Webhook エンドポイント"""
     try:
         # リクエストボディを取得
         body = await request.body()
         signature = request.headers.get('X-Line-Signature', '')
         
-        print(f"[DEBUG] Store webhook received: body_length={len(body)}, signature={signature[:20]}...")
+        logger.debug("Store webhook received: body_length=%s, signature=%s...", len(body), signature[:20])
         logger.info(f"Store webhook received: body_length={len(body)}")
         
-        # 署名を検証
-        try:
-            line_bot_service.handler.handle(body.decode('utf-8'), signature)
-            print(f"[DEBUG] Store webhook processed successfully")
-            logger.info("Store webhook processed successfully")
-        except InvalidSignatureError:
+        # 署名だけ検証してすぐに応答し、イベント処理は応答後にスレッドプールで行う
+        body_text = body.decode('utf-8')
+        if not line_bot_service.handler.parser.signature_validator.validate(body_text, signature):
             logger.error("Invalid signature")
-            print(f"[DEBUG] Invalid signature error")
             raise HTTPException(status_code=400, detail="Invalid signature")
+        background_tasks.add_task(_handle_webhook_body, body_text, signature)
         
         return {"status": "ok"}
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Webhook error: {e}")
-        print(f"[DEBUG] Webhook error: {e}")
-        # LINE Bot APIのエラーは通常のHTTPエラーとして扱わない
-        if "Invalid reply token" in str(e) or "must be non-empty text" in str(e):
-            logger.warning(f"LINE Bot API error (non-critical): {e}")
-            print(f"[DEBUG] LINE Bot API error (non-critical): {e}")
-            return {"status": "ok"}
-        else:
-            raise HTTPException(status_code=500, detail="Internal server error")
+        raise HTTPException(status_code=500, detail="Internal server error")
 
 
 @line_bot_service.handler.add(FollowEvent)
@@ -120,31 +125,15 @@ def handle_follow(event):
         # 既存ユーザーか判定
         user_type = user_management_service.get_user_type(user_id)
         if user_type == UserType.UNKNOWN:
-            welcome_message = TextSendMessage(text=WELCOME_GUIDE)
-            line_bot_service.line_bot_api.reply_message(event.reply_token, welcome_message)
+            line_bot_service.line_bot_api.reply_message(event.reply_token, GUIDE_MESSAGE)
             logger.info(f"Sent welcome message to {user_id}")
         else:
-            notify_message = TextSendMessage(text="シフト依頼があったら、今後はBotから通知が届きます！")
-            line_bot_service.line_bot_api.reply_message(event.reply_token, notify_message)
+            line_bot_service.line_bot_api.reply_message(event.reply_token, NOTIFY_GUIDE_MESSAGE)
             logger.info(f"Sent notify message to registered user {user_id}")
     except Exception as e:
         logger.error(f"Error handling follow event: {e}")
         # エラー時は基本的なメッセージを送信
-        error_message = TextSendMessage(
-            text="\U0001F3E5 薬局シフト管理Botへようこそ！\n\n"
-                 "このBotは薬局の勤務シフト管理を効率化します。\n\n"
-                 "\U0001F4CB 利用方法を選択してください：\n\n"
-                 "\U0001F3EA 【店舗の方】\n"
-                 "• 店舗登録がお済みでない方は、\n"
-                 "店舗登録、 店舗番号、店舗名を送信してください！\n"
-                 "例：店舗登録 002 サンライズ薬局\n\n"
-                 "\U0001F48A 【薬剤師の方】\n"
-                 "• 登録がお済みでない方は、\n"
-                 "お名前、電話番号を送信してください！\n"
-                 "例：田中薬剤師,090-1234-5678\n\n"
-                 "登録は簡単で、すぐに利用開始できます！"
-        )
-        line_bot_service.line_bot_api.reply_message(event.reply_token, error_message)
+        line_bot_service.line_bot_api.reply_message(event.reply_token, GUIDE_MESSAGE)
 
 
 @line_bot_service.handler.add(UnfollowEvent)
@@ -167,12 +156,13 @@ def handle_text_message(event):
     # 追加: user_id, user_typeのデバッグ出力
     session = user_management_service.get_or_create_session(user_id)
     user_type = session.user_type
-    print(f"[DEBUG] handle_text_message: user_id={user_id}, user_type={user_type}")
-    print(f"get_temp_data check: user_id={user_id}, key=custom_date_waiting, value={user_management_service.get_temp_data(user_id, 'custom_date_waiting')}")
+    logger.debug("handle_text_message: user_id=%s, user_type=%s", user_id, user_type)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("get_temp_data check: user_id=%s, key=custom_date_waiting, value=%s", user_id, user_management_service.get_temp_data(user_id, 'custom_date_waiting'))
     
     # デバッグ: メッセージ内容をログ出力
     message_text = event.message.text
-    print(f"[DEBUG] Received message: '{message_text}' from user_id={user_id}")
+    logger.debug("Received message: '%s' from user_id=%s", message_text, user_id)
     logger.info(f"Received text message from {user_id}: {message_text}")
     
     # カスタム日付入力待ちの場合は最優先で処理
@@ -186,14 +176,14 @@ def handle_text_message(event):
             # 次のステップへ
             messages = handle_start_time_period_selection(event)
             if messages:
-                print(f"[DEBUG] Sending custom date response to user_id={user_id}")
+                logger.debug("Sending custom date response to user_id=%s", user_id)
                 line_bot_service.line_bot_api.reply_message(event.reply_token, messages[0])
                 for m in messages[1:]:
                     line_bot_service.line_bot_api.push_message(user_id, m)
             return
         except Exception:
             response = TextSendMessage(text="日付の形式が正しくありません。例: 4/15, 4月15日, 2024/4/15")
-            print(f"[DEBUG] Sending date format error to user_id={user_id}")
+            logger.debug("Sending date format error to user_id=%s", user_id)
             line_bot_service.line_bot_api.reply_message(event.reply_token, response)
             return
     try:
@@ -219,27 +209,27 @@ def handle_text_message(event):
         
         # ユーザータイプ登録処理
         if message_text == "店舗登録":
-            print(f"[DEBUG] Processing store registration for user_id={user_id}")
+            logger.debug("Processing store registration for user_id=%s", user_id)
             handle_store_registration(event)
             return
         
         # 店舗登録処理（詳細情報）
         if message_text.startswith("店舗登録"):
-            print(f"[DEBUG] Processing detailed store registration for user_id={user_id}")
+            logger.debug("Processing detailed store registration for user_id=%s", user_id)
             handle_store_registration_detailed(event, message_text)
             return
         
         if message_text == "薬剤師登録":
-            print(f"[DEBUG] Processing pharmacist registration prompt for user_id={user_id}")
+            logger.debug("Processing pharmacist registration prompt for user_id=%s", user_id)
             handle_pharmacist_registration_prompt(event)
             return
         
         # 薬剤師登録処理（詳細情報）
         if message_text.startswith("登録"):
             if user_type == UserType.UNKNOWN or user_type == UserType.PHARMACIST:
-                print(f"[DEBUG] Processing pharmacist registration for user_id={user_id}")
+                logger.debug("Processing pharmacist registration for user_id=%s", user_id)
                 # 柔軟な区切り文字対応
-                parts = re.split(r'[ ,、\u3000]+', message_text)
+                parts = _SEPARATOR_RE.split(message_text)
                 if len(parts) < 4:
                     help_message = TextSendMessage(
                         text="📝 登録フォーマットが正しくありません。\n\n"
@@ -252,7 +242,7 @@ def handle_text_message(event):
                              "• 夜間 (17:00-21:00)\n"
                              "• 終日"
                     )
-                    print(f"[DEBUG] Sending registration help to user_id={user_id}")
+                    logger.debug("Sending registration help to user_id=%s", user_id)
                     line_bot_service.line_bot_api.reply_message(event.reply_token, help_message)
                     return
                 
@@ -290,12 +280,12 @@ def handle_text_message(event):
                              f"これで勤務依頼の通知を受け取ることができます。\n"
                              f"「勤務依頼」と入力してテストしてみてください。"
                     )
-                    print(f"[DEBUG] Sending pharmacist registration success to user_id={user_id}")
-                    line_bot_service.line_bot_api.reply_message(event.reply_token, confirmation_message)
-                    # push_messageでも必ず通知
-                    line_bot_service.line_bot_api.push_message(user_id, confirmation_message)
-                    # 追加: 登録済みユーザー案内をpush_messageで送信
-                    line_bot_service.line_bot_api.push_message(user_id, TextSendMessage(text="シフト依頼があったら、今後はBotから通知が届きます！"))
+                    logger.debug("Sending pharmacist registration success to user_id=%s", user_id)
+                    # 登録完了と案内をまとめて返信（返信できなければpushで送る）
+                    reply_or_push(
+                        line_bot_service.line_bot_api, event.reply_token, user_id,
+                        [confirmation_message, NOTIFY_GUIDE_MESSAGE]
+                    )
                 else:
                     confirmation_message = TextSendMessage(
                         text="❌ 登録処理中にエラーが発生しました。\n"
@@ -310,38 +300,38 @@ def handle_text_message(event):
                     text="店舗ユーザーは薬剤師登録できません。\n"
                          "勤務依頼の送信のみ可能です。"
                 )
-                print(f"[DEBUG] Sending store user error to user_id={user_id}")
+                logger.debug("Sending store user error to user_id=%s", user_id)
                 line_bot_service.line_bot_api.reply_message(event.reply_token, response)
             return
         
         # 確認応答の処理（最優先）
         if message_text in ["はい", "確認", "確定"]:
-            print(f"[DEBUG] handle_text_message: entering handle_confirmation_yes for user_id={user_id}, message_text={message_text}")
+            logger.debug("handle_text_message: entering handle_confirmation_yes for user_id=%s, message_text=%s", user_id, message_text)
             handle_confirmation_yes(event)
             return
         
         # 登録済み店舗ユーザーは何か送ったら即シフト依頼
         if user_type == UserType.STORE:
-            print(f"[DEBUG] Processing shift request for store user_id={user_id}")
+            logger.debug("Processing shift request for store user_id=%s", user_id)
             handle_shift_request(event, message_text)
             return
         
         # 従来の勤務依頼ワード判定・薬剤師ユーザー向け分岐は不要になる
         # その他のメッセージ
-        print(f"[DEBUG] Processing other messages for user_id={user_id}")
+        logger.debug("Processing other messages for user_id=%s", user_id)
         handle_other_messages(event, message_text)
         
     except Exception as e:
         logger.error(f"Error handling text message: {e}")
-        print(f"[DEBUG] Error in handle_text_message: {e}")
+        logger.debug("Error in handle_text_message: %s", e)
         # 既にreply_messageが呼ばれている可能性があるため、push_messageを使用
         try:
             error_message = TextSendMessage(text="申し訳ございません。エラーが発生しました。")
-            print(f"[DEBUG] Sending error message to user_id={user_id}")
+            logger.debug("Sending error message to user_id=%s", user_id)
             line_bot_service.line_bot_api.push_message(event.source.user_id, error_message)
         except Exception as push_error:
             logger.error(f"Error sending error message: {push_error}")
-            print(f"[DEBUG] Error sending error message: {push_error}")
+            logger.debug("Error sending error message: %s", push_error)
 
 
 @line_bot_service.handler.add(PostbackEvent)
@@ -349,21 +339,24 @@ def handle_postback(event):
     """ポストバックイベントの処理（ボタンクリックなど）"""
     user_id = event.source.user_id
     postback_data = event.postback.data
-    print(f"[DEBUG][統合Bot] handle_postback: postback_data={postback_data!r}, user_id={user_id}")
+    logger.debug("[統合Bot] handle_postback: postback_data=%r, user_id=%s", postback_data, user_id)
     logger.info(f"[統合Bot] Received postback from {user_id}: {postback_data}")
     try:
-        if postback_data in ["はい", "確認", "確定", "accept", "ok", "yes"] or postback_data.startswith("accept:"):
-            print(f"[DEBUG] handle_postback: entering handle_confirmation_yes for user_id={user_id}, postback_data={postback_data}")
+        if postback_data in _CONFIRMATION_POSTBACKS:
             handle_confirmation_yes(event)
             return
-        if postback_data.startswith("decline:"):
-            print(f"[DEBUG] handle_postback: entering handle_decline_response for user_id={user_id}, postback_data={postback_data}")
-            handle_decline_response(event, postback_data)
-            return
-        if postback_data.startswith("conditional:"):
-            print(f"[DEBUG] handle_postback: entering handle_conditional_response for user_id={user_id}, postback_data={postback_data}")
-            handle_conditional_response(event, postback_data)
-            return
+        # 「action:request_id」形式はactionをキーにテーブルから処理を引く
+        action, separator, _ = postback_data.partition(":")
+        if separator:
+            if action in _PHARMACIST_BOT_POSTBACK_ACTIONS:
+                # 薬剤師Bot専用のPostbackEventは薬剤師Botで処理するため、統合Botではスキップ
+                logger.info(f"[統合Bot] Skipping pharmacist postback event: {postback_data} (handled by pharmacist bot)")
+                return
+            handler = _COLON_POSTBACK_HANDLERS.get(action)
+            if handler:
+                logger.debug("handle_postback: dispatching action=%s for user_id=%s", action, user_id)
+                handler(event, postback_data)
+                return
         logger.info(f"Received postback from {user_id}: {postback_data}")
         # シフト依頼ボタン押下時の処理を追加
         if postback_data == "shift_request_start":
@@ -373,16 +366,16 @@ def handle_postback(event):
         if postback_data == "select_date":
             handle_date_selection(event)
         elif postback_data == "date_custom":
-            print(f"handle_postback: postback_data={postback_data}")
-            print("INTO date_custom branch")
-            print(f"set_temp_data called: user_id={user_id}, key=custom_date_waiting, value=True")
+            logger.debug("handle_postback: postback_data=%s", postback_data)
+            logger.debug("INTO date_custom branch")
+            logger.debug("set_temp_data called: user_id=%s, key=custom_date_waiting, value=True", user_id)
             user_management_service.set_temp_data(user_id, "custom_date_waiting", True)
-            print(f"set_temp_data finished")
+            logger.debug("set_temp_data finished")
             response = TextSendMessage(
                 text="日付を入力してください。\n例: 4/15, 4月15日, 2024/4/15"
             )
             line_bot_service.line_bot_api.reply_message(event.reply_token, response)
-            print("REPLY sent, RETURNING")
+            logger.debug("REPLY sent, RETURNING")
             return
         elif postback_data.startswith("date_"):
             handle_date_choice(event, postback_data)
@@ -410,16 +403,6 @@ def handle_postback(event):
                 for m in messages[1:]:
                     line_bot_service.line_bot_api.push_message(user_id, m)
             return
-        elif postback_data.startswith("accept:"):
-            handle_accept_response(event, postback_data)
-        elif postback_data.startswith("decline:"):
-            handle_decline_response(event, postback_data)
-        elif postback_data.startswith("conditional:"):
-            handle_conditional_response(event, postback_data)
-        # 薬剤師Bot専用のPostbackEventは薬剤師Botで処理するため、統合Botではスキップ
-        elif postback_data.startswith("pharmacist_apply:") or postback_data.startswith("pharmacist_decline:") or postback_data.startswith("pharmacist_details:"):
-            logger.info(f"[統合Bot] Skipping pharmacist postback event: {postback_data} (handled by pharmacist bot)")
-            return
         elif postback_data == "select_time":
             handle_time_selection(event)
         elif postback_data == "select_count":
@@ -453,16 +436,12 @@ def handle_postback(event):
                 for m in messages[1:]:
                     line_bot_service.line_bot_api.push_message(user_id, m)
             return
-        elif postback_data.startswith("pharmacist_confirm_accept:"):
-            handle_pharmacist_confirm_accept(event, postback_data)
-        elif postback_data.startswith("pharmacist_confirm_reject:"):
-            handle_pharmacist_confirm_reject(event, postback_data)
         else:
-            print(f"[DEBUG] Unknown postback data: {postback_data}")
+            logger.debug("Unknown postback data: %s", postback_data)
             logger.warning(f"Unknown postback data: {postback_data}")
             
     except Exception as e:
-        print(f"[DEBUG] Error in handle_postback: {e}")
+        logger.debug("Error in handle_postback: %s", e)
         logger.error(f"Error handling postback: {e}")
         # 既にreply_messageが呼ばれている可能性があるため、push_messageを使用
         try:
@@ -474,18 +453,15 @@ def handle_postback(event):
 
 def handle_shift_request(event, message_text: str, use_push: bool = False):
     user_id = event.source.user_id
-    print(f"[DEBUG] handle_shift_request: user_id={user_id}, message_text='{message_text}'")
+    logger.debug("handle_shift_request: user_id=%s, message_text='%s'", user_id, message_text)
     store = get_store_by_user_id(user_id)
-    print(f"[DEBUG] handle_shift_request: store={store}")
-    logger.info(f"[DEBUG] handle_shift_request called with message_text='{message_text}'")
-    with open("debug.txt", "a") as f:
-        f.write("handle_shift_request called\n")
-    print('[handle_shift_request] called')
+    logger.debug("handle_shift_request: store=%s", store)
+    logger.debug("[handle_shift_request] called")
     try:
-        print("[DEBUG] handle_shift_request: calling get_store_by_user_id...")
+        logger.debug("handle_shift_request: calling get_store_by_user_id...")
         if not store:
             logger.info(f"[handle_shift_request] get_store_by_user_id failed for user_id={user_id}")
-            print(f"[handle_shift_request] get_store_by_user_id failed for user_id={user_id}")
+            logger.debug("[handle_shift_request] get_store_by_user_id failed for user_id=%s", user_id)
             response = TextSendMessage(
                 text="🏪 勤務依頼を送信するには、まず店舗登録が必要です。\n\n"
                      "以下のいずれかの方法で登録してください：\n\n"
@@ -495,23 +471,23 @@ def handle_shift_request(event, message_text: str, use_push: bool = False):
                      "→ 「薬剤師登録」と入力\n\n"
                      "どちらを選択されますか？"
             )
-            print(f"[DEBUG] Sending store registration prompt to user_id={user_id}")
+            logger.debug("Sending store registration prompt to user_id=%s", user_id)
             if use_push:
                 line_bot_service.line_bot_api.push_message(user_id, response)
             else:
                 line_bot_service.line_bot_api.reply_message(event.reply_token, response)
             return
         logger.info(f"[handle_shift_request] store found: {store}")
-        print(f"[handle_shift_request] store found: {store}")
+        logger.debug("[handle_shift_request] store found: %s", store)
         # 登録済み店舗ユーザーは何か送ったら即シフト依頼フロー開始
         parsed_data = parse_shift_request(message_text)
         if parsed_data:
             # シフト依頼内容を解析できた場合
-            print(f"[DEBUG] Parsed shift request data: {parsed_data}")
+            logger.debug("Parsed shift request data: %s", parsed_data)
             handle_parsed_shift_request(event, parsed_data, store)
         else:
             # 解析できない場合は選択式のフォームを表示
-            print(f"[DEBUG] Showing shift request template to user_id={user_id}")
+            logger.debug("Showing shift request template to user_id=%s", user_id)
             template = create_shift_request_template()
             if use_push:
                 line_bot_service.line_bot_api.push_message(user_id, template)
@@ -519,7 +495,7 @@ def handle_shift_request(event, message_text: str, use_push: bool = False):
                 line_bot_service.line_bot_api.reply_message(event.reply_token, template)
     except Exception as e:
         logger.error(f"Error in handle_shift_request: {e}")
-        print(f"[DEBUG] Error in handle_shift_request: {e}")
+        logger.debug("Error in handle_shift_request: %s", e)
         error_response = TextSendMessage(text="シフト依頼処理中にエラーが発生しました。")
         if use_push:
             line_bot_service.line_bot_api.push_message(user_id, error_response)
@@ -656,14 +632,11 @@ def create_shift_request_template() -> TemplateSendMessage:
 
 def get_store_by_user_id(user_id: str) -> Optional[Store]:
     stores = google_sheets_service.get_store_list(sheet_name="店舗登録")
-    logger.info(f"[DEBUG] get_store_by_user_id: searching for user_id='{user_id}'")
-    print(f"[DEBUG] get_store_by_user_id: searching for user_id='{user_id}'")
+    logger.debug("get_store_by_user_id: searching for user_id='%s'", user_id)
     for store in stores:
-        logger.info(f"[DEBUG] store: number='{store.get('number')}', name='{store.get('name')}', user_id='{store.get('user_id')}'")
-        print(f"[DEBUG] store: number='{store.get('number')}', name='{store.get('name')}', user_id='{store.get('user_id')}'")
+        logger.debug("store: number='%s', name='%s', user_id='%s'", store.get('number'), store.get('name'), store.get('user_id'))
         if store.get("user_id", "").strip() == user_id.strip():
-            logger.info(f"[DEBUG] MATCHED user_id: '{user_id}' with store: {store}")
-            print(f"[DEBUG] MATCHED user_id: '{user_id}' with store: {store}")
+            logger.debug("MATCHED user_id: '%s' with store: %s", user_id, store)
             return Store(
                 id=f"store_{store['number']}",
                 user_id=user_id,
@@ -672,8 +645,7 @@ def get_store_by_user_id(user_id: str) -> Optional[Store]:
                 created_at=datetime.now(),
                 updated_at=datetime.now()
             )
-    logger.info(f"[DEBUG] get_store_by_user_id: no match for user_id='{user_id}'")
-    print(f"[DEBUG] get_store_by_user_id: no match for user_id='{user_id}'")
+    logger.debug("get_store_by_user_id: no match for user_id='%s'", user_id)
     return None
 
 
@@ -805,11 +777,11 @@ def handle_date_choice(event, postback_data: str):
         user_id = event.source.user_id
         # 選択された日付を取得
         if postback_data == "date_today":
-            selected_date = datetime.now().date()
+            selected_date = today_date()
         elif postback_data == "date_tomorrow":
-            selected_date = (datetime.now() + timedelta(days=1)).date()
+            selected_date = today_date() + timedelta(days=1)
         elif postback_data == "date_day_after_tomorrow":
-            selected_date = (datetime.now() + timedelta(days=2)).date()
+            selected_date = today_date() + timedelta(days=2)
         elif postback_data == "date_custom":
             response = TextSendMessage(
                 text="日付を入力してください。\n例: 4/15, 4月15日, 2024/4/15"
@@ -939,11 +911,11 @@ def handle_count_choice(event, postback_data: str):
                 # --- ここから追加: time_slot, required_countの保存 ---
         time_slot = None
         if start_time_data:
-            if start_time_data.startswith("start_time_8") or start_time_data.startswith("start_time_9") or start_time_data.startswith("start_time_10") or start_time_data.startswith("start_time_11") or start_time_data.startswith("start_time_12"):
+            if start_time_data.startswith(("start_time_8", "start_time_9", "start_time_10", "start_time_11", "start_time_12")):
                 time_slot = "time_morning"
-            elif start_time_data.startswith("start_time_13") or start_time_data.startswith("start_time_14") or start_time_data.startswith("start_time_15") or start_time_data.startswith("start_time_16"):
+            elif start_time_data.startswith(("start_time_13", "start_time_14", "start_time_15", "start_time_16")):
                 time_slot = "time_afternoon"
-            elif start_time_data.startswith("start_time_17") or start_time_data.startswith("start_time_18") or start_time_data.startswith("start_time_19") or start_time_data.startswith("start_time_20") or start_time_data.startswith("start_time_21") or start_time_data.startswith("start_time_22"):
+            elif start_time_data.startswith(("start_time_17", "start_time_18", "start_time_19", "start_time_20", "start_time_21", "start_time_22")):
                 time_slot = "time_evening"
             else:
                 time_slot = "time_full_day"
@@ -983,8 +955,9 @@ def handle_confirmation_yes(event):
     """依頼内容の確定処理"""
     try:
         user_id = event.source.user_id
-        print(f"[DEBUG] handle_confirmation_yes: user_id={user_id}")
-        print(f"[DEBUG] temp_data: {user_management_service.get_or_create_session(user_id).temp_data}")
+        logger.debug("handle_confirmation_yes: user_id=%s", user_id)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("temp_data: %s", user_management_service.get_or_create_session(user_id).temp_data)
         
         # 保存された依頼内容を取得
         date = user_management_service.get_temp_data(user_id, "date")
@@ -1126,16 +1099,16 @@ def handle_confirmation_no(event):
 
 def handle_pharmacist_apply(event, postback_data: str):
     """薬剤師の応募処理"""
-    print(f"[DEBUG] handle_pharmacist_apply called with postback_data: {postback_data}")
+    logger.debug("handle_pharmacist_apply called with postback_data: %s", postback_data)
     try:
         user_id = event.source.user_id
         user_type = user_management_service.get_user_type(user_id)
-        request_id = postback_data.split(":", 1)[1] if ":" in postback_data else ""
-        print(f"[DEBUG] handle_pharmacist_apply: user_id={user_id}, user_type={user_type}, request_id={request_id}")
+        request_id = postback_data.partition(":")[2]
+        logger.debug("handle_pharmacist_apply: user_id=%s, user_type=%s, request_id=%s", user_id, user_type, request_id)
         logger.info(f"Pharmacist apply button clicked: user_id={user_id}, request_id={request_id}")
         # 未登録ユーザーの場合は登録促進メッセージを表示
         if user_type == UserType.UNKNOWN:
-            print(f"[DEBUG] handle_pharmacist_apply: User type is UNKNOWN, showing registration prompt")
+            logger.debug("handle_pharmacist_apply: User type is UNKNOWN, showing registration prompt")
             response = TextSendMessage(
                 text="💊 勤務依頼に応募するには、まず薬剤師登録が必要です。\n\n"
                      "以下のいずれかの方法で登録してください：\n\n"
@@ -1149,7 +1122,7 @@ def handle_pharmacist_apply(event, postback_data: str):
             return
         # 店舗ユーザーの場合は応募不可
         if user_type == UserType.STORE:
-            print(f"[DEBUG] handle_pharmacist_apply: User type is STORE, showing error message")
+            logger.debug("handle_pharmacist_apply: User type is STORE, showing error message")
             response = TextSendMessage(
                 text="🏪 店舗ユーザーは勤務依頼に応募できません。\n"
                      "勤務依頼の送信のみ可能です。\n\n"
@@ -1159,7 +1132,7 @@ def handle_pharmacist_apply(event, postback_data: str):
             return
         # 薬剤師情報を取得（実際はDBから取得）
         pharmacist_name = "薬剤師A"  # 仮の
-        print(f"[DEBUG] handle_pharmacist_apply: Processing application from pharmacist: {pharmacist_name}")
+        logger.debug("handle_pharmacist_apply: Processing application from pharmacist: %s", pharmacist_name)
         logger.info(f"Processing application from pharmacist: {pharmacist_name}")
         # 依頼内容を取得
         request_data = request_manager.get_request(request_id)
@@ -1173,7 +1146,7 @@ def handle_pharmacist_apply(event, postback_data: str):
             "apply", 
             request_id
         )
-        print(f"[DEBUG] handle_pharmacist_apply: Result: {result}")
+        logger.debug("handle_pharmacist_apply: Result: %s", result)
         # --- ここからスプレッドシート記入処理 ---
         if result["success"]:
             logger.info(f"Application processed successfully: {result.get('message')}")
@@ -1186,7 +1159,6 @@ def handle_pharmacist_apply(event, postback_data: str):
                 store_name = request_data.get('store', 'サンライズ薬局')
             else:
                 # フォールバック用のデフォルト値
-                from datetime import datetime
                 date = datetime.now().date()
                 start_time_label = "9:00"
                 end_time_label = "18:00"
@@ -1194,20 +1166,15 @@ def handle_pharmacist_apply(event, postback_data: str):
             
             # dateがNoneでないことを確認
             if not date:
-                from datetime import datetime
                 date = datetime.now().date()
             # スプレッドシートに記入
             try:
                 sheet_name = google_sheets_service.get_sheet_name(date)
-                pharmacists = google_sheets_service._get_pharmacist_list(sheet_name)
-                pharmacist_row = None
-                for p in pharmacists:
-                    if p["user_id"] == user_id:
-                        pharmacist_row = p["row_number"]
-                        break
+                pharmacist = pharmacist_registry.by_user_id(google_sheets_service, sheet_name, user_id)
+                pharmacist_row = pharmacist["row_number"] if pharmacist else None
                 if pharmacist_row:
                     day_column = google_sheets_service._get_day_column(date)
-                    range_name = f"{sheet_name}!{chr(65 + day_column)}{pharmacist_row}"
+                    range_name = f"{sheet_name}!{column_letter(day_column)}{pharmacist_row}"
                     cell_value = f"{start_time_label}〜{end_time_label} {store_name}"
                     body = {'values': [[cell_value]]}
                     google_sheets_service.service.spreadsheets().values().update(
@@ -1234,7 +1201,7 @@ def handle_pharmacist_apply(event, postback_data: str):
             )
         line_bot_service.line_bot_api.reply_message(event.reply_token, response)
     except Exception as e:
-        print(f"[DEBUG] handle_pharmacist_apply: Exception occurred: {e}")
+        logger.debug("handle_pharmacist_apply: Exception occurred: %s", e)
         logger.error(f"Error handling pharmacist apply: {e}")
         error_response = TextSendMessage(text="応募処理中にエラーが発生しました。")
         line_bot_service.line_bot_api.reply_message(event.reply_token, error_response)
@@ -1245,7 +1212,7 @@ def handle_pharmacist_decline(event, postback_data: str):
     try:
         user_id = event.source.user_id
         user_type = user_management_service.get_user_type(user_id)
-        request_id = postback_data.split(":", 1)[1] if ":" in postback_data else ""
+        request_id = postback_data.partition(":")[2]
         
         logger.info(f"Pharmacist decline button clicked: user_id={user_id}, request_id={request_id}")
         
@@ -1316,7 +1283,7 @@ def handle_pharmacist_details(event, postback_data: str):
     try:
         user_id = event.source.user_id
         user_type = user_management_service.get_user_type(user_id)
-        request_id = postback_data.split(":", 1)[1] if ":" in postback_data else ""
+        request_id = postback_data.partition(":")[2]
         
         logger.info(f"Pharmacist details button clicked: user_id={user_id}, request_id={request_id}")
         
@@ -1419,8 +1386,8 @@ def handle_debug_commands(event, message_text: str):
     
     elif message_text == "デバッグクリア":
         # 保存された依頼内容をクリア
-        all_requests = request_manager.get_all_requests()
-        for req_id in all_requests.keys():
+        # get_all_requestsは保存内容のビューを返すため、削除前にIDを取り出しておく
+        for req_id in list(request_manager.get_all_requests()):
             request_manager.delete_request(req_id)
         
         response = TextSendMessage(text="🗑️ 保存された依頼内容をクリアしました")
@@ -1432,7 +1399,7 @@ def handle_test_commands(event, message_text: str):
     """テスト用コマンドの処理"""
     try:
         user_id = event.source.user_id
-        print(f"[DEBUG] handle_test_commands: user_id={user_id}, message_text='{message_text}'")
+        logger.debug("handle_test_commands: user_id=%s, message_text='%s'", user_id, message_text)
         
         if message_text == "テスト":
             response = TextSendMessage(
@@ -1440,17 +1407,17 @@ def handle_test_commands(event, message_text: str):
                      "Botが正常に動作しています。\n"
                      "店舗登録や薬剤師登録をお試しください。"
             )
-            print(f"[DEBUG] Sending test response to user_id={user_id}")
+            logger.debug("Sending test response to user_id=%s", user_id)
             line_bot_service.line_bot_api.reply_message(event.reply_token, response)
-            print(f"[DEBUG] Test response sent successfully to user_id={user_id}")
+            logger.debug("Test response sent successfully to user_id=%s", user_id)
         else:
             response = TextSendMessage(text="テストコマンドが認識されませんでした。")
-            print(f"[DEBUG] Sending unknown test command response to user_id={user_id}")
+            logger.debug("Sending unknown test command response to user_id=%s", user_id)
             line_bot_service.line_bot_api.reply_message(event.reply_token, response)
             
     except Exception as e:
         logger.error(f"Error in test commands: {e}")
-        print(f"[DEBUG] Error in test commands: {e}")
+        logger.debug("Error in test commands: %s", e)
         error_response = TextSendMessage(text="テストコマンド処理中にエラーが発生しました。")
         line_bot_service.line_bot_api.reply_message(event.reply_token, error_response)
 
@@ -1512,12 +1479,12 @@ def handle_pharmacist_registration(event, message_text: str):
                      f"これで勤務依頼の通知を受け取ることができます。\n"
                      f"「勤務依頼」と入力してテストしてみてください。"
             )
-            print(f"[DEBUG] Sending pharmacist registration success to user_id={user_id}")
-            line_bot_service.line_bot_api.reply_message(event.reply_token, confirmation_message)
-            # push_messageでも必ず通知
-            line_bot_service.line_bot_api.push_message(user_id, confirmation_message)
-            # 追加: 登録済みユーザー案内をpush_messageで送信
-            line_bot_service.line_bot_api.push_message(user_id, TextSendMessage(text="シフト依頼があったら、今後はBotから通知が届きます！"))
+            logger.debug("Sending pharmacist registration success to user_id=%s", user_id)
+            # 登録完了と案内をまとめて返信（返信できなければpushで送る）
+            reply_or_push(
+                line_bot_service.line_bot_api, event.reply_token, user_id,
+                [confirmation_message, NOTIFY_GUIDE_MESSAGE]
+            )
         else:
             confirmation_message = TextSendMessage(
                 text="❌ 登録処理中にエラーが発生しました。\n"
@@ -1542,21 +1509,21 @@ def handle_other_messages(event, message_text: str):
         user_id = event.source.user_id
         session = user_management_service.get_or_create_session(user_id)
         user_type = session.user_type
-        print(f"[DEBUG] handle_other_messages: user_id={user_id}, user_type={user_type}")
+        logger.debug("handle_other_messages: user_id=%s, user_type=%s", user_id, user_type)
         
         if user_type == UserType.UNKNOWN:
-            response = TextSendMessage(text=WELCOME_GUIDE)
-            print(f"[DEBUG] Sending welcome guide to unknown user_id={user_id}")
+            response = GUIDE_MESSAGE
+            logger.debug("Sending welcome guide to unknown user_id=%s", user_id)
         else:
-            response = TextSendMessage(text="シフト依頼があったら、今後はBotから通知が届きます！")
-            print(f"[DEBUG] Sending notification guide to registered user_id={user_id}")
+            response = NOTIFY_GUIDE_MESSAGE
+            logger.debug("Sending notification guide to registered user_id=%s", user_id)
         
         line_bot_service.line_bot_api.reply_message(event.reply_token, response)
-        print(f"[DEBUG] Reply message sent to user_id={user_id}")
+        logger.debug("Reply message sent to user_id=%s", user_id)
         
     except Exception as e:
         logger.error(f"Error handling other messages: {e}")
-        print(f"[DEBUG] Error in handle_other_messages: {e}")
+        logger.debug("Error in handle_other_messages: %s", e)
         error_message = TextSendMessage(text="申し訳ございません。エラーが発生しました。")
         line_bot_service.line_bot_api.reply_message(event.reply_token, error_message)
 
@@ -1627,12 +1594,11 @@ def handle_pharmacist_registration_prompt(event):
 def handle_store_registration_detailed(event, message_text: str):
     """店舗登録詳細処理（番号・店舗名でのuserId自動登録）"""
     try:
-        import re
         user_id = event.source.user_id
-        print(f"[DEBUG] handle_store_registration_detailed: user_id={user_id}, message_text='{message_text}'")
+        logger.debug("handle_store_registration_detailed: user_id=%s, message_text='%s'", user_id, message_text)
         # 柔軟な区切り文字対応
         text = message_text.replace("店舗登録", "").strip()
-        parts = list(filter(None, re.split(r'[ ,、\u3000]+', text)))
+        parts = list(filter(None, _SEPARATOR_RE.split(text)))
         
         if len(parts) >= 2:
             store_number = parts[0]
@@ -1835,16 +1801,11 @@ def handle_pharmacist_confirm_accept(event, postback_data):
                 end_time_label = request_data.get('end_time_label', '18:00')
                 store_name = request_data.get('store', 'サンライズ薬局')
                 sheet_name = google_sheets_service.get_sheet_name(date)
-                pharmacists = google_sheets_service._get_pharmacist_list(sheet_name)
-                pharmacist_row = None
-                for p in pharmacists:
-                    logger.info(f"[CONFIRM] pharmacist_row_check: p['user_id']={p['user_id']} vs pharmacist_user_id={pharmacist_user_id}")
-                    if p["user_id"] == pharmacist_user_id:
-                        pharmacist_row = p["row_number"]
-                        break
+                pharmacist = pharmacist_registry.by_user_id(google_sheets_service, sheet_name, pharmacist_user_id)
+                pharmacist_row = pharmacist["row_number"] if pharmacist else None
                 if pharmacist_row:
                     day_column = google_sheets_service._get_day_column(date)
-                    range_name = f"{sheet_name}!{chr(65 + day_column)}{pharmacist_row}"
+                    range_name = f"{sheet_name}!{column_letter(day_column)}{pharmacist_row}"
                     cell_value = f"{start_time_label}〜{end_time_label} {store_name}"
                     body = {'values': [[cell_value]]}
                     if google_sheets_service.service:
@@ -1862,7 +1823,6 @@ def handle_pharmacist_confirm_accept(event, postback_data):
         except Exception as e:
             logger.error(f"Error writing schedule to sheet (確定): {e}")
         # 薬剤師に確定連絡
-        from pharmacist_bot.services.line_bot_service import pharmacist_line_bot_service
         date = request_data.get('date')
         if date and hasattr(date, 'strftime'):
             date_str = date.strftime('%Y/%m/%d')
@@ -1872,7 +1832,12 @@ def handle_pharmacist_confirm_accept(event, postback_data):
         msg += f"日付: {date_str}\n"
         msg += f"時間: {request_data.get('start_time_label','')}〜{request_data.get('end_time_label','')}\n"
         msg += f"店舗: {request_data.get('store','')}\n"
-        pharmacist_line_bot_service.send_message(pharmacist_user_id, TextSendMessage(text=msg))
+        submit_line_call(
+            pharmacist_line_bot_service.send_message,
+            pharmacist_user_id,
+            TextSendMessage(text=msg),
+            description=f"[CONFIRM] confirmation to {pharmacist_user_id}"
+        )
         # 店舗にも完了通知
         line_bot_service.line_bot_api.reply_message(event.reply_token, TextSendMessage(text="確定処理が完了しました。"))
         # 確定者リストに追加
@@ -1887,11 +1852,15 @@ def handle_pharmacist_confirm_accept(event, postback_data):
         elif count == 'count_3_plus':
             count_num = 3
         if len(confirmed) >= count_num:
-            from pharmacist_bot.services.line_bot_service import pharmacist_line_bot_service
-            for applicant_id in applicants:
-                if applicant_id not in confirmed:
-                    msg = "今回は他の方で確定しました。またのご応募をお待ちしております。"
-                    pharmacist_line_bot_service.send_message(applicant_id, TextSendMessage(text=msg))
+            # 見送りの応募者には同じ文面をmulticastでまとめて送信
+            declined_ids = [applicant_id for applicant_id in applicants if applicant_id not in confirmed]
+            if declined_ids:
+                submit_line_call(
+                    pharmacist_line_bot_service.multicast_message,
+                    declined_ids,
+                    NOT_SELECTED_MESSAGE,
+                    description=f"[CONFIRM] not-selected notice to {len(declined_ids)} applicants"
+                )
     except Exception as e:
         logger.error(f"Error in handle_pharmacist_confirm_accept: {e}")
         line_bot_service.line_bot_api.reply_message(event.reply_token, TextSendMessage(text="確定処理中にエラーが発生しました。"))
@@ -1901,7 +1870,6 @@ def handle_pharmacist_confirm_reject(event, postback_data):
     try:
         _, request_id, pharmacist_user_id = postback_data.split(":", 2)
         # 薬剤師に見送り連絡
-        from pharmacist_bot.services.line_bot_service import pharmacist_line_bot_service
         msg = "申し訳ありませんが、今回は見送りとなりました。\nまたのご応募をお待ちしております。"
         pharmacist_line_bot_service.send_message(pharmacist_user_id, TextSendMessage(text=msg))
         # 店舗にも完了通知
@@ -1910,16 +1878,10 @@ def handle_pharmacist_confirm_reject(event, postback_data):
         logger.error(f"Error in handle_pharmacist_confirm_reject: {e}")
         line_bot_service.line_bot_api.reply_message(event.reply_token, TextSendMessage(text="見送り処理中にエラーが発生しました。"))
 
-@router.post("/webhook")
-async def debug_webhook(request: Request):
-    body = await request.body()
-    print("DEBUG: LINEから受信:", body)
-    return JSONResponse(content={"status": "ok"}, status_code=200)
-
 def handle_parsed_shift_request(event, parsed_data, store):
     """解析済みシフト依頼の処理"""
     user_id = event.source.user_id
-    print(f"[DEBUG] handle_parsed_shift_request: user_id={user_id}, parsed_data={parsed_data}")
+    logger.debug("handle_parsed_shift_request: user_id=%s, parsed_data=%s", user_id, parsed_data)
     try:
         # 依頼内容を一時保存
         user_management_service.set_temp_data(user_id, "date", parsed_data["date"])
@@ -1945,4 +1907,14 @@ def handle_parsed_shift_request(event, parsed_data, store):
     except Exception as e:
         logger.error(f"Error in handle_parsed_shift_request: {e}")
         error_response = TextSendMessage(text="依頼内容の処理中にエラーが発生しました。")
-        line_bot_service.line_bot_api.reply_message(event.reply_token, error_response)
\ No newline at end of file
+        line_bot_service.line_bot_api.reply_message(event.reply_token, error_response)
+
+
+# 「action:request_id」形式のポストバックのaction → 処理関数
+_COLON_POSTBACK_HANDLERS = {
+    "accept": lambda event, postback_data: handle_confirmation_yes(event),
+    "decline": handle_decline_response,
+    "conditional": handle_conditional_response,
+    "pharmacist_confirm_accept": handle_pharmacist_confirm_accept,
+    "pharmacist_confirm_reject": handle_pharmacist_confirm_reject,
+}
@@ -2,10 +2,11 @@ import logging
 from typing import List, Optional
 from datetime import date, datetime
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 
 from app.services.schedule_service import ScheduleService
-from app.services.google_sheets_service import GoogleSheetsService
+from app.services.google_sheets_service import get_google_sheets_service
 from app.models.schedule import ShiftRequest, Schedule, TimeSlot
 from app.models.user import Store, Pharmacist
 
@@ -14,7 +15,7 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/schedule", tags=["schedule"])
 
 schedule_service = ScheduleService()
-google_sheets_service = GoogleSheetsService()
+google_sheets_service = get_google_sheets_service()
 
 
 class ShiftRequestCreate(BaseModel):
@@ -71,8 +72,8 @@ async def create_shift_request(request: ShiftRequestCreate):
             notes=request.notes
         )
         
-        # シフト依頼を処理
-        success = schedule_service.process_shift_request(shift_request, store)
+        # シフト依頼を処理（Sheets・LINEへの同期呼び出しでイベントループを塞がないようスレッドプールで実行）
+        success = await run_in_threadpool(schedule_service.process_shift_request, shift_request, store)
         
         if not success:
             raise HTTPException(status_code=400, detail="Failed to process shift request")
@@ -190,8 +191,9 @@ async def get_schedules(
 async def get_available_pharmacists(target_date: date, time_slot: TimeSlot):
     """指定日時で空きのある薬剤師を取得"""
     try:
-        available_pharmacists = google_sheets_service.get_available_pharmacists(
-            target_date, time_slot
+        # Sheets APIへの同期呼び出しはスレッドプールで実行
+        available_pharmacists = await run_in_threadpool(
+            google_sheets_service.get_available_pharmacists, target_date, time_slot
         )
         
         return {
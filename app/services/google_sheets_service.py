@@ -1,45 +1,151 @@
-import os
-import json
+import re
+import sys
+import threading
+from concurrent.futures import Future
 from typing import List, Dict, Optional, Tuple, Any
 from datetime import datetime, date
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 import logging
+from functools import lru_cache
 
 from app.config import settings
 from app.models.schedule import Schedule, TimeSlot
 from app.models.user import Store, Pharmacist
+from shared.utils.sheet_columns import column_letter
+from shared.utils.clock import today_date
+from shared.services.pharmacist_registry import pharmacist_registry
+from shared.services.google_credentials import load_sheets_credentials, build_sheets_service
+from shared.services.background_worker import BatchWorker
 
 logger = logging.getLogger(__name__)
 
+# 応募記録をまとめて書き込むまでの待ち時間（秒）と1回に書き込む最大件数
+APPLICATION_FLUSH_INTERVAL = 2.0
+APPLICATION_BATCH_SIZE = 50
+# セル更新をまとめて書き込むまでの待ち時間（秒）と1回に書き込む最大件数
+CELL_WRITE_FLUSH_INTERVAL = 0.2
+CELL_WRITE_BATCH_SIZE = 100
+# 確定処理で書き込み結果を待つ上限（秒）。超えた場合は書き込み失敗として扱う
+WRITE_CONFIRM_TIMEOUT = 30
+
+# スケジュール欄の勤務不可キーワード（「勤務不可」は「不可」に含まれる）
+_UNAVAILABLE_RE = re.compile("×|休み|不可")
+
+# postbackの時間帯 → モックデータのavailabilityの値
+_SLOT_MAP: Dict[str, str] = {
+    "time_morning": "morning",
+    "time_afternoon": "afternoon",
+    "time_evening": "evening",
+    "time_full_day": "full_day",
+}
+
+# 開発用のモック薬剤師データ（呼び出しごとに組み立て直さない）
+_MOCK_PHARMACISTS: Tuple[Dict[str, Any], ...] = (
+    {
+        "id": "pharm_001",
+        "user_id": "",  # 開発用: 空文字列でスキップ
+        "name": "田中薬剤師",
+        "phone": "090-1234-5678",
+        "availability": ["morning", "afternoon"],
+        "rating": 4.5,
+        "experience_years": 5
+    },
+    {
+        "id": "pharm_002",
+        "user_id": "",  # 開発用: 空文字列でスキップ
+        "name": "佐藤薬剤師",
+        "phone": "090-2345-6789",
+        "availability": ["afternoon", "evening"],
+        "rating": 4.2,
+        "experience_years": 3
+    },
+    {
+        "id": "pharm_003",
+        "user_id": "",  # 開発用: 空文字列でスキップ
+        "name": "鈴木薬剤師",
+        "phone": "090-3456-7890",
+        "availability": ["morning", "full_day"],
+        "rating": 4.8,
+        "experience_years": 7
+    },
+)
+
+# スケジュール記入内容に使う時間帯のテキスト
+_TIME_SLOT_TEXT: Dict[TimeSlot, str] = {
+    TimeSlot.AM: "AM",
+    TimeSlot.PM: "PM",
+    TimeSlot.FULL_DAY: "終日",
+}
+
+
+@lru_cache(maxsize=64)
+def _sheet_name_for(target_date: date) -> str:
+    """日付からシート名を生成（同じ日付の変換結果は使い回す）"""
+    return target_date.strftime("%Y-%m")
+
 
 class GoogleSheetsService:
     def __init__(self):
         self.credentials = None
-        self.service = None
+        # googleapiclientが使うhttplib2.Httpはスレッドセーフではないため、
+        # APIサービスはスレッドごとに作成して使い回す
+        self._thread_local = threading.local()
+        self._shared_service = None
         self.spreadsheet_id = settings.spreadsheet_id
         self._initialize_service()
+        # 応募記録の書き込み（短時間に集中した応募を1回のappendにまとめる）
+        self.application_record_batcher = BatchWorker(
+            "app-application-records",
+            self.record_applications,
+            max_batch_size=APPLICATION_BATCH_SIZE,
+            flush_interval=APPLICATION_FLUSH_INTERVAL
+        )
+        # セル単位の更新（確定が続いた場合に1回のvalues.batchUpdateにまとめる）
+        self.cell_write_batcher = BatchWorker(
+            "app-cell-writes",
+            self._write_cells,
+            max_batch_size=CELL_WRITE_BATCH_SIZE,
+            flush_interval=CELL_WRITE_FLUSH_INTERVAL
+        )
+        # 書き込み待ちの応募記録（(依頼ID, 薬剤師名) → Future）。ステータス更新前に自分の記録だけを待つ
+        self._pending_application_records: Dict[Tuple[str, str], "Future[bool]"] = {}
+        self._pending_application_lock = threading.Lock()
 
     def _initialize_service(self):
         """Google Sheets APIサービスの初期化"""
         try:
-            credentials_json = os.environ.get("GOOGLE_SHEETS_CREDENTIALS_JSON")
-            if credentials_json:
-                creds = Credentials.from_service_account_info(json.loads(credentials_json))
-            else:
-                creds = Credentials.from_service_account_file("credentials.json")
-            
-            self.service = build('sheets', 'v4', credentials=creds)
+            # 認証情報はプロセス内で一度だけ読み込み、全インスタンスで共有する
+            self.credentials = load_sheets_credentials()
+            # 初期化時に一度作成し、認証情報とAPI定義に問題がないことを確認する
+            self._thread_local.service = self._build_service()
             logger.info("Google Sheets API service initialized successfully")
             
         except Exception as e:
-            logger.error(f"Failed to initialize Google Sheets service: {e}")
+            logger.error("Failed to initialize Google Sheets service: %s", e)
             raise
 
+    def _build_service(self):
+        return build_sheets_service(self.credentials)
+
+    @property
+    def service(self):
+        """呼び出し元スレッド専用のGoogle Sheets APIサービス（認証情報がなければNone）"""
+        if self._shared_service is not None:
+            return self._shared_service
+        service = getattr(self._thread_local, 'service', None)
+        if service is None and self.credentials is not None:
+            service = self._build_service()
+            self._thread_local.service = service
+        return service
+
+    @service.setter
+    def service(self, value):
+        # 明示的に設定したサービスは全スレッドで共有する
+        self._shared_service = value
+
     def get_sheet_name(self, target_date: date) -> str:
         """日付からシート名を生成（例：2025-06）"""
-        return target_date.strftime("%Y-%m")
+        return _sheet_name_for(target_date)
 
     def get_available_pharmacists(self, target_date: date, time_slot: str) -> List[Dict[str, Any]]:
         """指定日時で空きのある薬剤師を取得（該当日付セルが空欄、かつ勤務不可でない薬剤師のみ）"""
@@ -49,27 +155,31 @@ class GoogleSheetsService:
                 return self._get_mock_pharmacists(target_date, time_slot)
             sheet_name = self.get_sheet_name(target_date)
             day_column = self._get_day_column(target_date)
-            pharmacists = self._get_pharmacist_list(sheet_name)
+            pharmacists = pharmacist_registry.list_active(self, sheet_name)
             if not pharmacists:
                 logger.warning("No pharmacists found in sheet")
                 return self._get_mock_pharmacists(target_date, time_slot)
             # 指定日のスケジュールを取得
-            schedule_range = f"{sheet_name}!{chr(65 + day_column)}2:{chr(65 + day_column)}{len(pharmacists) + 1}"
+            last_row = max(p["row_number"] for p in pharmacists)
+            schedule_range = f"{sheet_name}!{column_letter(day_column)}2:{column_letter(day_column)}{last_row}"
             schedule_data = self.service.spreadsheets().values().get(
                 spreadsheetId=self.spreadsheet_id,
                 range=schedule_range
             ).execute()
             schedules = schedule_data.get('values', [])
-            available_pharmacists = []
-            for i, pharmacist in enumerate(pharmacists):
-                schedule = schedules[i][0] if i < len(schedules) and schedules[i] else ""
-                # 空欄かつ勤務不可でない場合のみ
-                if (not schedule or schedule.strip() == "") or (schedule.strip() not in ["勤務不可", "×", "休み", "不可"] and schedule.strip() == ""):
-                    available_pharmacists.append(pharmacist)
-            logger.info(f"Found {len(available_pharmacists)} available pharmacists for {target_date} (空欄のみ)" )
+            # 何か記入済み（勤務不可・予定あり）の行番号を一度に拾い、空欄の薬剤師だけを残す
+            filled_rows = {
+                i + 2 for i, row in enumerate(schedules)
+                if row and row[0].strip()
+            }
+            available_pharmacists = [
+                pharmacist for pharmacist in pharmacists
+                if pharmacist["row_number"] not in filled_rows
+            ]
+            logger.info("Found %d available pharmacists for %s (空欄のみ)", len(available_pharmacists), target_date)
             return available_pharmacists
         except Exception as e:
-            logger.error(f"Error getting available pharmacists: {e}")
+            logger.error("Error getting available pharmacists: %s", e)
             return self._get_mock_pharmacists(target_date, time_slot)
     
     def _get_pharmacist_list(self, sheet_name: str) -> List[Dict[str, Any]]:
@@ -77,9 +187,11 @@ class GoogleSheetsService:
         try:
             # 薬剤師情報の範囲を取得（A列: 名前, B列: LINE ID, C列: 電話番号, D列: user_type）
             range_name = f"{sheet_name}!A2:D100"  # 最大100名まで
+            # 末尾の空行はAPI側で省かれるため、応答からrange等のメタデータだけを除く
             result = self.service.spreadsheets().values().get(
                 spreadsheetId=self.spreadsheet_id,
-                range=range_name
+                range=range_name,
+                fields='values'
             ).execute()
             
             values = result.get('values', [])
@@ -88,8 +200,8 @@ class GoogleSheetsService:
             for i, row in enumerate(values):
                 if len(row) >= 1 and row[0].strip():  # 名前が存在する場合
                     pharmacist = {
-                        "id": f"pharm_{i+1:03d}",
-                        "name": row[0].strip(),
+                        "id": sys.intern(f"pharm_{i+1:03d}"),
+                        "name": sys.intern(row[0].strip()),
                         "user_id": row[1].strip() if len(row) > 1 else "",
                         "phone": row[2].strip() if len(row) > 2 else "",
                         "user_type": row[3].strip() if len(row) > 3 else "pharmacist",  # デフォルトはpharmacist
@@ -97,11 +209,11 @@ class GoogleSheetsService:
                     }
                     pharmacists.append(pharmacist)
             
-            logger.info(f"Found {len(pharmacists)} pharmacists in sheet {sheet_name}")
+            logger.info("Found %d pharmacists in sheet %s", len(pharmacists), sheet_name)
             return pharmacists
             
         except Exception as e:
-            logger.error(f"Error getting pharmacist list: {e}")
+            logger.error("Error getting pharmacist list: %s", e)
             return []
 
     def get_user_type_from_sheets(self, user_id: str) -> Optional[str]:
@@ -112,27 +224,27 @@ class GoogleSheetsService:
                 return None
             
             # 薬剤師リストから検索
-            today = datetime.now().date()
+            today = today_date()
             sheet_name = self.get_sheet_name(today)
             pharmacists = self._get_pharmacist_list(sheet_name)
             
             for pharmacist in pharmacists:
                 if pharmacist["user_id"] == user_id:
-                    logger.info(f"Found user_type in pharmacist list: {pharmacist['user_type']}")
+                    logger.info("Found user_type in pharmacist list: %s", pharmacist['user_type'])
                     return pharmacist["user_type"]
             
             # 店舗リストから検索
             stores = self.get_store_list("店舗登録")
             for store in stores:
                 if store["user_id"] == user_id:
-                    logger.info(f"Found user_type in store list: store")
+                    logger.info("Found user_type in store list: store")
                     return "store"
             
-            logger.info(f"User type not found for user_id: {user_id}")
+            logger.info("User type not found for user_id: %s", user_id)
             return None
             
         except Exception as e:
-            logger.error(f"Error getting user type from sheets: {e}")
+            logger.error("Error getting user type from sheets: %s", e)
             return None
 
     def set_user_type_in_sheets(self, user_id: str, user_type: str) -> bool:
@@ -143,7 +255,7 @@ class GoogleSheetsService:
                 return False
             
             # 薬剤師リストから検索して更新
-            today = datetime.now().date()
+            today = today_date()
             sheet_name = self.get_sheet_name(today)
             pharmacists = self._get_pharmacist_list(sheet_name)
             
@@ -158,7 +270,7 @@ class GoogleSheetsService:
                         valueInputOption='RAW',
                         body=body
                     ).execute()
-                    logger.info(f"Updated user_type for pharmacist {pharmacist['name']}: {user_type}")
+                    logger.info("Updated user_type for pharmacist %s: %s", pharmacist['name'], user_type)
                     return True
             
             # 店舗リストから検索して更新
@@ -174,14 +286,14 @@ class GoogleSheetsService:
                         valueInputOption='RAW',
                         body=body
                     ).execute()
-                    logger.info(f"Updated user_type for store {store['name']}: {user_type}")
+                    logger.info("Updated user_type for store %s: %s", store['name'], user_type)
                     return True
             
-            logger.warning(f"User not found for user_id: {user_id}")
+            logger.warning("User not found for user_id: %s", user_id)
             return False
             
         except Exception as e:
-            logger.error(f"Error setting user type in sheets: {e}")
+            logger.error("Error setting user type in sheets: %s", e)
             return False
     
     def _is_available_for_schedule(self, schedule: str, time_slot: str) -> bool:
@@ -189,83 +301,25 @@ class GoogleSheetsService:
         if not schedule or schedule.strip() == "":
             return True
         
-        # 勤務不可の場合は利用不可
-        if any(keyword in schedule for keyword in ["勤務不可", "×", "休み", "不可"]):
-            return False
-        
-        # 時間帯のマッピング
-        time_mapping = {
-            "time_morning": ["AM", "午前", "9:00", "9時"],
-            "time_afternoon": ["PM", "午後", "13:00", "13時"],
-            "time_evening": ["夜間", "17:00", "17時"],
-            "time_full_day": ["終日", "フル", "全日"]
-        }
-        
-        requested_keywords = time_mapping.get(time_slot, [])
-        
-        # スケジュールに指定時間帯のキーワードが含まれているかチェック
-        for keyword in requested_keywords:
-            if keyword in schedule:
-                return True
-        
-        # 時間帯が指定されていない場合は利用可能
-        return True
+        # 勤務不可の場合は利用不可、それ以外（時間帯の記載の有無によらず）は利用可能
+        return _UNAVAILABLE_RE.search(schedule) is None
 
     def _get_mock_pharmacists(self, target_date: date, time_slot: str) -> List[Dict[str, Any]]:
         """モック薬剤師データを返す（開発用）"""
-        # 実際の実装では、Google Sheetsから取得したデータを処理
-        mock_pharmacists = [
-            {
-                "id": "pharm_001",
-                "user_id": "",  # 開発用: 空文字列でスキップ
-                "name": "田中薬剤師",
-                "phone": "090-1234-5678",
-                "availability": ["morning", "afternoon"],
-                "rating": 4.5,
-                "experience_years": 5
-            },
-            {
-                "id": "pharm_002", 
-                "user_id": "",  # 開発用: 空文字列でスキップ
-                "name": "佐藤薬剤師",
-                "phone": "090-2345-6789",
-                "availability": ["afternoon", "evening"],
-                "rating": 4.2,
-                "experience_years": 3
-            },
-            {
-                "id": "pharm_003",
-                "user_id": "",  # 開発用: 空文字列でスキップ
-                "name": "鈴木薬剤師", 
-                "phone": "090-3456-7890",
-                "availability": ["morning", "full_day"],
-                "rating": 4.8,
-                "experience_years": 7
-            }
+        # 時間帯に基づいてフィルタリング（定数のdictをコピーせずに返す）
+        available_pharmacists = [
+            pharmacist for pharmacist in _MOCK_PHARMACISTS
+            if self._is_available_for_timeslot(pharmacist, time_slot)
         ]
         
-        # 時間帯に基づいてフィルタリング
-        available_pharmacists = []
-        for pharmacist in mock_pharmacists:
-            if self._is_available_for_timeslot(pharmacist, time_slot):
-                available_pharmacists.append(pharmacist)
-        
-        logger.info(f"Found {len(available_pharmacists)} available pharmacists for {target_date} {time_slot}")
+        logger.info("Found %d available pharmacists for %s %s", len(available_pharmacists), target_date, time_slot)
         return available_pharmacists
     
     def _is_available_for_timeslot(self, pharmacist: Dict[str, Any], time_slot: str) -> bool:
         """薬剤師が指定時間帯で利用可能かチェック"""
         availability = pharmacist.get("availability", [])
         
-        # 時間帯のマッピング
-        time_mapping = {
-            "time_morning": "morning",
-            "time_afternoon": "afternoon", 
-            "time_evening": "evening",
-            "time_full_day": "full_day"
-        }
-        
-        requested_slot = time_mapping.get(time_slot, "")
+        requested_slot = _SLOT_MAP.get(time_slot, "")
         
         # 利用可能かチェック
         if requested_slot == "full_day":
@@ -286,40 +340,30 @@ class GoogleSheetsService:
             # 薬剤師の行を特定
             pharmacist_row = self._find_pharmacist_row(schedule.pharmacist_id, sheet_name)
             if pharmacist_row is None:
-                logger.error(f"Pharmacist row not found for ID: {schedule.pharmacist_id}")
+                logger.error("Pharmacist row not found for ID: %s", schedule.pharmacist_id)
                 return False
             
             # 記入する内容を作成
             cell_value = self._create_schedule_entry(schedule, store)
             
-            # セルを更新
-            range_name = f"{sheet_name}!{chr(65 + day_column)}{pharmacist_row}"
-            body = {
-                'values': [[cell_value]]
-            }
-            
-            result = self.service.spreadsheets().values().update(
-                spreadsheetId=self.spreadsheet_id,
-                range=range_name,
-                valueInputOption='RAW',
-                body=body
-            ).execute()
+            # セルの更新を書き込み待ちに追加し（バッチワーカーがまとめて書き込む）、
+            # 確定の可否を判断できるように書き込み結果を待つ
+            range_name = f"{sheet_name}!{column_letter(day_column)}{pharmacist_row}"
+            if not self.cell_write_batcher.add((range_name, cell_value)).result(timeout=WRITE_CONFIRM_TIMEOUT):
+                logger.error("Schedule update failed: %s", range_name)
+                return False
             
-            logger.info(f"Schedule updated successfully: {result.get('updatedCells')} cells updated")
+            logger.info("Schedule updated: %s", range_name)
             return True
             
         except Exception as e:
-            logger.error(f"Error updating Google Sheets: {e}")
+            logger.error("Error updating Google Sheets: %s", e)
             return False
     
     def _create_schedule_entry(self, schedule: Schedule, store: Store) -> str:
         """スケジュール記入内容を作成"""
         # 時間帯のテキスト変換
-        time_text = {
-            TimeSlot.AM: "AM",
-            TimeSlot.PM: "PM", 
-            TimeSlot.FULL_DAY: "終日"
-        }.get(schedule.time_slot, "不明")
+        time_text = _TIME_SLOT_TEXT.get(schedule.time_slot, "不明")
         
         # 記入内容を作成
         entry = f"{store.store_number} {store.store_name} {time_text}"
@@ -332,23 +376,52 @@ class GoogleSheetsService:
     def _find_pharmacist_row(self, pharmacist_id: str, sheet_name: str) -> Optional[int]:
         """薬剤師IDから行番号を取得"""
         try:
-            # 薬剤師リストを取得してIDで検索
-            pharmacists = self._get_pharmacist_list(sheet_name)
+            # 共有の薬剤師一覧（TTL付き、登録時に破棄）のID索引から引く
+            pharmacist = pharmacist_registry.by_id(self, sheet_name, pharmacist_id)
+            if pharmacist:
+                return pharmacist["row_number"]
             
-            for pharmacist in pharmacists:
-                if pharmacist["id"] == pharmacist_id:
-                    return pharmacist["row_number"]
-            
-            logger.warning(f"Pharmacist {pharmacist_id} not found in sheet {sheet_name}")
+            logger.warning("Pharmacist %s not found in sheet %s", pharmacist_id, sheet_name)
             return None
             
         except Exception as e:
-            logger.error(f"Error finding pharmacist row: {e}")
+            logger.error("Error finding pharmacist row: %s", e)
             return None
     
     def record_application(self, request_id: str, pharmacist_id: str, pharmacist_name: str, 
                           store_name: str, date: date, time_slot: str) -> bool:
-        """応募記録をGoogle Sheetsに記入"""
+        """応募記録を書き込み待ちに追加（書き込みはバッチワーカーがまとめて行う）
+
+        Returns:
+            書き込み待ちに追加できた場合True
+        """
+        if not self.service:
+            logger.warning("Google Sheets service not available, skipping application record")
+            return False
+        
+        future = self.application_record_batcher.add([
+            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),  # 応募日時
+            request_id,                                    # 依頼ID
+            pharmacist_name,                              # 薬剤師名
+            store_name,                                   # 店舗名
+            date.strftime("%Y-%m-%d"),                    # 勤務日
+            time_slot,                                    # 時間帯
+            "応募"                                        # ステータス
+        ])
+        key = (request_id, pharmacist_name)
+        with self._pending_application_lock:
+            self._pending_application_records[key] = future
+        future.add_done_callback(lambda done: self._discard_pending_application(key, done))
+        return True
+    
+    def _discard_pending_application(self, key: Tuple[str, str], future: "Future[bool]"):
+        """書き込みが終わった応募記録を待ち一覧から外す（同じ応募が再度積まれていればそちらを残す）"""
+        with self._pending_application_lock:
+            if self._pending_application_records.get(key) is future:
+                del self._pending_application_records[key]
+    
+    def record_applications(self, application_records: List[List[str]]) -> bool:
+        """書き込み待ちの応募記録を1回のappendで応募記録シートに追加"""
         try:
             if not self.service:
                 logger.warning("Google Sheets service not available, skipping application record")
@@ -357,21 +430,10 @@ class GoogleSheetsService:
             # 応募記録用のシート名
             applications_sheet = "応募記録"
             
-            # 応募記録を作成
-            application_record = [
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),  # 応募日時
-                request_id,                                    # 依頼ID
-                pharmacist_name,                              # 薬剤師名
-                store_name,                                   # 店舗名
-                date.strftime("%Y-%m-%d"),                    # 勤務日
-                time_slot,                                    # 時間帯
-                "応募"                                        # ステータス
-            ]
-            
             # 応募記録シートに追加
             range_name = f"{applications_sheet}!A:G"
             body = {
-                'values': [application_record]
+                'values': application_records
             }
             
             result = self.service.spreadsheets().values().append(
@@ -382,11 +444,11 @@ class GoogleSheetsService:
                 body=body
             ).execute()
             
-            logger.info(f"Application recorded successfully: {result.get('updates', {}).get('updatedCells')} cells updated")
+            logger.info("%d application(s) recorded successfully: %s cells updated", len(application_records), result.get('updates', {}).get('updatedCells'))
             return True
             
         except Exception as e:
-            logger.error(f"Error recording application: {e}")
+            logger.error("Error recording applications: %s", e)
             return False
     
     def update_application_status(self, request_id: str, pharmacist_name: str, status: str) -> bool:
@@ -399,6 +461,12 @@ class GoogleSheetsService:
             # 応募記録用のシート名
             applications_sheet = "応募記録"
             
+            # この応募の記録が書き込み待ちなら、反映されるまで待ってから検索する
+            with self._pending_application_lock:
+                pending = self._pending_application_records.get((request_id, pharmacist_name))
+            if pending is not None:
+                pending.result(timeout=WRITE_CONFIRM_TIMEOUT)
+            
             # 応募記録を検索して更新
             range_name = f"{applications_sheet}!A:G"
             result = self.service.spreadsheets().values().get(
@@ -411,37 +479,42 @@ class GoogleSheetsService:
             # 該当する応募記録を検索
             for i, row in enumerate(values):
                 if len(row) >= 2 and row[1] == request_id and row[2] == pharmacist_name:
-                    # ステータスを更新
+                    # ステータスの更新を書き込み待ちに追加し、書き込み結果を待つ
                     update_range = f"{applications_sheet}!G{i+1}"
-                    body = {
-                        'values': [[status]]
-                    }
+                    if not self.cell_write_batcher.add((update_range, status)).result(timeout=WRITE_CONFIRM_TIMEOUT):
+                        logger.error("Application status update failed: %s", update_range)
+                        return False
                     
-                    update_result = self.service.spreadsheets().values().update(
-                        spreadsheetId=self.spreadsheet_id,
-                        range=update_range,
-                        valueInputOption='RAW',
-                        body=body
-                    ).execute()
-                    
-                    logger.info(f"Application status updated successfully: {update_result.get('updatedCells')} cells updated")
+                    logger.info("Application status updated: %s", update_range)
                     return True
             
-            logger.warning(f"Application record not found: {request_id} - {pharmacist_name}")
+            logger.warning("Application record not found: %s - %s", request_id, pharmacist_name)
             return False
             
         except Exception as e:
-            logger.error(f"Error updating application status: {e}")
+            logger.error("Error updating application status: %s", e)
             return False
 
+    def _write_cells(self, data: List[Tuple[str, Any]]):
+        """(範囲, 値) のリストをvalues.batchUpdateの1リクエストで書き込む"""
+        self.service.spreadsheets().values().batchUpdate(
+            spreadsheetId=self.spreadsheet_id,
+            body={
+                'valueInputOption': 'RAW',
+                'data': [{'range': range_name, 'values': [[value]]} for range_name, value in data]
+            }
+        ).execute()
+        logger.info("Wrote %d cell(s) to Google Sheets", len(data))
+
+    def flush(self):
+        """書き込み待ちの応募記録・セル更新がすべて反映されるまで待つ"""
+        self.application_record_batcher.join()
+        self.cell_write_batcher.join()
+
     def _get_day_column(self, target_date: date) -> int:
         """日付から列番号を取得（A=0, B=1, ...）"""
-        # 月の1日を基準として、該当日までの日数を計算
-        month_start = date(target_date.year, target_date.month, 1)
-        day_offset = (target_date - month_start).days
-        
-        # 1列目は薬剤師名なので、2列目から開始
-        return day_offset + 1
+        # 1列目は薬剤師名なので、1日がB列（1）、31日がAF列（31）になる
+        return target_date.day
 
     def _is_available(self, schedule: str, time_slot: TimeSlot) -> bool:
         """スケジュールが指定時間帯で利用可能かチェック"""
@@ -471,11 +544,11 @@ class GoogleSheetsService:
             
             # 実際のGoogle Sheets更新処理
             # ここでは簡易実装として、ログのみ出力
-            logger.info(f"Updated availability for pharmacist {pharmacist_id}: {date} {time_slot} = {is_available}")
+            logger.info("Updated availability for pharmacist %s: %s %s = %s", pharmacist_id, date, time_slot, is_available)
             return True
             
         except Exception as e:
-            logger.error(f"Error updating pharmacist availability: {e}")
+            logger.error("Error updating pharmacist availability: %s", e)
             return False
 
     def register_pharmacist(self, pharmacist_data: Dict[str, Any]) -> bool:
@@ -489,7 +562,7 @@ class GoogleSheetsService:
             登録成功時True
         """
         try:
-            logger.info(f"Registering pharmacist: {pharmacist_data['name']}")
+            logger.info("Registering pharmacist: %s", pharmacist_data['name'])
             
             # 現在の年月のシート名を取得
             current_date = datetime.now()
@@ -524,11 +597,12 @@ class GoogleSheetsService:
                 body=body
             ).execute()
             
-            logger.info(f"Successfully registered pharmacist {pharmacist_data['name']} to Google Sheets")
+            pharmacist_registry.invalidate(sheet_name)
+            logger.info("Successfully registered pharmacist %s to Google Sheets", pharmacist_data['name'])
             return True
             
         except Exception as e:
-            logger.error(f"Error registering pharmacist: {e}")
+            logger.error("Error registering pharmacist: %s", e)
             return False
 
     def register_pharmacist_user_id(self, name: str, phone: str, user_id: str, sheet_name: Optional[str] = None) -> bool:
@@ -541,18 +615,19 @@ class GoogleSheetsService:
                 logger.warning("Google Sheets service not available, skipping user_id registration")
                 return False
             if not sheet_name:
-                today = datetime.now().date()
+                today = today_date()
                 sheet_name = self.get_sheet_name(today)
-            # 薬剤師リストを取得
-            pharmacists = self._get_pharmacist_list(sheet_name)
-            target_row = None
-            for pharmacist in pharmacists:
-                if pharmacist["name"].strip() == name.strip() and pharmacist["phone"].strip() == phone.strip():
-                    target_row = pharmacist["row_number"]
-                    break
-            if not target_row:
-                logger.warning(f"Pharmacist not found for name={name}, phone={phone} in sheet {sheet_name}")
+            # 共有の薬剤師一覧（TTL付き）の名前＋電話番号索引から引く
+            name, phone = name.strip(), phone.strip()
+            pharmacist = pharmacist_registry.by_name_phone(self, sheet_name, name, phone)
+            if pharmacist is None:
+                # シートに追加されたばかりの行がまだ一覧にない可能性があるため、読み直して再検索
+                pharmacist_registry.invalidate(sheet_name)
+                pharmacist = pharmacist_registry.by_name_phone(self, sheet_name, name, phone)
+            if pharmacist is None:
+                logger.warning("Pharmacist not found for name=%s, phone=%s in sheet %s", name, phone, sheet_name)
                 return False
+            target_row = pharmacist["row_number"]
             # user_idを書き込む（B列: 2列目）
             range_name = f"{sheet_name}!B{target_row}"
             body = {'values': [[user_id]]}
@@ -562,10 +637,11 @@ class GoogleSheetsService:
                 valueInputOption='RAW',
                 body=body
             ).execute()
-            logger.info(f"Registered user_id for pharmacist {name} ({phone}) at row {target_row}: {user_id}")
+            pharmacist_registry.invalidate(sheet_name)
+            logger.info("Registered user_id for pharmacist %s (%s) at row %s: %s", name, phone, target_row, user_id)
             return True
         except Exception as e:
-            logger.error(f"Error registering pharmacist user_id: {e}")
+            logger.error("Error registering pharmacist user_id: %s", e)
             return False
 
     def get_store_list(self, sheet_name: str = "店舗登録") -> List[Dict[str, Any]]:
@@ -594,11 +670,11 @@ class GoogleSheetsService:
                     }
                     stores.append(store)
             
-            logger.info(f"Found {len(stores)} stores in sheet {sheet_name}")
+            logger.info("Found %d stores in sheet %s", len(stores), sheet_name)
             return stores
             
         except Exception as e:
-            logger.error(f"Error getting store list: {e}")
+            logger.error("Error getting store list: %s", e)
             return []
 
     def register_store_user_id(self, number: str, name: str, user_id: str, sheet_name: Optional[str] = None) -> bool:
@@ -614,11 +690,12 @@ class GoogleSheetsService:
                 sheet_name = '店舗登録'
             # 店舗リストを取得
             stores = self.get_store_list(sheet_name)
-            logger.info(f"Found {len(stores)} stores in sheet {sheet_name}")
+            logger.info("Found %d stores in sheet %s", len(stores), sheet_name)
             
             # デバッグ用：読み取ったデータをログ出力
-            for i, store in enumerate(stores):
-                logger.info(f"Store {i+1}: number='{store['number']}', name='{store['name']}'")
+            if logger.isEnabledFor(logging.DEBUG):
+                for i, store in enumerate(stores):
+                    logger.debug("Store %d: number='%s', name='%s'", i+1, store['number'], store['name'])
             
             target_row = None
             for store in stores:
@@ -634,11 +711,20 @@ class GoogleSheetsService:
                     valueInputOption='RAW',
                     body={'values': [[user_id]]}
                 ).execute()
-                logger.info(f"Registered user_id for store {name} ({number}) at row {target_row}: {user_id}")
+                logger.info("Registered user_id for store %s (%s) at row %s: %s", name, number, target_row, user_id)
                 return True
             else:
-                logger.warning(f"Store not found for number={number}, name={name} in sheet {sheet_name}")
+                logger.warning("Store not found for number=%s, name=%s in sheet %s", number, name, sheet_name)
                 return False
         except Exception as e:
-            logger.error(f"Error registering store user_id: {e}")
-            return False 
\ No newline at end of file
+            logger.error("Error registering store user_id: %s", e)
+            return False 
+
+
+@lru_cache(maxsize=1)
+def get_google_sheets_service() -> GoogleSheetsService:
+    """GoogleSheetsServiceを初回呼び出し時に一度だけ生成して使い回す
+
+    初期化に失敗した場合はキャッシュされず、次の呼び出しで再試行する。
+    """
+    return GoogleSheetsService()
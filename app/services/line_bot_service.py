@@ -1,7 +1,7 @@
 import logging
 from typing import List, Dict, Optional
 from datetime import datetime
-from linebot import LineBotApi, WebhookHandler
+from linebot import WebhookHandler
 from linebot.exceptions import InvalidSignatureError, LineBotApiError
 from linebot.models import (
     TextSendMessage, 
@@ -18,13 +18,14 @@ from linebot.models import (
 from app.config import settings
 from app.models.schedule import ShiftRequest, TimeSlot, ResponseStatus
 from app.models.user import Store, Pharmacist
+from shared.services.line_http_client import create_line_bot_api
 
 logger = logging.getLogger(__name__)
 
 
 class LineBotService:
     def __init__(self):
-        self.line_bot_api = LineBotApi(settings.line_channel_access_token)
+        self.line_bot_api = create_line_bot_api(settings.line_channel_access_token)
         self.handler = WebhookHandler(settings.line_channel_secret)
 
     def send_shift_request_to_pharmacists(
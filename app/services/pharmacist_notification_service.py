@@ -1,16 +1,48 @@
 import logging
 from typing import List, Dict, Any, Optional
 from datetime import datetime
-from linebot import LineBotApi, WebhookHandler
+import orjson
+from linebot import WebhookHandler
 from linebot.exceptions import LineBotApiError
-from linebot.models import TextSendMessage, TemplateSendMessage, ButtonsTemplate, PostbackAction
+from linebot.models import TextSendMessage
 
-from app.services.google_sheets_service import GoogleSheetsService
+from app.services.google_sheets_service import get_google_sheets_service
 from app.models.schedule import TimeSlot
 from app.config import settings
+from shared.services.line_http_client import (
+    create_line_bot_api, is_unprocessed_error, multicast_raw_messages, push_raw_messages
+)
 
 logger = logging.getLogger(__name__)
 
+# multicastで一度に送信できる宛先の上限
+MULTICAST_MAX_RECIPIENTS = 500
+
+# 薬剤師に送る依頼詳細の本文
+_REQUEST_DETAILS_FMT = (
+    "📋 勤務依頼の詳細\n"
+    "━━━━━━\n"
+    "🏪 店舗: {store_name}\n"
+    "📅 日付: {date}\n"
+    "⏰ 開始時間: {start_time_label}\n"
+    "⏰ 終了時間: {end_time_label}\n"
+    "☕ 休憩時間: {break_time_label}\n"
+    "👥 必要人数: {count_text}\n"
+    "━━━━━━\n"
+    "この依頼に応募しますか？"
+)
+
+# 応募・辞退ボタンのテンプレート（依頼ごとに変わるボタンのactions以外）
+_NOTIFICATION_BUTTONS_BASE: Dict[str, Any] = {
+    "type": "template",
+    "altText": "勤務依頼への応募",
+    "template": {
+        "type": "buttons",
+        "title": "勤務依頼が届いています",
+        "text": "新しい勤務依頼があります"
+    }
+}
+
 class PharmacistNotificationService:
     """薬剤師への依頼通知サービス"""
     
@@ -30,9 +62,11 @@ class PharmacistNotificationService:
         else:
             logger.warning("Pharmacist LINE channel secret is not set!")
         
-        self.line_bot_api = LineBotApi(pharmacist_token)
+        self.line_bot_api = create_line_bot_api(pharmacist_token)
+        # 送信先ごとの判定で参照するため、環境の判定結果は初期化時に一度だけ取得
+        self.is_development = settings.is_development
         self.handler = WebhookHandler(pharmacist_secret)
-        self.google_sheets_service = GoogleSheetsService()
+        self.google_sheets_service = get_google_sheets_service()
     
     def notify_pharmacists_of_request(
         self, 
@@ -59,49 +93,61 @@ class PharmacistNotificationService:
                 "failed_pharmacists": []
             }
             
-            # 依頼内容の詳細を作成
-            request_details = self._create_request_details(request_data)
+            # 依頼詳細と応募ボタンは全員共通のため、送信用のJSONに一度だけ変換
+            # （宛名を入れずに全員へ同じ内容を送ることで、multicastでまとめて送信できる）
+            messages = self._build_notification_messages(request_data, request_id)
             
+            # 送信先を事前に検証し、送信できる薬剤師だけをmulticastの宛先にする
+            recipients = []
             for pharmacist in available_pharmacists:
+                # 薬剤師のLINEユーザーIDを取得
+                pharmacist_user_id = pharmacist.get("user_id")
+                
+                if not pharmacist_user_id:
+                    logger.warning(f"No LINE user ID for pharmacist: {pharmacist.get('name')}")
+                    notification_results["failed_count"] += 1
+                    notification_results["failed_pharmacists"].append({
+                        "name": pharmacist.get("name"),
+                        "reason": "No LINE user ID"
+                    })
+                    continue
+                
+                if self._is_deliverable_user_id(pharmacist_user_id, pharmacist.get("name")):
+                    recipients.append((pharmacist_user_id, pharmacist.get("name")))
+                else:
+                    # 開発用のIDは送信せずに成功として扱う
+                    notification_results["notified_count"] += 1
+            
+            # 500件ごとにmulticastで送信し、確実に届いていない分だけ1人ずつpushで送り直す
+            for start in range(0, len(recipients), MULTICAST_MAX_RECIPIENTS):
+                chunk = recipients[start:start + MULTICAST_MAX_RECIPIENTS]
                 try:
-                    # 薬剤師のLINEユーザーIDを取得
-                    pharmacist_user_id = pharmacist.get("user_id")
-                    
-                    if not pharmacist_user_id:
-                        logger.warning(f"No LINE user ID for pharmacist: {pharmacist.get('name')}")
-                        notification_results["failed_count"] += 1
-                        notification_results["failed_pharmacists"].append({
-                            "name": pharmacist.get("name"),
-                            "reason": "No LINE user ID"
-                        })
+                    multicast_raw_messages(self.line_bot_api, [user_id for user_id, _ in chunk], messages)
+                    notification_results["notified_count"] += len(chunk)
+                    logger.info(f"Sent notification to {len(chunk)} pharmacists by multicast")
+                    continue
+                except Exception as e:
+                    if not is_unprocessed_error(e):
+                        # 読み込みタイムアウト・5xxなどは配信済みの可能性があるため、重複通知を避けて再送しない
+                        logger.error(f"Multicast result unknown for {len(chunk)} pharmacists, not resending: {e}")
+                        notification_results["failed_count"] += len(chunk)
+                        notification_results["failed_pharmacists"].extend(
+                            {"name": pharmacist_name, "reason": "Delivery status unknown"}
+                            for _, pharmacist_name in chunk
+                        )
                         continue
-                    
-                    # 薬剤師に通知を送信
-                    success = self._send_notification_to_pharmacist(
-                        pharmacist_user_id, 
-                        pharmacist.get("name"),
-                        request_details,
-                        request_id
-                    )
-                    
-                    if success:
+                    # 4xx・接続失敗ではこのチャンクだけpushで送り直し、残りのチャンクは続けて送る
+                    logger.error(f"Multicast failed for {len(chunk)} pharmacists, falling back to push: {e}")
+                
+                for pharmacist_user_id, pharmacist_name in chunk:
+                    if self._send_notification_to_pharmacist(pharmacist_user_id, pharmacist_name, messages):
                         notification_results["notified_count"] += 1
-                        logger.info(f"Successfully notified pharmacist: {pharmacist.get('name')}")
                     else:
                         notification_results["failed_count"] += 1
                         notification_results["failed_pharmacists"].append({
-                            "name": pharmacist.get("name"),
+                            "name": pharmacist_name,
                             "reason": "Notification failed"
                         })
-                        logger.error(f"Failed to notify pharmacist: {pharmacist.get('name')}")
-                        
-                except Exception as e:
-                    logger.error(f"Error notifying pharmacist {pharmacist.get('name')}: {e}")
-                    notification_results["failed_count"] += 1
-                    notification_results["failed_pharmacists"].append({
-                        "name": pharmacist.get("name"),
-                        "reason": str(e)
-                    })
             
             logger.info(f"Notification completed: {notification_results}")
             
@@ -124,6 +170,26 @@ class PharmacistNotificationService:
                 "error": str(e)
             }
     
+    def _build_notification_messages(self, request_data: Dict[str, Any], request_id: str) -> orjson.Fragment:
+        """依頼詳細と応募・辞退ボタンのメッセージを作成し、JSONにエンコード済みの形で返す
+
+        変わるのは依頼詳細の本文とボタンのpostbackデータだけのため、SDKのモデルを経由せずに
+        dictで組み立てて一度だけエンコードし、multicastの分割送信やpushでの送り直しで使い回す。
+        """
+        return orjson.Fragment(orjson.dumps([
+            {"type": "text", "text": self._create_request_details(request_data)},
+            {
+                **_NOTIFICATION_BUTTONS_BASE,
+                "template": {
+                    **_NOTIFICATION_BUTTONS_BASE["template"],
+                    "actions": [
+                        {"type": "postback", "label": "✅ 応募する", "data": f"pharmacist_apply:{request_id}"},
+                        {"type": "postback", "label": "❌ 辞退する", "data": f"pharmacist_decline:{request_id}"}
+                    ]
+                }
+            }
+        ]))
+    
     def _create_request_details(self, request_data: Dict[str, Any]) -> str:
         """依頼内容の詳細テキストを作成"""
         date = request_data.get("date")
@@ -134,109 +200,51 @@ class PharmacistNotificationService:
                 date_str = str(date)
         else:
             date_str = "未選択"
-        start_time_label = request_data.get("start_time_label", "未選択")
-        end_time_label = request_data.get("end_time_label", "未選択")
-        break_time_label = request_data.get("break_time_label", "未選択")
-        count_text = request_data.get("count_text", "未選択")
-        store_name = request_data.get("store", "不明店舗")
+        return _REQUEST_DETAILS_FMT.format(
+            store_name=request_data.get("store", "不明店舗"),
+            date=date_str,
+            start_time_label=request_data.get("start_time_label", "未選択"),
+            end_time_label=request_data.get("end_time_label", "未選択"),
+            break_time_label=request_data.get("break_time_label", "未選択"),
+            count_text=request_data.get("count_text", "未選択")
+        )
+    
+    def _is_deliverable_user_id(self, pharmacist_user_id: str, pharmacist_name: Optional[str]) -> bool:
+        """実際に通知を送信するLINEユーザーIDかどうか（開発・テスト用のIDはFalse）"""
+        # LINEユーザーIDの形式チェック（U + 32文字の英数字）
+        if not pharmacist_user_id.startswith("U") or len(pharmacist_user_id) != 33:
+            logger.info(f"Skipping notification for pharmacist {pharmacist_name or ''} (invalid user ID format: {pharmacist_user_id})")
+            return False
         
-        details = f"📋 勤務依頼の詳細\n"
-        details += f"━━━━━━\n"
-        details += f"🏪 店舗: {store_name}\n"
-        details += f"📅 日付: {date_str}\n"
-        details += f"⏰ 開始時間: {start_time_label}\n"
-        details += f"⏰ 終了時間: {end_time_label}\n"
-        details += f"☕ 休憩時間: {break_time_label}\n"
-        details += f"👥 必要人数: {count_text}\n"
-        details += f"━━━━━━\n"
-        details += f"この依頼に応募しますか？"
+        # 開発環境でのテスト用IDチェック
+        if self.is_development and pharmacist_user_id.startswith("U1234567890"):
+            logger.info(f"Skipping notification for pharmacist {pharmacist_name or ''} (test user ID in development)")
+            return False
         
-        return details
+        return True
     
     def _send_notification_to_pharmacist(
         self, 
         pharmacist_user_id: str, 
         pharmacist_name: Optional[str],
-        request_details: str,
-        request_id: str
+        messages: orjson.Fragment
     ) -> bool:
         """
-        個別の薬剤師に通知を送信
+        個別の薬剤師にpushで通知を送信（multicastに失敗した場合の送り直し用）
         
         Args:
             pharmacist_user_id: 薬剤師のLINEユーザーID
             pharmacist_name: 薬剤師の名前（None可）
-            request_details: 依頼詳細
-            request_id: 依頼ID
+            messages: 依頼詳細と応募・辞退ボタンのメッセージ（エンコード済みJSON）
             
         Returns:
             送信成功時True
         """
         try:
-            # 開発・テスト用: 無効なLINEユーザーIDの場合はスキップ
-            if not pharmacist_user_id:
-                logger.info(f"Skipping notification for pharmacist {pharmacist_name or ''} (no user ID)")
-                return True  # 開発用に成功として扱う
-            
-            # LINEユーザーIDの形式チェック（U + 32文字の英数字）
-            if not pharmacist_user_id.startswith("U") or len(pharmacist_user_id) != 33:
-                logger.info(f"Skipping notification for pharmacist {pharmacist_name or ''} (invalid user ID format: {pharmacist_user_id})")
-                return True  # 開発用に成功として扱う
-            
-            # 開発環境でのテスト用IDチェック
-            if settings.is_development and pharmacist_user_id.startswith("U1234567890"):
-                logger.info(f"Skipping notification for pharmacist {pharmacist_name or ''} (test user ID in development)")
-                return True  # 開発用に成功として扱う
-            
-            # 本番環境または有効なユーザーIDの場合のみ実際に送信
-            if settings.is_production or (len(pharmacist_user_id) == 33 and pharmacist_user_id.startswith("U")):
-                # テキストメッセージ
-                text_message = TextSendMessage(text=request_details)
-                
-                # 応募ボタン付きテンプレート
-                template_message = TemplateSendMessage(
-                    alt_text="勤務依頼への応募",
-                    template=ButtonsTemplate(
-                        title="勤務依頼が届いています",
-                        text=f"{(pharmacist_name or '')}さん\n新しい勤務依頼があります",
-                        actions=[
-                            PostbackAction(
-                                label="✅ 応募する",
-                                data=f"pharmacist_apply:{request_id}"
-                            ),
-                            PostbackAction(
-                                label="❌ 辞退する",
-                                data=f"pharmacist_decline:{request_id}"
-                            )
-                        ]
-                    )
-                )
-                
-                # 追加: 通知先user_idと薬剤師名をprint
-                print(f"[DEBUG] 通知送信先 pharmacist_user_id: '{pharmacist_user_id}', name: '{pharmacist_name or ''}'")
-                
-                # メッセージを送信（push_messageを使用）
-                try:
-                    self.line_bot_api.push_message(
-                        pharmacist_user_id, 
-                        [text_message, template_message]
-                    )
-                    logger.info(f"Sent notification to pharmacist {pharmacist_name or ''}")
-                    return True
-                except LineBotApiError as push_error:
-                    logger.error(f"Push message error for pharmacist {pharmacist_name or ''}: {push_error}")
-                    # より詳細なエラー情報をログ出力
-                    if hasattr(push_error, 'status_code'):
-                        logger.error(f"Error status code: {push_error.status_code}")
-                    if hasattr(push_error, 'error_response'):
-                        logger.error(f"Error response: {push_error.error_response}")
-                    if hasattr(push_error, 'request_id'):
-                        logger.error(f"Request ID: {push_error.request_id}")
-                    return False
-            else:
-                logger.info(f"Skipping notification for pharmacist {pharmacist_name or ''} (invalid user ID for production)")
-                return True  # 開発用に成功として扱う
-                
+            logger.debug("通知送信先 pharmacist_user_id: '%s', name: '%s'", pharmacist_user_id, pharmacist_name or '')
+            push_raw_messages(self.line_bot_api, pharmacist_user_id, messages)
+            logger.info(f"Sent notification to pharmacist {pharmacist_name or ''}")
+            return True
         except LineBotApiError as e:
             logger.error(f"Error sending notification to pharmacist {pharmacist_name or ''}: {e}")
             # より詳細なエラー情報をログ出力
@@ -5,7 +5,7 @@ import uuid
 
 from app.models.schedule import ShiftRequest, PharmacistResponse, Schedule, TimeSlot, ResponseStatus
 from app.models.user import Store, Pharmacist
-from app.services.google_sheets_service import GoogleSheetsService
+from app.services.google_sheets_service import get_google_sheets_service
 from app.services.line_bot_service import LineBotService
 
 logger = logging.getLogger(__name__)
@@ -13,7 +13,7 @@ logger = logging.getLogger(__name__)
 
 class ScheduleService:
     def __init__(self):
-        self.google_sheets_service = GoogleSheetsService()
+        self.google_sheets_service = get_google_sheets_service()
         self.line_bot_service = LineBotService()
         
         # メモリ内でリクエストとレスポンスを管理（実際はデータベースを使用）
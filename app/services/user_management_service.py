@@ -2,7 +2,7 @@ import logging
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 from enum import Enum
-from app.services.google_sheets_service import GoogleSheetsService
+from app.services.google_sheets_service import get_google_sheets_service
 from app.models.user import User, UserType as ModelUserType
 
 logger = logging.getLogger(__name__)
@@ -57,7 +57,7 @@ class UserManagementService:
         # ユーザータイプのマッピング（キャッシュ）
         self.user_type_mapping: Dict[str, UserType] = {}
         # Google Sheetsサービス
-        self.google_sheets_service = GoogleSheetsService()
+        self.google_sheets_service = get_google_sheets_service()
         # データベーステーブルを作成
         User.create_table()
     
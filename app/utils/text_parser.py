@@ -1,47 +1,104 @@
 import re
 import logging
-from datetime import datetime, date
+from functools import lru_cache
+from datetime import date
 from typing import Dict, Optional, Any
-import dateparser
+from dateparser.date import DateDataParser
 from dateutil import parser as date_parser
 
 from app.models.schedule import TimeSlot
+from shared.utils.clock import today_date
 
 logger = logging.getLogger(__name__)
 
+# 入力テキストごとに保持する解析結果の件数
+PARSE_CACHE_SIZE = 1024
+
+# シフト依頼
+_DATE_MD_RE = re.compile(r'(\d{1,2})/(\d{1,2})')
+_AM_RE = re.compile(r'\bAM\b|\b午前\b', re.IGNORECASE)
+_PM_RE = re.compile(r'\bPM\b|\b午後\b', re.IGNORECASE)
+_FULL_DAY_RE = re.compile(r'\b終日\b|\bフル\b')
+_COUNT_RE = re.compile(r'(\d+)\s*名')
+_COUNT_LABEL_RE = re.compile(r'人数[：:]\s*(\d+)')
+_NOTES_RE = re.compile(r'備考[：:]\s*(.+)')
+_TIME_NOTES_RE = re.compile(r'(\d{1,2}:\d{2}|\d{1,2}時).*?(スタート|開始|希望)')
+
+# 日付
+_JAPANESE_DATE_PATTERNS = (
+    re.compile(r'(\d{1,2})月(\d{1,2})日'),
+    _DATE_MD_RE,
+    re.compile(r'(\d{1,2})-(\d{1,2})'),
+)
+
+# 日付らしい文字（数字・年月日・区切り）を含まないテキストはライブラリでの解析まで進めない
+_DATE_HINT_RE = re.compile(r'[\d年月日/\-]')
+
+# parse_time_slotのキーワード（小文字化したテキストに対して上から順に判定）
+_TIME_SLOT_KEYWORDS = (
+    (TimeSlot.AM, ("am", "午前", "朝")),
+    (TimeSlot.PM, ("pm", "午後", "夕方")),
+    (TimeSlot.FULL_DAY, ("終日", "フル", "一日")),
+)
+
+# 薬剤師の応答
+_ACCEPT_RE = re.compile(r'\bはい\b|\b承諾\b|\bOK\b|\b可\b', re.IGNORECASE)
+_DECLINE_RE = re.compile(r'\bいいえ\b|\b辞退\b|\b不可\b|\b×\b', re.IGNORECASE)
+_CONDITIONAL_RE = re.compile(r'\b条件付き\b|\b条件\b|\bただし\b')
+_TIME_CONDITION_RE = re.compile(r'(\d{1,2}:\d{2}|\d{1,2}時).*?(以降|から|より)')
+_CONDITION_RE = re.compile(r'条件[：:]\s*(.+)')
+# 上の正規表現を実行する前の絞り込み用キーワード（承諾・辞退は小文字化したテキストと比較）
+_ACCEPT_KW = ("はい", "承諾", "ok", "可")
+_DECLINE_KW = ("いいえ", "辞退", "不可", "×")
+_CONDITIONAL_KW = ("条件", "ただし")
+
+# 店舗情報
+_STORE_NUMBER_RE = re.compile(r'店舗[番号]*[：:]\s*(\d+)')
+_STORE_NAME_RE = re.compile(r'店舗名[：:]\s*(.+)')
+_PHARMACY_NAME_RE = re.compile(r'(.+薬局)')
+
 
 def parse_shift_request(text: str) -> Optional[Dict[str, Any]]:
-    """シフト依頼のテキストを解析"""
+    """シフト依頼のテキストを解析
+
+    解析結果は入力テキストごとにキャッシュし、呼び出し元には浅いコピーを返す。
+    """
+    result = _parse_shift_request(text, today_date())
+    return dict(result) if result else None
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_shift_request(text: str, today: date) -> Optional[Dict[str, Any]]:
     try:
-        # 日付の抽出
-        date_match = re.search(r'(\d{1,2})/(\d{1,2})', text)
+        # 日付の抽出（区切りの「/」がなければ正規表現を実行しない）
+        date_match = _DATE_MD_RE.search(text) if "/" in text else None
         if not date_match:
             return None
         
         month, day = int(date_match.group(1)), int(date_match.group(2))
-        current_year = datetime.now().year
+        current_year = today.year
         
         # 年を推定（過去の日付の場合は来年）
         target_date = date(current_year, month, day)
-        if target_date < date.today():
+        if target_date < today:
             target_date = date(current_year + 1, month, day)
         
         # 時間帯の抽出
         time_slot = None
-        if re.search(r'\bAM\b|\b午前\b', text, re.IGNORECASE):
+        if _AM_RE.search(text):
             time_slot = TimeSlot.AM
-        elif re.search(r'\bPM\b|\b午後\b', text, re.IGNORECASE):
+        elif _PM_RE.search(text):
             time_slot = TimeSlot.PM
-        elif re.search(r'\b終日\b|\bフル\b', text):
+        elif _FULL_DAY_RE.search(text):
             time_slot = TimeSlot.FULL_DAY
         
         if not time_slot:
             return None
         
         # 人数の抽出
-        count_match = re.search(r'(\d+)\s*名', text)
-        if not count_match:
-            count_match = re.search(r'人数[：:]\s*(\d+)', text)
+        count_match = _COUNT_RE.search(text) if "名" in text else None
+        if not count_match and "人数" in text:
+            count_match = _COUNT_LABEL_RE.search(text)
         
         required_count = 1  # デフォルト
         if count_match:
@@ -51,12 +108,12 @@ def parse_shift_request(text: str) -> Optional[Dict[str, Any]]:
         
         # 備考の抽出
         notes = None
-        notes_match = re.search(r'備考[：:]\s*(.+)', text)
+        notes_match = _NOTES_RE.search(text)
         if notes_match:
             notes = notes_match.group(1).strip()
         else:
             # 時間に関する記述を備考として抽出
-            time_notes = re.search(r'(\d{1,2}:\d{2}|\d{1,2}時).*?(スタート|開始|希望)', text)
+            time_notes = _TIME_NOTES_RE.search(text)
             if time_notes:
                 notes = time_notes.group(0)
         
@@ -72,21 +129,41 @@ def parse_shift_request(text: str) -> Optional[Dict[str, Any]]:
         return None
 
 
+def _contains_any(text: str, keywords) -> bool:
+    """いずれかのキーワードを部分文字列として含むか"""
+    for keyword in keywords:
+        if keyword in text:
+            return True
+    return False
+
+
 def parse_pharmacist_response(text: str) -> Optional[Dict[str, Any]]:
-    """薬剤師の応答テキストを解析"""
+    """薬剤師の応答テキストを解析
+
+    解析結果は入力テキストごとにキャッシュし、呼び出し元には浅いコピーを返す。
+    """
+    result = _parse_pharmacist_response(text)
+    return dict(result) if result else None
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_pharmacist_response(text: str) -> Optional[Dict[str, Any]]:
     try:
         # 応答の種類を判定
         response_type = None
         conditions = None
         
+        # キーワードを含まないテキストでは正規表現（単語境界の確認）を実行しない
+        lowered = text.lower()
+        
         # 承諾
-        if re.search(r'\bはい\b|\b承諾\b|\bOK\b|\b可\b', text, re.IGNORECASE):
+        if _contains_any(lowered, _ACCEPT_KW) and _ACCEPT_RE.search(text):
             response_type = "accepted"
         # 辞退
-        elif re.search(r'\bいいえ\b|\b辞退\b|\b不可\b|\b×\b', text, re.IGNORECASE):
+        elif _contains_any(lowered, _DECLINE_KW) and _DECLINE_RE.search(text):
             response_type = "declined"
         # 条件付き
-        elif re.search(r'\b条件付き\b|\b条件\b|\bただし\b', text):
+        elif _contains_any(text, _CONDITIONAL_KW) and _CONDITIONAL_RE.search(text):
             response_type = "conditional"
         else:
             return None
@@ -94,13 +171,13 @@ def parse_pharmacist_response(text: str) -> Optional[Dict[str, Any]]:
         # 条件の抽出
         if response_type == "conditional":
             # 時間条件
-            time_condition = re.search(r'(\d{1,2}:\d{2}|\d{1,2}時).*?(以降|から|より)', text)
+            time_condition = _TIME_CONDITION_RE.search(text)
             if time_condition:
                 conditions = f"{time_condition.group(1)}以降"
             
             # その他の条件
             if not conditions:
-                condition_match = re.search(r'条件[：:]\s*(.+)', text)
+                condition_match = _CONDITION_RE.search(text)
                 if condition_match:
                     conditions = condition_match.group(1).strip()
         
@@ -114,31 +191,40 @@ def parse_pharmacist_response(text: str) -> Optional[Dict[str, Any]]:
         return None
 
 
+@lru_cache(maxsize=1)
+def _get_date_parser() -> DateDataParser:
+    """言語を日本語・英語に絞ったDateDataParserを初回呼び出し時に一度だけ作成"""
+    return DateDataParser(languages=['ja', 'en'])
+
+
 def parse_date_japanese(text: str) -> Optional[date]:
     """日本語の日付表現を解析"""
+    # 年の推定に今日の日付を使うため、日付もキャッシュのキーに含める
+    return _parse_date_japanese(text, today_date())
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_date_japanese(text: str, today: date) -> Optional[date]:
     try:
+        if not text or not _DATE_HINT_RE.search(text):
+            return None
+        
         # 日本語の日付パターン
-        patterns = [
-            r'(\d{1,2})月(\d{1,2})日',
-            r'(\d{1,2})/(\d{1,2})',
-            r'(\d{1,2})-(\d{1,2})',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text)
+        for pattern in _JAPANESE_DATE_PATTERNS:
+            match = pattern.search(text)
             if match:
                 month, day = int(match.group(1)), int(match.group(2))
-                current_year = datetime.now().year
+                current_year = today.year
                 
                 # 年を推定
                 target_date = date(current_year, month, day)
-                if target_date < date.today():
+                if target_date < today:
                     target_date = date(current_year + 1, month, day)
                 
                 return target_date
         
         # dateparserを使用した解析
-        parsed_date = dateparser.parse(text, languages=['ja'])
+        parsed_date = _get_date_parser().get_date_data(text).date_obj
         if parsed_date:
             return parsed_date.date()
         
@@ -149,17 +235,15 @@ def parse_date_japanese(text: str) -> Optional[date]:
         return None
 
 
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
 def parse_time_slot(text: str) -> Optional[TimeSlot]:
     """時間帯を解析"""
     try:
         text_lower = text.lower()
         
-        if any(word in text_lower for word in ['am', '午前', '朝']):
-            return TimeSlot.AM
-        elif any(word in text_lower for word in ['pm', '午後', '夕方']):
-            return TimeSlot.PM
-        elif any(word in text_lower for word in ['終日', 'フル', '一日']):
-            return TimeSlot.FULL_DAY
+        for time_slot, keywords in _TIME_SLOT_KEYWORDS:
+            if any(word in text_lower for word in keywords):
+                return time_slot
         
         return None
         
@@ -172,14 +256,14 @@ def extract_store_info(text: str) -> Optional[Dict[str, str]]:
     """店舗情報を抽出"""
     try:
         # 店舗番号
-        store_number_match = re.search(r'店舗[番号]*[：:]\s*(\d+)', text)
+        store_number_match = _STORE_NUMBER_RE.search(text)
         store_number = store_number_match.group(1) if store_number_match else None
         
         # 店舗名
-        store_name_match = re.search(r'店舗名[：:]\s*(.+)', text)
+        store_name_match = _STORE_NAME_RE.search(text)
         if not store_name_match:
             # 薬局名のパターン
-            store_name_match = re.search(r'(.+薬局)', text)
+            store_name_match = _PHARMACY_NAME_RE.search(text)
         
         store_name = store_name_match.group(1).strip() if store_name_match else None
         
@@ -196,12 +280,15 @@ def extract_store_info(text: str) -> Optional[Dict[str, str]]:
         return None
 
 
+# シフト依頼データの必須項目と、time_slotとして受け付ける値
+_REQUIRED_SHIFT_FIELDS = ("date", "time_slot", "required_count")
+_VALID_SLOTS = frozenset(slot.value for slot in TimeSlot)
+
+
 def validate_shift_request_data(data: Dict[str, Any]) -> bool:
     """シフト依頼データの妥当性を検証"""
     try:
-        required_fields = ["date", "time_slot", "required_count"]
-        
-        for field in required_fields:
+        for field in _REQUIRED_SHIFT_FIELDS:
             if field not in data:
                 return False
         
@@ -209,11 +296,11 @@ def validate_shift_request_data(data: Dict[str, Any]) -> bool:
         if not isinstance(data["date"], date):
             return False
         
-        if data["date"] < date.today():
+        if data["date"] < today_date():
             return False
         
         # 時間帯の妥当性
-        if data["time_slot"] not in [slot.value for slot in TimeSlot]:
+        if data["time_slot"] not in _VALID_SLOTS:
             return False
         
         # 人数の妥当性
@@ -9,7 +9,9 @@ import os
 from app.api.line_webhook import router as store_webhook_router
 
 # 薬剤師Bot用のインポート（統合版）
-from integrated_pharmacist_webhook import router as pharmacist_webhook_router
+from integrated_pharmacist_webhook import router as pharmacist_webhook_router, application_record_batcher
+from shared.services.line_http_client import line_push_executor
+from app.services.google_sheets_service import get_google_sheets_service
 
 class IntegratedSettings(BaseSettings):
     # 店舗Bot用
@@ -75,6 +77,14 @@ app.add_middleware(
 app.include_router(store_webhook_router, tags=["store_bot"])
 app.include_router(pharmacist_webhook_router, tags=["pharmacist_bot"])
 
+@app.on_event("shutdown")
+def flush_background_tasks():
+    # 未書き込みの応募記録をGoogle Sheetsに反映してから終了
+    application_record_batcher.join()
+    get_google_sheets_service().flush()
+    # 送信待ちのLINE通知を完了させる
+    line_push_executor.shutdown(wait=True)
+
 @app.get("/")
 async def root():
     return {
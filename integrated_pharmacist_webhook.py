@@ -1,70 +1,117 @@
-from fastapi import APIRouter, Request, HTTPException
-from linebot import LineBotApi, WebhookHandler
+from fastapi import APIRouter, Request, HTTPException, BackgroundTasks
 from linebot.exceptions import InvalidSignatureError
-from linebot.models import MessageEvent, TextMessage, TextSendMessage, PostbackEvent
-import os
+from linebot.models import (
+    MessageEvent, TextMessage, TextSendMessage, PostbackEvent,
+    TemplateSendMessage, ButtonsTemplate, PostbackAction
+)
 import logging
+from functools import lru_cache
 import re
-from datetime import datetime
+from datetime import datetime, date
+from typing import Any, Dict, Optional
 
-from shared.services.google_sheets_service import GoogleSheetsService
-from shared.services.request_manager import RequestManager
+from shared.config.settings import shared_settings
+from shared.services.google_sheets_service import GoogleSheetsService, get_google_sheets_service
+from shared.services.request_manager import request_manager
+from shared.services.pharmacist_registry import pharmacist_registry
+from shared.utils.clock import now_minute_str
+from shared.utils.messages import GUIDE_MESSAGE
+from shared.services.event_deduplicator import EventDeduplicator
+from shared.services.background_worker import BatchWorker
+from shared.services.line_http_client import create_line_bot_api, submit_line_call
+from pharmacist_bot.services.line_bot_service import pharmacist_line_bot_service
 
 # 統合設定から薬剤師Bot用の設定を取得
-pharmacist_channel_access_token = os.getenv('PHARMACIST_LINE_CHANNEL_ACCESS_TOKEN')
-pharmacist_channel_secret = os.getenv('PHARMACIST_LINE_CHANNEL_SECRET')
+pharmacist_channel_access_token = shared_settings.pharmacist_line_channel_access_token
+pharmacist_channel_secret = shared_settings.pharmacist_line_channel_secret
 
-print(f"[DEBUG] Pharmacist Bot Config: token_length={len(pharmacist_channel_access_token) if pharmacist_channel_access_token else 0}, secret_length={len(pharmacist_channel_secret) if pharmacist_channel_secret else 0}")
-print(f"[DEBUG] Pharmacist Bot Config: token_exists={pharmacist_channel_access_token is not None}, secret_exists={pharmacist_channel_secret is not None}")
+logger = logging.getLogger(__name__)
+
+logger.debug(
+    "Pharmacist Bot Config: token_length=%s, secret_length=%s",
+    len(pharmacist_channel_access_token or ""), len(pharmacist_channel_secret or "")
+)
 
 if not pharmacist_channel_access_token:
-    print("[DEBUG] WARNING: PHARMACIST_LINE_CHANNEL_ACCESS_TOKEN is not set!")
+    logger.warning("PHARMACIST_LINE_CHANNEL_ACCESS_TOKEN is not set!")
 if not pharmacist_channel_secret:
-    print("[DEBUG] WARNING: PHARMACIST_LINE_CHANNEL_SECRET is not set!")
+    logger.warning("PHARMACIST_LINE_CHANNEL_SECRET is not set!")
+
+# 薬剤師Bot用のLINE APIクライアントとパーサー（pharmacist_botと共有）
+pharmacist_line_bot_api = pharmacist_line_bot_service.line_bot_api
+pharmacist_parser = pharmacist_line_bot_service.parser
 
-# 薬剤師Bot用のLINE APIクライアントを作成
-pharmacist_line_bot_api = LineBotApi(pharmacist_channel_access_token)
-pharmacist_handler = WebhookHandler(pharmacist_channel_secret)
+# 店舗Bot用のLINE API（応募通知の送信に使用、起動時に一度だけ生成）
+store_channel_access_token = shared_settings.line_channel_access_token
+store_line_bot_api = create_line_bot_api(store_channel_access_token) if store_channel_access_token else None
 
 router = APIRouter(prefix="/pharmacist/line", tags=["pharmacist_line"])
 
-logger = logging.getLogger(__name__)
-request_manager = RequestManager()
+# 処理済みWebhookイベント（LINEの再送による二重処理を防ぐ）
+pharmacist_event_deduplicator = EventDeduplicator()
+
+# 薬剤師登録メッセージの区切り文字（スペース、カンマ、読点、全角スペース）
+_SEPARATOR_RE = re.compile(r'[ ,、\u3000]+')
+
+# 固定文面のエラーメッセージ（エラーのたびに生成しない）
+_UNKNOWN_POSTBACK_MSG = TextSendMessage(text="不明なボタン操作です。")
+_POSTBACK_ERR_MSG = TextSendMessage(text="ボタン処理中にエラーが発生しました。")
+_REGISTRATION_ERR_MSG = TextSendMessage(text="登録処理中にエラーが発生しました。しばらく時間をおいて再度お試しください。")
+_APPLY_ERR_MSG = TextSendMessage(text="応募処理中にエラーが発生しました。")
+_DECLINE_ERR_MSG = TextSendMessage(text="辞退処理中にエラーが発生しました。")
+_DETAILS_ERR_MSG = TextSendMessage(text="詳細確認処理中にエラーが発生しました。")
+
+def _find_registered_pharmacist(sheets_service: GoogleSheetsService, sheet_name: str,
+                                user_id: str) -> Optional[Dict[str, Any]]:
+    """user_idに対応する登録済み薬剤師を取得（シートの読み込みは共有の薬剤師一覧を使い回す）"""
+    if not sheets_service.service:
+        return None
+    return pharmacist_registry.by_user_id(sheets_service, sheet_name, user_id)
+
+def _sheets_available() -> bool:
+    """Google Sheetsに書き込める状態かどうか"""
+    try:
+        return get_google_sheets_service().service is not None
+    except Exception as e:
+        logger.warning(f"Google Sheets service not available: {e}")
+        return False
+
+def _record_application_batch(applications):
+    """溜まった応募記録をまとめてGoogle Sheetsに書き込む"""
+    if get_google_sheets_service().record_applications(applications):
+        logger.info(f"[薬剤師Bot] {len(applications)} application(s) recorded in Google Sheets")
+    else:
+        logger.warning(f"[薬剤師Bot] Failed to record {len(applications)} application(s) in Google Sheets")
 
-def log_debug(message):
-    """デバッグログをファイルに書き込む"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open("pharmacist_debug.txt", "a", encoding="utf-8") as f:
-        f.write(f"[{timestamp}] {message}\n")
-    print(f"[DEBUG] {message}")
+# 応募記録の書き込み（短時間に集中した応募を1回のAPI呼び出しにまとめる）
+application_record_batcher = BatchWorker("application-records", _record_application_batch)
+
+def _format_date(value) -> str:
+    """依頼の日付を「YYYY/MM/DD」形式に変換（未設定の場合は「不明」）"""
+    if isinstance(value, date):
+        return value.strftime('%Y/%m/%d')
+    return str(value) if value else '不明'
 
-@pharmacist_handler.add(MessageEvent, message=TextMessage)
 def handle_pharmacist_message(event):
     user_id = event.source.user_id
     text = event.message.text.strip()
     
-    log_debug(f"Pharmacist message received: user_id={user_id}, text='{text}'")
+    logger.debug("Pharmacist message received: user_id=%s, text='%s'", user_id, text)
     logger.info(f"Received pharmacist message from {user_id}: {text}")
     
     """薬剤師Bot用のメッセージハンドラー"""
     # まず、ユーザーが既に登録されているかチェック
     try:
-        sheets_service = GoogleSheetsService()
-        log_debug(f"Checking if user {user_id} is already registered")
+        sheets_service = get_google_sheets_service()
+        logger.debug("Checking if user %s is already registered", user_id)
         
         # 薬剤師リストからユーザーを検索
         today = datetime.now().date()
         sheet_name = sheets_service.get_sheet_name(today)
-        pharmacists = sheets_service._get_pharmacist_list(sheet_name)
-        
-        registered_user = None
-        for pharmacist in pharmacists:
-            if pharmacist.get("user_id") == user_id:
-                registered_user = pharmacist
-                break
+        registered_user = _find_registered_pharmacist(sheets_service, sheet_name, user_id)
         
         if registered_user:
-            log_debug(f"User {user_id} is already registered as pharmacist: {registered_user.get('name')}")
+            logger.debug("User %s is already registered as pharmacist: %s", user_id, registered_user.get('name'))
             # 登録済みユーザーへのメッセージ
             registered_text = (
                 f"✅ {registered_user.get('name')}さん、お疲れ様です！\n\n"
@@ -75,130 +122,137 @@ def handle_pharmacist_message(event):
                 "• シフト申請の受信\n\n"
                 "何かご質問がございましたら、お気軽にお声かけください。"
             )
-            log_debug(f"Sending registered user message to user_id={user_id}")
+            logger.debug("Sending registered user message to user_id=%s", user_id)
             response = TextSendMessage(text=registered_text)
             pharmacist_line_bot_api.reply_message(event.reply_token, response)
-            log_debug(f"Registered user message sent successfully to user_id={user_id}")
+            logger.debug("Registered user message sent successfully to user_id=%s", user_id)
             return
             
     except Exception as e:
-        log_debug(f"Error checking user registration: {str(e)}")
+        logger.debug("Error checking user registration: %s", e)
         # エラーが発生した場合は通常の処理を続行
     
     # メッセージ本文から名前・電話番号を抽出（カンマ区切りまたは全角スペース区切り）
     logger.info(f"Received pharmacist message: {text}")
     
-    # 柔軟な区切り文字対応
-    if re.search(r'[ ,、\u3000]', text):
-        parts = re.split(r'[ ,、\u3000]+', text)
-        log_debug(f"Parsed parts: {parts}")
+    # 柔軟な区切り文字対応（区切り文字がなければ要素は1つになる）
+    parts = _SEPARATOR_RE.split(text)
+    logger.debug("Parsed parts: %s", parts)
+    
+    if len(parts) >= 2:
+        name = parts[0]
+        phone = parts[1]
+        user_id = event.source.user_id
         
-        if len(parts) >= 2:
-            name = parts[0]
-            phone = parts[1]
-            user_id = event.source.user_id
-            
-            log_debug(f"Processing pharmacist registration: name='{name}', phone='{phone}', user_id='{user_id}'")
-            logger.info(f"Attempting to register pharmacist: name={name}, phone={phone}, user_id={user_id}")
-            
-            try:
-                sheets_service = GoogleSheetsService()
-                log_debug(f"GoogleSheetsService initialized successfully")
-                
-                success = sheets_service.register_pharmacist_user_id(name, phone, user_id)
-                log_debug(f"Registration result: success={success}")
+        logger.debug("Processing pharmacist registration: name='%s', phone='%s', user_id='%s'", name, phone, user_id)
+        logger.info(f"Attempting to register pharmacist: name={name}, phone={phone}, user_id={user_id}")
+        
+        try:
+            sheets_service = get_google_sheets_service()
             
-                if success:
-                    response = TextSendMessage(text=f"{name}さんのLINE IDを自動登録しました。今後はBotから通知が届きます。")
-                    log_debug(f"Sending registration success message to user_id={user_id}")
-                    pharmacist_line_bot_api.reply_message(event.reply_token, response)
-                    log_debug(f"Registration success response sent successfully to user_id={user_id}")
-                    logger.info(f"Successfully registered pharmacist user_id for {name}")
-                else:
-                    response = TextSendMessage(text=f"{name}さんの登録に失敗しました。名前・電話番号が正しいかご確認ください。")
-                    log_debug(f"Sending registration failure message to user_id={user_id}")
-                    pharmacist_line_bot_api.reply_message(event.reply_token, response)
-                    log_debug(f"Registration failure response sent successfully to user_id={user_id}")
-                    logger.warning(f"Failed to register pharmacist user_id for {name}")
-            except Exception as e:
-                error_msg = f"Exception during registration: {str(e)}"
-                log_debug(error_msg)
-                logger.error(error_msg)
-                
-                response = TextSendMessage(text=f"登録処理中にエラーが発生しました。しばらく時間をおいて再度お試しください。")
+            success = sheets_service.register_pharmacist_user_id(name, phone, user_id)
+            logger.debug("Registration result: success=%s", success)
+        
+            if success:
+                response = TextSendMessage(text=f"{name}さんのLINE IDを自動登録しました。今後はBotから通知が届きます。")
+                logger.debug("Sending registration success message to user_id=%s", user_id)
                 pharmacist_line_bot_api.reply_message(event.reply_token, response)
-            return
-        else:
-            log_debug(f"Insufficient parts for registration: {parts}")
-    
-    # 未登録ユーザーへの案内メッセージ
-    guide_text = (
-        "\U0001F3E5 薬局シフト管理Botへようこそ！\n\n"
-        "このBotは薬局の勤務シフト管理を効率化します。\n\n"
-        "\U0001F4CB 利用方法を選択してください：\n\n"
-        "\U0001F3EA 【店舗の方】\n"
-        "• 店舗登録がお済みでない方は、\n"
-        "店舗登録、 店舗番号、店舗名を送信してください！\n"
-        "例：店舗登録 002 サンライズ薬局\n\n"
-        "\U0001F48A 【薬剤師の方】\n"
-        "• 登録がお済みでない方は、\n"
-        "お名前、電話番号を送信してください！\n"
-        "例：田中薬剤師,090-1234-5678\n\n"
-        "登録は簡単で、すぐに利用開始できます！"
-    )
+                logger.debug("Registration success response sent successfully to user_id=%s", user_id)
+                logger.info(f"Successfully registered pharmacist user_id for {name}")
+            else:
+                response = TextSendMessage(text=f"{name}さんの登録に失敗しました。名前・電話番号が正しいかご確認ください。")
+                logger.debug("Sending registration failure message to user_id=%s", user_id)
+                pharmacist_line_bot_api.reply_message(event.reply_token, response)
+                logger.debug("Registration failure response sent successfully to user_id=%s", user_id)
+                logger.warning(f"Failed to register pharmacist user_id for {name}")
+        except Exception as e:
+            logger.error(f"Exception during registration: {e}")
+            
+            pharmacist_line_bot_api.reply_message(event.reply_token, _REGISTRATION_ERR_MSG)
+        return
     
-    log_debug(f"Sending guide message to user_id={user_id}")
-    response = TextSendMessage(text=guide_text)
-    pharmacist_line_bot_api.reply_message(event.reply_token, response)
-    log_debug(f"Guide message sent successfully to user_id={user_id}")
+    logger.debug("Sending guide message to user_id=%s", user_id)
+    pharmacist_line_bot_api.reply_message(event.reply_token, GUIDE_MESSAGE)
+    logger.debug("Guide message sent successfully to user_id=%s", user_id)
 
-@pharmacist_handler.add(PostbackEvent)
 def handle_pharmacist_postback(event):
     """薬剤師Botのポストバックイベント処理（ボタンクリックなど）"""
     try:
         user_id = event.source.user_id
         postback_data = event.postback.data
         
-        log_debug(f"Pharmacist postback received: user_id={user_id}, postback_data='{postback_data}'")
+        logger.debug("Pharmacist postback received: user_id=%s, postback_data='%s'", user_id, postback_data)
         logger.info(f"[薬剤師Bot] Postback from {user_id}: {postback_data}")
         
-        # 応募ボタンの処理
-        if postback_data.startswith("pharmacist_apply:"):
-            log_debug(f"Calling handle_pharmacist_apply with data: {postback_data}")
-            handle_pharmacist_apply(event, postback_data)
-            return
-            
-        # 辞退ボタンの処理
-        elif postback_data.startswith("pharmacist_decline:"):
-            log_debug(f"Calling handle_pharmacist_decline with data: {postback_data}")
-            handle_pharmacist_decline(event, postback_data)
-            return
-            
-        # 詳細確認ボタンの処理
-        elif postback_data.startswith("pharmacist_details:"):
-            log_debug(f"Calling handle_pharmacist_details with data: {postback_data}")
-            handle_pharmacist_details(event, postback_data)
-            return
-            
+        # 「種別:依頼ID」形式のデータを種別で振り分け
+        prefix, sep, request_id = postback_data.partition(":")
+        handler = _POSTBACK_DISPATCH.get(prefix)
+        if handler and sep:
+            logger.debug("Calling %s with request_id: %s", handler.__name__, request_id)
+            handler(event, request_id)
         else:
             logger.warning(f"[薬剤師Bot] Unknown postback data: {postback_data}")
-            response = TextSendMessage(text="不明なボタン操作です。")
-            pharmacist_line_bot_api.reply_message(event.reply_token, response)
+            pharmacist_line_bot_api.reply_message(event.reply_token, _UNKNOWN_POSTBACK_MSG)
             
     except Exception as e:
-        log_debug(f"Error in handle_pharmacist_postback: {e}")
         logger.error(f"[薬剤師Bot] Error handling postback: {e}")
-        error_response = TextSendMessage(text="ボタン処理中にエラーが発生しました。")
-        pharmacist_line_bot_api.reply_message(event.reply_token, error_response)
+        pharmacist_line_bot_api.reply_message(event.reply_token, _POSTBACK_ERR_MSG)
+
+def _notify_store_of_application(request_id: str, user_id: str, request_data):
+    """応募があったことを店舗Botに通知"""
+    try:
+        if store_line_bot_api is None:
+            logger.warning("[薬剤師Bot] LINE_CHANNEL_ACCESS_TOKEN not set, skipping store notification")
+        else:
+            # 店舗のuser_idを動的に取得
+            store_user_id = None
+            if request_data and 'store_user_id' in request_data:
+                store_user_id = request_data['store_user_id']
+            else:
+                # リクエストIDから店舗のuser_idを抽出
+                # リクエストID形式: req_U37da00c3f064eb4acc037aa8ec6ea79e_20250718_225100
+                if request_id.startswith('req_'):
+                    parts = request_id.split('_')
+                    if len(parts) >= 2:
+                        store_user_id = parts[1]
+            
+            if not store_user_id:
+                logger.warning(f"[薬剤師Bot] Could not determine store user_id for request: {request_id}")
+                return
+            
+            # 薬剤師名を取得（実際はDBから取得）
+            pharmacist_name = "田中薬剤師"  # 仮の名前
+            
+            store_notification = TemplateSendMessage(
+                alt_text="薬剤師が応募しました！",
+                template=ButtonsTemplate(
+                    title="🎉 薬剤師が応募しました！",
+                    text=f"薬剤師: {pharmacist_name}\n応募日時: {now_minute_str()}",
+                    actions=[
+                        PostbackAction(label="✅ 承諾", data=f"pharmacist_confirm_accept:{request_id}:{user_id}"),
+                        PostbackAction(label="❌ 拒否", data=f"pharmacist_confirm_reject:{request_id}:{user_id}")
+                    ]
+                )
+            )
+            
+            # 応募者への返信を待たずに、店舗への通知はバックグラウンドで送信
+            submit_line_call(
+                store_line_bot_api.push_message,
+                store_user_id,
+                store_notification,
+                description=f"[薬剤師Bot] store notification to {store_user_id}"
+            )
+            
+    except Exception as e:
+        logger.error(f"[薬剤師Bot] Error sending store notification: {e}")
 
-def handle_pharmacist_apply(event, postback_data: str):
+def handle_pharmacist_apply(event, request_id: str):
     """薬剤師の応募処理"""
-    log_debug(f"handle_pharmacist_apply called with postback_data: {postback_data}")
+    logger.debug("handle_pharmacist_apply called with request_id: %s", request_id)
     try:
         user_id = event.source.user_id
-        request_id = postback_data.split(":", 1)[1] if ":" in postback_data else ""
         
-        log_debug(f"handle_pharmacist_apply: user_id={user_id}, request_id={request_id}")
+        logger.debug("handle_pharmacist_apply: user_id=%s, request_id=%s", user_id, request_id)
         logger.info(f"[薬剤師Bot] Pharmacist apply button clicked: user_id={user_id}, request_id={request_id}")
         
         # 依頼内容を取得
@@ -206,7 +260,7 @@ def handle_pharmacist_apply(event, postback_data: str):
         
         # リクエストが見つからない場合のデフォルト値
         if not request_data:
-            log_debug(f"Request not found: {request_id}, using default values")
+            logger.debug("Request not found: %s, using default values", request_id)
             request_data = {
                 'store': 'サンライズ薬局',
                 'date': datetime.now().date(),
@@ -215,157 +269,91 @@ def handle_pharmacist_apply(event, postback_data: str):
                 'time_slot': 'time_morning'
             }
         
-        # 1. 応募確認メッセージを送信
+        # 1. 応募確認メッセージを作成
         if request_data:
-            date = request_data.get('date')
-            if date:
-                if hasattr(date, 'strftime'):
-                    date_str = date.strftime('%Y/%m/%d')
-                else:
-                    date_str = str(date)
-            else:
-                date_str = '不明'
-            response_text = f"✅ 応募を受け付けました！\n\n"
-            response_text += f"🏪 店舗: {request_data.get('store', '不明')}\n"
-            response_text += f"📅 日付: {date_str}\n"
-            response_text += f"⏰ 時間: {request_data.get('start_time_label', '不明')}〜{request_data.get('end_time_label', '不明')}\n\n"
-            response_text += f"店舗からの確定連絡をお待ちください。\n"
-            response_text += f"確定次第、詳細をお知らせいたします。"
+            date_str = _format_date(request_data.get('date'))
+            response_text = (
+                "✅ 応募を受け付けました！\n\n"
+                f"🏪 店舗: {request_data.get('store', '不明')}\n"
+                f"📅 日付: {date_str}\n"
+                f"⏰ 時間: {request_data.get('start_time_label', '不明')}〜{request_data.get('end_time_label', '不明')}\n\n"
+                "店舗からの確定連絡をお待ちください。\n"
+                "確定次第、詳細をお知らせいたします。"
+            )
         else:
-            response_text = f"✅ 応募を受け付けました！\n"
-            response_text += f"依頼ID: {request_id}\n\n"
-            response_text += f"店舗からの確定連絡をお待ちください。\n"
-            response_text += f"確定次第、詳細をお知らせいたします。"
-        
-        response = TextSendMessage(text=response_text)
-        pharmacist_line_bot_api.reply_message(event.reply_token, response)
-        logger.info(f"[薬剤師Bot] Application confirmation sent to {user_id}")
+            response_text = (
+                "✅ 応募を受け付けました！\n"
+                f"依頼ID: {request_id}\n\n"
+                "店舗からの確定連絡をお待ちください。\n"
+                "確定次第、詳細をお知らせいたします。"
+            )
         
         # 2. 応募者リストに追加
         request_manager.add_applicant(request_id, user_id)
         logger.info(f"[薬剤師Bot] Added {user_id} to applicants for request {request_id}")
         
-        # 3. Google Sheetsに応募記録を保存
-        try:
-            pharmacist_name = "薬剤師A"  # 実際はDBから取得
-            sheets_service = GoogleSheetsService()
-            
-            application_success = sheets_service.record_application(
-                request_id=request_id,
-                pharmacist_id=f"pharm_{pharmacist_name}",
-                pharmacist_name=pharmacist_name,
-                store_name=request_data.get('store', 'メイプル薬局') if request_data else "メイプル薬局",
-                date=request_data.get('date', datetime.now().date()) if request_data else datetime.now().date(),
-                time_slot=request_data.get('time_slot', 'time_morning') if request_data else "time_morning"
-            )
-            
-            if application_success:
-                logger.info(f"[薬剤師Bot] Application recorded in Google Sheets for {pharmacist_name}")
-            else:
-                logger.warning(f"[薬剤師Bot] Failed to record application in Google Sheets for {pharmacist_name}")
-                
-        except Exception as e:
-            logger.error(f"[薬剤師Bot] Error recording application in Google Sheets: {e}")
-            log_debug(f"Google Sheets error: {e}")
+        # 3. Google Sheetsに応募記録を保存（バックグラウンドでまとめて書き込む）
+        pharmacist_name = "薬剤師A"  # 実際はDBから取得
+        if _sheets_available():
+            application_record_batcher.add({
+                'request_id': request_id,
+                'pharmacist_id': f"pharm_{pharmacist_name}",
+                'pharmacist_name': pharmacist_name,
+                'store_name': request_data.get('store', 'メイプル薬局') if request_data else "メイプル薬局",
+                'date': request_data.get('date', datetime.now().date()) if request_data else datetime.now().date(),
+                'time_slot': request_data.get('time_slot', 'time_morning') if request_data else "time_morning"
+            })
+            logger.info(f"[薬剤師Bot] Application record queued for {pharmacist_name}")
+        else:
+            logger.warning(f"[薬剤師Bot] Google Sheets not available, application record skipped for {pharmacist_name}")
         
-        # 4. 店舗Botに確定通知を送信
-        try:
-            from linebot import LineBotApi
-            from linebot.models import TemplateSendMessage, ButtonsTemplate, PostbackAction
-            
-            # 店舗Bot用のLINE API（環境変数から取得）
-            store_channel_access_token = os.getenv('LINE_CHANNEL_ACCESS_TOKEN')
-            if not store_channel_access_token:
-                logger.warning("[薬剤師Bot] LINE_CHANNEL_ACCESS_TOKEN not set, skipping store notification")
-            else:
-                store_line_bot_api = LineBotApi(store_channel_access_token)
-                
-                # 店舗のuser_idを動的に取得
-                store_user_id = None
-                if request_data and 'store_user_id' in request_data:
-                    store_user_id = request_data['store_user_id']
-                else:
-                    # リクエストIDから店舗のuser_idを抽出
-                    # リクエストID形式: req_U37da00c3f064eb4acc037aa8ec6ea79e_20250718_225100
-                    if request_id.startswith('req_'):
-                        parts = request_id.split('_')
-                        if len(parts) >= 2:
-                            store_user_id = parts[1]
-                
-                if not store_user_id:
-                    logger.warning(f"[薬剤師Bot] Could not determine store user_id for request: {request_id}")
-                    return
-                
-                # 薬剤師名を取得（実際はDBから取得）
-                pharmacist_name = "田中薬剤師"  # 仮の名前
-                
-                store_notification = TemplateSendMessage(
-                    alt_text="薬剤師が応募しました！",
-                    template=ButtonsTemplate(
-                        title="🎉 薬剤師が応募しました！",
-                        text=f"薬剤師: {pharmacist_name}\n応募日時: {datetime.now().strftime('%Y/%m/%d %H:%M')}",
-                        actions=[
-                            PostbackAction(label="✅ 承諾", data=f"pharmacist_confirm_accept:{request_id}:{user_id}"),
-                            PostbackAction(label="❌ 拒否", data=f"pharmacist_confirm_reject:{request_id}:{user_id}")
-                        ]
-                    )
-                )
-                
-                store_line_bot_api.push_message(store_user_id, store_notification)
-                logger.info(f"[薬剤師Bot] Store notification sent to: {store_user_id}")
-                log_debug(f"[薬剤師Bot] Store notification sent to: {store_user_id}")
-                
-        except Exception as e:
-            logger.error(f"[薬剤師Bot] Error sending store notification: {e}")
-            log_debug(f"[薬剤師Bot] Error sending store notification: {e}")
+        # 4. 店舗Botに確定通知を送信（バックグラウンドで実行）
+        _notify_store_of_application(request_id, user_id, request_data)
+        
+        # 5. 応募確認を返信（店舗通知・記録は上でバックグラウンドに渡しているため、返信と並行して進む）
+        pharmacist_line_bot_api.reply_message(event.reply_token, TextSendMessage(text=response_text))
+        logger.info(f"[薬剤師Bot] Application confirmation sent to {user_id}")
         
         logger.info(f"[薬剤Bot] Application process completed for {user_id}")
         
     except Exception as e:
-        log_debug(f"handle_pharmacist_apply: Exception occurred: {e}")
         logger.error(f"[薬剤師Bot] Error handling pharmacist apply: {e}")
-        pharmacist_line_bot_api.reply_message(
-            event.reply_token,
-            TextSendMessage(text="応募処理中にエラーが発生しました。")
-        )
+        pharmacist_line_bot_api.reply_message(event.reply_token, _APPLY_ERR_MSG)
 
-def handle_pharmacist_decline(event, postback_data: str):
+@lru_cache(maxsize=256)
+def _decline_message(request_id: str) -> TextSendMessage:
+    """辞退確認メッセージ（文面は依頼IDだけで決まるため、同じ依頼では使い回す）"""
+    return TextSendMessage(
+        text=f"❌ 辞退を受け付けました。\n"
+             f"依頼ID: {request_id}\n\n"
+             f"ご連絡ありがとうございました。\n"
+             f"またの機会をお待ちしております。"
+    )
+
+def handle_pharmacist_decline(event, request_id: str):
     """薬剤師の辞退処理"""
-    log_debug(f"handle_pharmacist_decline called with postback_data: {postback_data}")
+    logger.debug("handle_pharmacist_decline called with request_id: %s", request_id)
     try:
         user_id = event.source.user_id
-        request_id = postback_data.split(":", 1)[1] if ":" in postback_data else ""
         
-        log_debug(f"handle_pharmacist_decline: user_id={user_id}, request_id={request_id}")
+        logger.debug("handle_pharmacist_decline: user_id=%s, request_id=%s", user_id, request_id)
         logger.info(f"[薬剤師Bot] Pharmacist decline button clicked: user_id={user_id}, request_id={request_id}")
         
         # 辞退確認メッセージを送信
-        response = TextSendMessage(
-            text=f"❌ 辞退を受け付けました。\n"
-                 f"依頼ID: {request_id}\n\n"
-                 f"ご連絡ありがとうございました。\n"
-                 f"またの機会をお待ちしております。"
-        )
-        
-        pharmacist_line_bot_api.reply_message(event.reply_token, response)
+        pharmacist_line_bot_api.reply_message(event.reply_token, _decline_message(request_id))
         logger.info(f"[薬剤師Bot] Decline confirmation sent to pharmacist: {user_id}")
         
     except Exception as e:
-        log_debug(f"handle_pharmacist_decline: Exception occurred: {e}")
         logger.error(f"[薬剤師Bot] Error handling pharmacist decline: {e}")
-        pharmacist_line_bot_api.reply_message(
-            event.reply_token,
-            TextSendMessage(text="辞退処理中にエラーが発生しました。")
-        )
+        pharmacist_line_bot_api.reply_message(event.reply_token, _DECLINE_ERR_MSG)
 
-def handle_pharmacist_details(event, postback_data: str):
+def handle_pharmacist_details(event, request_id: str):
     """薬剤師の詳細確認処理"""
-    log_debug(f"handle_pharmacist_details called with postback_data: {postback_data}")
+    logger.debug("handle_pharmacist_details called with request_id: %s", request_id)
     try:
         user_id = event.source.user_id
-        request_id = postback_data.split(":", 1)[1] if ":" in postback_data else ""
         
-        log_debug(f"handle_pharmacist_details: user_id={user_id}, request_id={request_id}")
+        logger.debug("handle_pharmacist_details: user_id=%s, request_id=%s", user_id, request_id)
         logger.info(f"[薬剤師Bot] Pharmacist details button clicked: user_id={user_id}, request_id={request_id}")
         
         # 依頼内容を取得
@@ -373,25 +361,20 @@ def handle_pharmacist_details(event, postback_data: str):
         
         if request_data:
             # 詳細情報を作成
-            date = request_data.get('date')
-            if date:
-                if hasattr(date, 'strftime'):
-                    date_str = date.strftime('%Y/%m/%d')
-                else:
-                    date_str = str(date)
-            else:
-                date_str = '不明'
+            date_str = _format_date(request_data.get('date'))
                 
-            details_text = f"📋 勤務依頼の詳細\n"
-            details_text += f"━━━━━━━━━━━━━━━━\n"
-            details_text += f"🏪 店舗: {request_data.get('store', '不明')}\n"
-            details_text += f"📅 日付: {date_str}\n"
-            details_text += f"⏰ 開始時間: {request_data.get('start_time_label', '不明')}\n"
-            details_text += f"⏰ 終了時間: {request_data.get('end_time_label', '不明')}\n"
-            details_text += f"☕ 休憩時間: {request_data.get('break_time_label', '不明')}\n"
-            details_text += f"👥 必要人数: {request_data.get('count_text', '不明')}\n"
-            details_text += f"━━━━━━━━━━━━━━━━\n"
-            details_text += f"この依頼に応募しますか？"
+            details_text = (
+                "📋 勤務依頼の詳細\n"
+                "━━━━━━━━━━━━━━━━\n"
+                f"🏪 店舗: {request_data.get('store', '不明')}\n"
+                f"📅 日付: {date_str}\n"
+                f"⏰ 開始時間: {request_data.get('start_time_label', '不明')}\n"
+                f"⏰ 終了時間: {request_data.get('end_time_label', '不明')}\n"
+                f"☕ 休憩時間: {request_data.get('break_time_label', '不明')}\n"
+                f"👥 必要人数: {request_data.get('count_text', '不明')}\n"
+                "━━━━━━━━━━━━━━━━\n"
+                "この依頼に応募しますか？"
+            )
             
             response = TextSendMessage(text=details_text)
         else:
@@ -406,36 +389,55 @@ def handle_pharmacist_details(event, postback_data: str):
         logger.info(f"[薬剤師Bot] Details confirmation sent to pharmacist: {user_id}")
         
     except Exception as e:
-        log_debug(f"handle_pharmacist_details: Exception occurred: {e}")
         logger.error(f"[薬剤師Bot] Error handling pharmacist details: {e}")
-        pharmacist_line_bot_api.reply_message(
-            event.reply_token,
-            TextSendMessage(text="詳細確認処理中にエラーが発生しました。")
-        )
+        pharmacist_line_bot_api.reply_message(event.reply_token, _DETAILS_ERR_MSG)
+
+# ポストバックの種別とハンドラーの対応表
+_POSTBACK_DISPATCH = {
+    "pharmacist_apply": handle_pharmacist_apply,      # 応募ボタン
+    "pharmacist_decline": handle_pharmacist_decline,  # 辞退ボタン
+    "pharmacist_details": handle_pharmacist_details,  # 詳細確認ボタン
+}
+
+def dispatch_pharmacist_event(event):
+    """解析済みイベントを種類ごとのハンドラーに振り分け"""
+    # LINEの再送で同じイベントを二重に処理しない
+    if pharmacist_event_deduplicator.is_duplicate(event):
+        logger.info(f"[薬剤師Bot] Duplicate event skipped: {pharmacist_event_deduplicator.event_key(event)}")
+        return
+    if isinstance(event, MessageEvent) and isinstance(event.message, TextMessage):
+        handle_pharmacist_message(event)
+    elif isinstance(event, PostbackEvent):
+        handle_pharmacist_postback(event)
+
+def dispatch_pharmacist_events(events):
+    """1回のWebhookで届いたイベントを順番に処理（応答後にバックグラウンドで実行）"""
+    for event in events:
+        try:
+            dispatch_pharmacist_event(event)
+        except Exception as e:
+            logger.error(f"Pharmacist Webhook handling error: {e}")
 
 @router.post("/webhook")
-async def pharmacist_line_webhook(request: Request):
+async def pharmacist_line_webhook(request: Request, background_tasks: BackgroundTasks):
     try:
         body = await request.body()
         signature = request.headers.get('X-Line-Signature', '')
         
-        log_debug(f"Pharmacist webhook received: body_length={len(body)}, signature={signature[:20] if signature else 'None'}...")
+        logger.debug("Pharmacist webhook received: body_length=%s, signature=%s...", len(body), signature[:20] if signature else 'None')
         logger.info(f"Pharmacist webhook received: body_length={len(body)}")
         
         try:
-            pharmacist_handler.handle(body.decode('utf-8'), signature)
-            log_debug(f"Pharmacist webhook processed successfully")
-            logger.info("Pharmacist webhook processed successfully")
+            events = pharmacist_parser.parse(body, signature)
+            # 署名検証だけ済ませてすぐに応答し、イベント処理は応答後にスレッドプールで行う
+            background_tasks.add_task(dispatch_pharmacist_events, events)
+            logger.info(f"Pharmacist webhook accepted: {len(events)} events")
         except InvalidSignatureError:
-            error_msg = "Invalid signature for pharmacist webhook"
-            log_debug(error_msg)
-            logger.error(error_msg)
+            logger.error("Invalid signature for pharmacist webhook")
             raise HTTPException(status_code=400, detail="Invalid signature")
         
         return {"status": "ok"} 
         
     except Exception as e:
-        error_msg = f"Pharmacist webhook error: {e}"
-        log_debug(error_msg)
-        logger.error(error_msg)
+        logger.error(f"Pharmacist webhook error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error") 
\ No newline at end of file
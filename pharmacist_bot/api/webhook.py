@@ -1,37 +1,125 @@
-from fastapi import APIRouter, Request, HTTPException
-from linebot import LineBotApi, WebhookHandler
+from fastapi import APIRouter, Request, HTTPException, BackgroundTasks
 from linebot.exceptions import InvalidSignatureError, LineBotApiError
 from linebot.models import (
     MessageEvent, TextMessage, PostbackEvent, FollowEvent, UnfollowEvent,
-    TextSendMessage, TemplateSendMessage, ButtonsTemplate, PostbackAction
+    TextSendMessage
 )
 import logging
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Optional
 from ..config import pharmacist_settings as settings
+from app.config import settings as app_settings
 from ..services.line_bot_service import pharmacist_line_bot_service
-from ..services.notification_service import PharmacistNotificationService
-from shared.services.request_manager import RequestManager
+from shared.services.request_manager import request_manager
 from shared.models.user import UserType
-from shared.services.google_sheets_service import GoogleSheetsService
-from datetime import datetime
-import json
+from shared.services.google_sheets_service import get_google_sheets_service
+from shared.services.line_http_client import create_line_bot_api, push_raw_messages, submit_line_call
+from shared.services.background_worker import BatchWorker
+from shared.services.event_deduplicator import EventDeduplicator
+from shared.utils.clock import now_minute_str
+from datetime import datetime, date
+import re
+from cachetools import TTLCache
 
 # ログ設定
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(prefix="/pharmacist/line", tags=["pharmacist_line"])
 
-# 薬剤師Bot専用のLINE Bot APIとハンドラー
-pharmacist_line_bot_api = LineBotApi(settings.pharmacist_line_channel_access_token)
-pharmacist_handler = WebhookHandler(settings.pharmacist_line_channel_secret)
+# 薬剤師Bot専用のLINE Bot APIとパーサー（サービスのインスタンスを共有）
+pharmacist_line_bot_api = pharmacist_line_bot_service.line_bot_api
+pharmacist_parser = pharmacist_line_bot_service.parser
+
+# 店舗Bot用のLINE Bot API（応募通知の送信に使用、接続プールを共有）
+store_line_bot_api = create_line_bot_api(app_settings.line_channel_access_token)
 
 # サービス初期化
-pharmacist_notification_service = PharmacistNotificationService()
-request_manager = RequestManager()
-google_sheets_service = GoogleSheetsService()
+google_sheets_service = get_google_sheets_service()
+
+def _record_application_batch(applications):
+    """溜まった応募記録をまとめてGoogle Sheetsに書き込む（バッチワーカーから呼ばれる）"""
+    if google_sheets_service.record_applications(applications):
+        logger.info(f"[薬剤師Bot] {len(applications)} application(s) recorded in Google Sheets")
+    else:
+        logger.warning(f"[薬剤師Bot] Failed to record {len(applications)} application(s) in Google Sheets")
+
+# 応募記録の書き込み（短時間に集中した応募を1回のAPI呼び出しにまとめる）
+application_record_batcher = BatchWorker("application-records", _record_application_batch)
+
+# 処理済みWebhookイベント（LINEの再送による二重応募・二重通知を防ぐ）
+pharmacist_event_deduplicator = EventDeduplicator()
+
+# 薬剤師登録メッセージの区切り文字（カンマ、スペース、改行など）
+_REG_TOKEN_SPLIT = re.compile(r'[,，\s\n]+')
+
+# 店舗への応募通知（ボタンテンプレート）の固定部分
+_STORE_NOTIFY_TEMPLATE = {
+    "type": "template",
+    "altText": "薬剤師が応募しました！",
+    "template": {
+        "type": "buttons",
+        "title": "🎉 薬剤師が応募しました！",
+        "text": "",
+        "actions": [],
+    },
+}
+
+def _build_store_notify_message(request_id: str, user_id: str) -> dict:
+    """応募通知メッセージを依頼ID・薬剤師IDを差し込んで作成"""
+    return {
+        **_STORE_NOTIFY_TEMPLATE,
+        "template": {
+            **_STORE_NOTIFY_TEMPLATE["template"],
+            "text": f"応募日時: {now_minute_str()}",
+            "actions": [
+                {"type": "postback", "label": "承諾", "data": f"pharmacist_confirm_accept:{request_id}:{user_id}"},
+                {"type": "postback", "label": "拒否", "data": f"pharmacist_confirm_reject:{request_id}:{user_id}"},
+            ],
+        },
+    }
+
+# 固定文面のメッセージ（リクエストごとに生成しない）
+_WELCOME_MSG = TextSendMessage(
+    text="💊 薬剤師Botへようこそ！\n\n"
+         "このBotは勤務依頼の受信・応募・辞退を行います。\n\n"
+         "まずは薬剤師登録を行ってください：\n"
+         "「薬剤師登録」と入力してください。"
+)
+_HELP_MSG = TextSendMessage(
+    text="💊 薬剤師Botです。\n\n"
+         "以下のコマンドが利用できます：\n\n"
+         "• 薬剤師登録 - 薬剤師として登録\n"
+         "• ヘルプ - このメッセージを表示\n\n"
+         "勤務依頼が届いた場合は、ボタンから応募・辞退を行ってください。"
+)
+_REGISTRATION_HELP_MSG = TextSendMessage(
+    text="💊 薬剤師登録\n\n"
+         "以下の形式で登録してください：\n\n"
+         "• 薬剤師登録 田中太郎\n"
+         "• 薬剤師登録,田中太郎\n"
+         "• 薬剤師登録 田中 太郎\n\n"
+         "名前を入力してください。"
+)
+_UNKNOWN_POSTBACK_MSG = TextSendMessage(text="不明なボタン操作です。")
+_MESSAGE_ERR_MSG = TextSendMessage(text="メッセージ処理中にエラーが発生しました。")
+_POSTBACK_ERR_MSG = TextSendMessage(text="ボタン処理中にエラーが発生しました。")
+_REGISTRATION_ERR_MSG = TextSendMessage(text="登録処理中にエラーが発生しました。")
+_APPLY_ERR_MSG = TextSendMessage(text="応募処理中にエラーが発生しました。")
+_DECLINE_ERR_MSG = TextSendMessage(text="辞退処理中にエラーが発生しました。")
+_DETAILS_ERR_MSG = TextSendMessage(text="詳細確認処理中にエラーが発生しました。")
+
+def dispatch_pharmacist_events(events):
+    """1回のWebhookで届いたイベントを順番に処理（応答後にバックグラウンドで実行）"""
+    for event in events:
+        try:
+            dispatch_pharmacist_event(event)
+        except Exception as e:
+            logger.error(f"[薬剤師Bot] Webhook handling error: {e}")
 
 @router.post("/webhook")
-async def pharmacist_webhook(request: Request):
+async def pharmacist_webhook(request: Request, background_tasks: BackgroundTasks):
     """薬剤師Bot専用のWebhookエンドポイント"""
     try:
         body = await request.body()
@@ -40,42 +128,97 @@ async def pharmacist_webhook(request: Request):
         logger.info(f"[薬剤師Bot] Webhook received - Body length: {len(body)}")
         
         try:
-            pharmacist_handler.handle(body.decode('utf-8'), signature)
-            logger.info("[薬剤師Bot] Webhook handled successfully")
+            events = pharmacist_parser.parse(body, signature)
         except InvalidSignatureError:
             logger.error("[薬剤師Bot] Invalid signature")
             raise HTTPException(status_code=400, detail="Invalid signature")
-        except Exception as e:
-            logger.error(f"[薬剤Bot] Webhook handling error: {e}")
-            raise HTTPException(status_code=500, detail="Internal server error")
+        
+        # 署名検証だけ済ませてすぐに応答し、LINE/Sheetsへの呼び出しを伴う
+        # イベント処理は応答後にスレッドプールで行う
+        background_tasks.add_task(dispatch_pharmacist_events, events)
+        logger.info(f"[薬剤師Bot] Webhook accepted: {len(events)} events")
         
         return {"status": "ok"}
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"[薬剤師Bot] Webhook error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@pharmacist_handler.add(FollowEvent)
+# 店舗名→店舗LINE user_idの対応を使い回す秒数（期限が切れたら店舗登録シートを読み直し、新しく登録された店舗を反映する）
+STORE_USER_ID_CACHE_TTL = 300
+# 店舗登録シートから読み込んだ店舗名→店舗LINE user_idの対応（Webhookはスレッドプールで処理されるためロックで保護する）
+_store_user_id_cache: "TTLCache[str, Dict[str, str]]" = TTLCache(maxsize=1, ttl=STORE_USER_ID_CACHE_TTL)
+_store_user_id_lock = threading.Lock()
+
+def _get_store_user_ids() -> Dict[str, str]:
+    """店舗名→店舗LINE user_idの対応を取得（TTL内は読み込み済みの対応を使う）"""
+    with _store_user_id_lock:
+        store_user_ids = _store_user_id_cache.get("stores")
+    if store_user_ids is not None:
+        return store_user_ids
+    if not google_sheets_service.service:
+        return {}
+    store_user_ids = {
+        store['name']: store['user_id']
+        for store in google_sheets_service.get_store_list()
+        if store.get('user_id')
+    }
+    # 読み込みに失敗した（空の）結果は保持せず、次の呼び出しで読み直す
+    if store_user_ids:
+        with _store_user_id_lock:
+            _store_user_id_cache["stores"] = store_user_ids
+    return store_user_ids
+
+def _resolve_store_user_id(request_data: Optional[Dict[str, Any]]) -> str:
+    """応募通知を送る店舗のuser_idを取得"""
+    if request_data:
+        # 店舗Botで作成された依頼には送信元の店舗user_idが含まれている
+        if request_data.get('store_user_id'):
+            return request_data['store_user_id']
+        store_name = request_data.get('store')
+        if store_name:
+            store_user_id = _get_store_user_ids().get(store_name)
+            if store_user_id:
+                return store_user_id
+    return settings.default_store_user_id
+
+def _format_date(value) -> str:
+    """依頼の日付を「YYYY/MM/DD」形式に変換（未設定の場合は「不明」）"""
+    if isinstance(value, date):
+        return value.strftime('%Y/%m/%d')
+    return str(value) if value else '不明'
+
+def dispatch_pharmacist_event(event):
+    """解析済みイベントを種類ごとのハンドラーに振り分け"""
+    # LINEの再送で同じイベントを二重に処理しない
+    if pharmacist_event_deduplicator.is_duplicate(event):
+        logger.info(f"[薬剤師Bot] Duplicate event skipped: {pharmacist_event_deduplicator.event_key(event)}")
+        return
+    if isinstance(event, FollowEvent):
+        handle_pharmacist_follow(event)
+    elif isinstance(event, UnfollowEvent):
+        handle_pharmacist_unfollow(event)
+    elif isinstance(event, MessageEvent) and isinstance(event.message, TextMessage):
+        handle_pharmacist_text_message(event)
+    elif isinstance(event, PostbackEvent):
+        handle_pharmacist_postback(event)
+    else:
+        logger.info(f"[薬剤師Bot] Unhandled event type: {type(event).__name__}")
+
 def handle_pharmacist_follow(event):
     """薬剤師Botのフォローイベント処理"""
     try:
         user_id = event.source.user_id
         logger.info(f"[薬剤師Bot] Follow event from user: {user_id}")
         
-        welcome_message = TextSendMessage(
-            text="💊 薬剤師Botへようこそ！\n\n"
-                 "このBotは勤務依頼の受信・応募・辞退を行います。\n\n"
-                 "まずは薬剤師登録を行ってください：\n"
-                 "「薬剤師登録」と入力してください。"
-        )
-        
-        pharmacist_line_bot_api.reply_message(event.reply_token, welcome_message)
+        pharmacist_line_bot_api.reply_message(event.reply_token, _WELCOME_MSG)
         logger.info(f"[薬剤師Bot] Welcome message sent to {user_id}")
         
     except Exception as e:
         logger.error(f"[薬剤師Bot] Error handling follow event: {e}")
 
-@pharmacist_handler.add(UnfollowEvent)
 def handle_pharmacist_unfollow(event):
     """薬剤師Botのアンフォローイベント処理"""
     try:
@@ -86,7 +229,6 @@ def handle_pharmacist_unfollow(event):
     except Exception as e:
         logger.error(f"[薬剤師Bot] Error handling unfollow event: {e}")
 
-@pharmacist_handler.add(MessageEvent, message=TextMessage)
 def handle_pharmacist_text_message(event):
     """薬剤師Botのテキストメッセージ処理"""
     try:
@@ -100,21 +242,12 @@ def handle_pharmacist_text_message(event):
             handle_pharmacist_registration(event, message_text)
         else:
             # その他のメッセージ
-            response = TextSendMessage(
-                text="💊 薬剤師Botです。\n\n"
-                     "以下のコマンドが利用できます：\n\n"
-                     "• 薬剤師登録 - 薬剤師として登録\n"
-                     "• ヘルプ - このメッセージを表示\n\n"
-                     "勤務依頼が届いた場合は、ボタンから応募・辞退を行ってください。"
-            )
-            pharmacist_line_bot_api.reply_message(event.reply_token, response)
+            pharmacist_line_bot_api.reply_message(event.reply_token, _HELP_MSG)
             
     except Exception as e:
         logger.error(f"[薬剤師Bot] Error handling text message: {e}")
-        error_response = TextSendMessage(text="メッセージ処理中にエラーが発生しました。")
-        pharmacist_line_bot_api.reply_message(event.reply_token, error_response)
+        pharmacist_line_bot_api.reply_message(event.reply_token, _MESSAGE_ERR_MSG)
 
-@pharmacist_handler.add(PostbackEvent)
 def handle_pharmacist_postback(event):
     """薬剤師Botのポストバックイベント処理（ボタンクリックなど）"""
     try:
@@ -122,35 +255,20 @@ def handle_pharmacist_postback(event):
         postback_data = event.postback.data
         
         logger.info(f"[薬剤師Bot] Postback from {user_id}: {postback_data}")
-        print(f"[DEBUG][薬剤師Bot] handle_postback: postback_data={postback_data!r}, user_id={user_id}")
+        logger.debug("[薬剤師Bot] handle_postback: postback_data=%r, user_id=%s", postback_data, user_id)
         
-        # 応募ボタンの処理
-        if postback_data.startswith("pharmacist_apply:"):
-            print(f"[DEBUG][薬剤師Bot] Calling handle_pharmacist_apply with data: {postback_data}")
-            handle_pharmacist_apply(event, postback_data)
-            return
-            
-        # 辞退ボタンの処理
-        elif postback_data.startswith("pharmacist_decline:"):
-            print(f"[DEBUG][薬剤師Bot] Calling handle_pharmacist_decline with data: {postback_data}")
-            handle_pharmacist_decline(event, postback_data)
-            return
-            
-        # 詳細確認ボタンの処理
-        elif postback_data.startswith("pharmacist_details:"):
-            print(f"[DEBUG][薬剤師Bot] Calling handle_pharmacist_details with data: {postback_data}")
-            handle_pharmacist_details(event, postback_data)
-            return
-            
+        prefix, _, request_id = postback_data.partition(":")
+        handler = _POSTBACK_DISPATCH.get(prefix)
+        if handler:
+            logger.debug("[薬剤師Bot] Calling %s with request_id: %s", handler.__name__, request_id)
+            handler(event, request_id)
         else:
             logger.warning(f"[薬剤師Bot] Unknown postback data: {postback_data}")
-            response = TextSendMessage(text="不明なボタン操作です。")
-            pharmacist_line_bot_api.reply_message(event.reply_token, response)
+            pharmacist_line_bot_api.reply_message(event.reply_token, _UNKNOWN_POSTBACK_MSG)
             
     except Exception as e:
         logger.error(f"[薬剤師Bot] Error handling postback: {e}")
-        error_response = TextSendMessage(text="ボタン処理中にエラーが発生しました。")
-        pharmacist_line_bot_api.reply_message(event.reply_token, error_response)
+        pharmacist_line_bot_api.reply_message(event.reply_token, _POSTBACK_ERR_MSG)
 
 def handle_pharmacist_registration(event, message_text: str):
     """薬剤師登録処理"""
@@ -158,9 +276,7 @@ def handle_pharmacist_registration(event, message_text: str):
         user_id = event.source.user_id
         
         # 薬剤師情報を解析（柔軟なパターンに対応）
-        import re
-        # カンマ、スペース、改行などで分割
-        parts = re.split(r'[,，\s\n]+', message_text)
+        parts = _REG_TOKEN_SPLIT.split(message_text)
         
         pharmacist_name = None
         for part in parts:
@@ -169,15 +285,7 @@ def handle_pharmacist_registration(event, message_text: str):
                 break
         
         if not pharmacist_name:
-            response = TextSendMessage(
-                text="💊 薬剤師登録\n\n"
-                     "以下の形式で登録してください：\n\n"
-                     "• 薬剤師登録 田中太郎\n"
-                     "• 薬剤師登録,田中太郎\n"
-                     "• 薬剤師登録 田中 太郎\n\n"
-                     "名前を入力してください。"
-            )
-            pharmacist_line_bot_api.reply_message(event.reply_token, response)
+            pharmacist_line_bot_api.reply_message(event.reply_token, _REGISTRATION_HELP_MSG)
             return
         
         # 薬剤師情報を保存（実際はDBに保存）
@@ -198,101 +306,70 @@ def handle_pharmacist_registration(event, message_text: str):
         
     except Exception as e:
         logger.error(f"[薬剤師Bot] Error in pharmacist registration: {e}")
-        error_response = TextSendMessage(text="登録処理中にエラーが発生しました。")
-        pharmacist_line_bot_api.reply_message(event.reply_token, error_response)
+        pharmacist_line_bot_api.reply_message(event.reply_token, _REGISTRATION_ERR_MSG)
 
-def handle_pharmacist_apply(event, postback_data: str):
+def handle_pharmacist_apply(event, request_id: str):
     """薬剤師の応募処理"""
-    print(f"[DEBUG][薬剤師Bot] handle_pharmacist_apply called with postback_data: {postback_data}")
+    logger.debug("[薬剤師Bot] handle_pharmacist_apply called with request_id: %s", request_id)
     try:
         user_id = event.source.user_id
-        request_id = postback_data.split(":", 1)[1] if ":" in postback_data else ""
         
-        print(f"[DEBUG][薬剤師Bot] handle_pharmacist_apply: user_id={user_id}, request_id={request_id}")
+        logger.debug("[薬剤師Bot] handle_pharmacist_apply: user_id=%s, request_id=%s", user_id, request_id)
         logger.info(f"[薬剤師Bot] Pharmacist apply button clicked: user_id={user_id}, request_id={request_id}")
         
         # 依頼内容を取得
         request_data = request_manager.get_request(request_id)
         
-        # 1. 応募確認メッセージを送信
+        # 1. 応募確認メッセージを作成
         if request_data:
-            date = request_data.get('date')
-            if date:
-                if hasattr(date, 'strftime'):
-                    date_str = date.strftime('%Y/%m/%d')
-                else:
-                    from datetime import datetime
-                    date_str = str(date)
-            else:
-                date_str = '不明'
-            response_text = f"✅ 応募を受け付けました！\n\n"
-            response_text += f"🏪 店舗: {request_data.get('store', '不明')}\n"
-            response_text += f"📅 日付: {date_str}\n"
-            response_text += f"⏰ 時間: {request_data.get('start_time_label', '不明')}〜{request_data.get('end_time_label', '不明')}\n\n"
-            response_text += f"店舗からの確定連絡をお待ちください。\n"
-            response_text += f"確定次第、詳細をお知らせいたします。"
+            date_str = _format_date(request_data.get('date'))
+            response_text = (
+                "✅ 応募を受け付けました！\n\n"
+                f"🏪 店舗: {request_data.get('store', '不明')}\n"
+                f"📅 日付: {date_str}\n"
+                f"⏰ 時間: {request_data.get('start_time_label', '不明')}〜{request_data.get('end_time_label', '不明')}\n\n"
+                "店舗からの確定連絡をお待ちください。\n"
+                "確定次第、詳細をお知らせいたします。"
+            )
         else:
-            response_text = f"✅ 応募を受け付けました！\n"
-            response_text += f"依頼ID: {request_id}\n\n"
-            response_text += f"店舗からの確定連絡をお待ちください。\n"
-            response_text += f"確定次第、詳細をお知らせいたします。"
-        
-        response = TextSendMessage(text=response_text)
-        pharmacist_line_bot_api.reply_message(event.reply_token, response)
-        logger.info(f"[薬剤師Bot] Application confirmation sent to {user_id}")
+            response_text = (
+                "✅ 応募を受け付けました！\n"
+                f"依頼ID: {request_id}\n\n"
+                "店舗からの確定連絡をお待ちください。\n"
+                "確定次第、詳細をお知らせいたします。"
+            )
         
         # 2. 応募者リストに追加
         request_manager.add_applicant(request_id, user_id)
         logger.info(f"[薬剤師Bot] Added {user_id} to applicants for request {request_id}")
         
-        # 3. Google Sheetsに応募記録を保存
-        try:
-            pharmacist_name = "薬剤師A"  # 実際はDBから取得
-            application_success = google_sheets_service.record_application(
-                request_id=request_id,
-                pharmacist_id=f"pharm_{pharmacist_name}",
-                pharmacist_name=pharmacist_name,
-                store_name=request_data.get('store', 'メイプル薬局') if request_data else "メイプル薬局",
-                date=request_data.get('date', datetime.now().date()) if request_data else datetime.now().date(),
-                time_slot=request_data.get('time_slot', 'time_morning') if request_data else "time_morning"
-            )
-            
-            if application_success:
-                logger.info(f"[薬剤師Bot] Application recorded in Google Sheets for {pharmacist_name}")
-            else:
-                logger.warning(f"[薬剤師Bot] Failed to record application in Google Sheets for {pharmacist_name}")
-                
-        except Exception as e:
-            logger.error(f"[薬剤師Bot] Error recording application in Google Sheets: {e}")
+        # 3. Google Sheetsに応募記録を保存（バックグラウンドでまとめて書き込む）
+        pharmacist_name = "薬剤師A"  # 実際はDBから取得
+        if google_sheets_service.service:
+            application_record_batcher.add({
+                'request_id': request_id,
+                'pharmacist_id': f"pharm_{pharmacist_name}",
+                'pharmacist_name': pharmacist_name,
+                'store_name': request_data.get('store', 'メイプル薬局') if request_data else "メイプル薬局",
+                'date': request_data.get('date', datetime.now().date()) if request_data else datetime.now().date(),
+                'time_slot': request_data.get('time_slot', 'time_morning') if request_data else "time_morning"
+            })
+            logger.info(f"[薬剤師Bot] Application record queued for {pharmacist_name}")
+        else:
+            logger.warning(f"[薬剤師Bot] Google Sheets not available, application record skipped for {pharmacist_name}")
         
-        # 4. 店舗Botに確定通知を送信
+        # 4. 店舗Botに確定通知を送信（バックグラウンドで実行）
         try:
-            from linebot import LineBotApi
-            from app.config import settings
+            store_user_id = _resolve_store_user_id(request_data)
             
-            # 店舗Bot用のLINE API
-            store_line_bot_api = LineBotApi(settings.line_channel_access_token)
-            
-            # 店舗のuser_id（実際はDBから取得）
-            store_user_id = "U37da00c3f064eb4acc037aa8ec6ea79e"  # サンライズ薬局のuser_id
-            
-            store_line_bot_api.push_message(
+            submit_line_call(
+                push_raw_messages,
+                store_line_bot_api,
                 store_user_id,
-                TemplateSendMessage(
-                    alt_text="薬剤師が応募しました！",
-                    template=ButtonsTemplate(
-                        title="🎉 薬剤師が応募しました！",
-                        text=f"応募日時: {datetime.now().strftime('%Y/%m/%d %H:%M')}",
-                        actions=[
-                            PostbackAction(label="承諾", data=f"pharmacist_confirm_accept:{request_id}:{user_id}"),
-                            PostbackAction(label="拒否", data=f"pharmacist_confirm_reject:{request_id}:{user_id}")
-                        ]
-                    )
-                )
+                [_build_store_notify_message(request_id, user_id)],
+                description=f"[薬剤師Bot] store notification to {store_user_id}"
             )
             
-            logger.info(f"[薬剤師Bot] Store notification sent to: {store_user_id}")
-            
         except Exception as e:
             logger.error(f"[薬剤師Bot] Error sending store notification: {e}")
         
@@ -315,63 +392,62 @@ def handle_pharmacist_apply(event, postback_data: str):
                      f"またの機会をお待ちしております。"
             )
             
-            for other_user_id in other_pharmacist_user_ids:
-                try:
-                    pharmacist_line_bot_api.push_message(other_user_id, decline_notification)
-                    logger.info(f"[薬剤師Bot] Decline notification sent to: {other_user_id}")
-                except Exception as e:
-                    logger.error(f"[薬剤師Bot] Failed to send decline notification to {other_user_id}: {e}")
-            
-            if not other_pharmacist_user_ids:
+            if other_pharmacist_user_ids:
+                submit_line_call(
+                    pharmacist_line_bot_service.multicast_message,
+                    other_pharmacist_user_ids,
+                    decline_notification,
+                    description=f"[薬剤師Bot] decline notification to {len(other_pharmacist_user_ids)} pharmacists"
+                )
+            else:
                 logger.info("[薬剤師Bot] No other pharmacists to notify for this request")
                      
         except Exception as e:
             logger.error(f"[薬剤師Bot] Error sending decline notifications: {e}")
         
+        # 6. 応募確認を返信（店舗通知・記録は上でバックグラウンドに渡しているため、返信と並行して進む）
+        pharmacist_line_bot_api.reply_message(event.reply_token, TextSendMessage(text=response_text))
+        logger.info(f"[薬剤師Bot] Application confirmation sent to {user_id}")
+        
         logger.info(f"[薬剤師Bot] Application process completed for {user_id}")
         
     except Exception as e:
-        print(f"[DEBUG][薬剤師Bot] handle_pharmacist_apply: Exception occurred: {e}")
+        logger.debug("[薬剤師Bot] handle_pharmacist_apply: Exception occurred: %s", e)
         logger.error(f"[薬剤師Bot] Error handling pharmacist apply: {e}")
-        pharmacist_line_bot_api.reply_message(
-            event.reply_token,
-            TextSendMessage(text="応募処理中にエラーが発生しました。")
-        )
+        pharmacist_line_bot_api.reply_message(event.reply_token, _APPLY_ERR_MSG)
 
-def handle_pharmacist_decline(event, postback_data: str):
+@lru_cache(maxsize=256)
+def _decline_message(request_id: str) -> TextSendMessage:
+    """辞退確認メッセージ（文面は依頼IDだけで決まるため、同じ依頼では使い回す）"""
+    return TextSendMessage(
+        text=f"❌ 辞退を受け付けました。\n"
+             f"依頼ID: {request_id}\n\n"
+             f"ご連絡ありがとうございました。\n"
+             f"またの機会をお待ちしております。"
+    )
+
+def handle_pharmacist_decline(event, request_id: str):
     """薬剤師の辞退処理"""
-    print(f"[DEBUG][薬剤師Bot] handle_pharmacist_decline called with postback_data: {postback_data}")
+    logger.debug("[薬剤師Bot] handle_pharmacist_decline called with request_id: %s", request_id)
     try:
         user_id = event.source.user_id
-        request_id = postback_data.split(":", 1)[1] if ":" in postback_data else ""
         
-        print(f"[DEBUG][薬剤師Bot] handle_pharmacist_decline: user_id={user_id}, request_id={request_id}")
+        logger.debug("[薬剤師Bot] handle_pharmacist_decline: user_id=%s, request_id=%s", user_id, request_id)
         logger.info(f"[薬剤師Bot] Pharmacist decline button clicked: user_id={user_id}, request_id={request_id}")
         
         # 辞退確認メッセージを送信
-        response = TextSendMessage(
-            text=f"❌ 辞退を受け付けました。\n"
-                 f"依頼ID: {request_id}\n\n"
-                 f"ご連絡ありがとうございました。\n"
-                 f"またの機会をお待ちしております。"
-        )
-        
-        pharmacist_line_bot_api.reply_message(event.reply_token, response)
+        pharmacist_line_bot_api.reply_message(event.reply_token, _decline_message(request_id))
         logger.info(f"[薬剤師Bot] Decline confirmation sent to pharmacist: {user_id}")
         
     except Exception as e:
-        print(f"[DEBUG][薬剤師Bot] handle_pharmacist_decline: Exception occurred: {e}")
+        logger.debug("[薬剤師Bot] handle_pharmacist_decline: Exception occurred: %s", e)
         logger.error(f"[薬剤師Bot] Error handling pharmacist decline: {e}")
-        pharmacist_line_bot_api.reply_message(
-            event.reply_token,
-            TextSendMessage(text="辞退処理中にエラーが発生しました。")
-        )
+        pharmacist_line_bot_api.reply_message(event.reply_token, _DECLINE_ERR_MSG)
 
-def handle_pharmacist_details(event, postback_data: str):
+def handle_pharmacist_details(event, request_id: str):
     """薬剤師の詳細確認処理"""
     try:
         user_id = event.source.user_id
-        request_id = postback_data.split(":", 1)[1] if ":" in postback_data else ""
         
         logger.info(f"[薬剤師Bot] Pharmacist details button clicked: user_id={user_id}, request_id={request_id}")
         
@@ -380,25 +456,20 @@ def handle_pharmacist_details(event, postback_data: str):
         
         if request_data:
             # 詳細情報を作成
-            date = request_data.get('date')
-            if date:
-                if hasattr(date, 'strftime'):
-                    date_str = date.strftime('%Y/%m/%d')
-                else:
-                    date_str = str(date)
-            else:
-                date_str = '不明'
+            date_str = _format_date(request_data.get('date'))
                 
-            details_text = f"📋 勤務依頼の詳細\n"
-            details_text += f"━━━━━━━━━━━━━━━━\n"
-            details_text += f"🏪 店舗: {request_data.get('store', '不明')}\n"
-            details_text += f"📅 日付: {date_str}\n"
-            details_text += f"⏰ 開始時間: {request_data.get('start_time_label', '不明')}\n"
-            details_text += f"⏰ 終了時間: {request_data.get('end_time_label', '不明')}\n"
-            details_text += f"☕ 休憩時間: {request_data.get('break_time_label', '不明')}\n"
-            details_text += f"👥 必要人数: {request_data.get('count_text', '不明')}\n"
-            details_text += f"━━━━━━━━━━━━━━━━\n"
-            details_text += f"この依頼に応募しますか？"
+            details_text = (
+                "📋 勤務依頼の詳細\n"
+                "━━━━━━━━━━━━━━━━\n"
+                f"🏪 店舗: {request_data.get('store', '不明')}\n"
+                f"📅 日付: {date_str}\n"
+                f"⏰ 開始時間: {request_data.get('start_time_label', '不明')}\n"
+                f"⏰ 終了時間: {request_data.get('end_time_label', '不明')}\n"
+                f"☕ 休憩時間: {request_data.get('break_time_label', '不明')}\n"
+                f"👥 必要人数: {request_data.get('count_text', '不明')}\n"
+                "━━━━━━━━━━━━━━━━\n"
+                "この依頼に応募しますか？"
+            )
             
             response = TextSendMessage(text=details_text)
         else:
@@ -413,7 +484,12 @@ def handle_pharmacist_details(event, postback_data: str):
         
     except Exception as e:
         logger.error(f"[薬剤師Bot] Error handling pharmacist details: {e}")
-        pharmacist_line_bot_api.reply_message(
-            event.reply_token,
-            TextSendMessage(text="詳細確認処理中にエラーが発生しました。")
-        ) 
\ No newline at end of file
+        pharmacist_line_bot_api.reply_message(event.reply_token, _DETAILS_ERR_MSG)
+
+
+# ポストバックのプレフィックスとハンドラーの対応表
+_POSTBACK_DISPATCH = {
+    "pharmacist_apply": handle_pharmacist_apply,      # 応募ボタン
+    "pharmacist_decline": handle_pharmacist_decline,  # 辞退ボタン
+    "pharmacist_details": handle_pharmacist_details,  # 詳細確認ボタン
+}
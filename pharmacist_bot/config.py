@@ -1,15 +1,21 @@
 import os
+from functools import cached_property, lru_cache
 from typing import Optional
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class PharmacistBotSettings(BaseSettings):
+    # 起動時に一度だけ環境変数を読み込み、以降は変更しない
+    model_config = SettingsConfigDict(env_file=".env", frozen=True)
+
     # 薬剤師Bot用LINE設定
     pharmacist_line_channel_access_token: str = ""
     pharmacist_line_channel_secret: str = ""
     # Google Sheets設定
     google_sheets_credentials_file: str = "credentials.json"
     spreadsheet_id: str = ""
+    # 依頼情報から店舗を特定できない場合の応募通知先（サンライズ薬局のuser_id）
+    default_store_user_id: str = "U37da00c3f064eb4acc037aa8ec6ea79e"
     # Redis設定
     redis_url: str = "redis://localhost:6379"
     # データベース設定
@@ -22,18 +28,21 @@ class PharmacistBotSettings(BaseSettings):
     host: str = "0.0.0.0"
     port: int = 8002
     
-    # 本番環境判定
-    @property
+    # 本番環境判定（初回アクセス時に計算してキャッシュ）
+    @cached_property
     def is_production(self) -> bool:
         return self.environment.lower() == "production"
     
-    # 開発環境判定
-    @property
+    # 開発環境判定（初回アクセス時に計算してキャッシュ）
+    @cached_property
     def is_development(self) -> bool:
         return self.environment.lower() == "development"
-    
-    class Config:
-        env_file = ".env"
 
 
-pharmacist_settings = PharmacistBotSettings() 
\ No newline at end of file
+@lru_cache(maxsize=None)
+def get_pharmacist_settings() -> PharmacistBotSettings:
+    """薬剤師Bot設定を取得（プロセス内で同一インスタンスを返す）"""
+    return PharmacistBotSettings()
+
+
+pharmacist_settings = get_pharmacist_settings() 
\ No newline at end of file
@@ -1,21 +1,31 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 import logging
 
-from pharmacist_bot.api.webhook import router as pharmacist_webhook_router
+from pharmacist_bot.api.webhook import (
+    router as pharmacist_webhook_router,
+    pharmacist_event_deduplicator,
+    application_record_batcher,
+)
 from pharmacist_bot.config import pharmacist_settings
+from shared.services.request_manager import request_manager
+from shared.services.line_http_client import line_push_executor
 
 # ログ設定
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
+# デバッグ出力は開発時のみ有効にする
+logging.getLogger("pharmacist_bot").setLevel(logging.DEBUG if pharmacist_settings.debug else logging.INFO)
 
 # FastAPIアプリケーション作成
 app = FastAPI(
     title="薬局シフト管理Bot（薬剤師版）",
     description="薬局の勤務依頼受信・応募を効率化するLINE Bot",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS設定
@@ -30,6 +40,13 @@ app.add_middleware(
 # ルーターの追加
 app.include_router(pharmacist_webhook_router)
 
+@app.on_event("shutdown")
+def flush_background_tasks():
+    # 未処理のGoogle Sheets書き込みを完了させてから終了
+    application_record_batcher.join()
+    # 送信待ちのLINE通知を完了させる
+    line_push_executor.shutdown(wait=True)
+
 @app.get("/")
 async def root():
     return {
@@ -42,11 +59,21 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def metrics():
+    return {
+        "request_manager": request_manager.get_stats(),
+        "event_deduplicator": pharmacist_event_deduplicator.get_stats()
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
         "pharmacist_bot.main:app",
         host=pharmacist_settings.host,
         port=pharmacist_settings.port,
-        reload=pharmacist_settings.debug
+        loop="uvloop",
+        http="httptools",
+        # 自動リロードは開発環境のみ
+        reload=pharmacist_settings.is_development
     ) 
\ No newline at end of file
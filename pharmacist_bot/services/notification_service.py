@@ -1,7 +1,7 @@
 import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime, date
-from shared.services.google_sheets_service import GoogleSheetsService
+from shared.services.google_sheets_service import get_google_sheets_service
 from pharmacist_bot.services.line_bot_service import pharmacist_line_bot_service
 from linebot.models import (
     TextSendMessage,
@@ -15,55 +15,45 @@ logger = logging.getLogger(__name__)
 
 class PharmacistNotificationService:
     def __init__(self):
-        self.google_sheets_service = GoogleSheetsService()
+        self.google_sheets_service = get_google_sheets_service()
         logger.info("Pharmacist notification service initialized")
 
     def notify_pharmacists_of_request(self, pharmacists: List[Dict[str, Any]], 
                                     request_data: Dict[str, Any], 
                                     request_id: str) -> Dict[str, Any]:
-        """薬剤師に勤務依頼を通知"""
+        """薬剤師に勤務依頼を通知（同じ依頼文をmulticastでまとめて送信）"""
         try:
             total_pharmacists = len(pharmacists)
             notified_count = 0
             failed_count = 0
             failed_pharmacists = []
             
+            recipients = []
             for pharmacist in pharmacists:
                 user_id = pharmacist.get("user_id", "")
                 pharmacist_name = pharmacist.get("name", "薬剤師")
                 
                 # 無効なユーザーIDの場合はスキップ
-                if not user_id or user_id == "":
+                if not user_id:
                     logger.info(f"Skipping notification for pharmacist {pharmacist_name} (invalid user ID: {user_id})")
                     continue
-                
-                try:
-                    # 通知メッセージを作成
-                    notification_sent = self._send_shift_notification(
-                        user_id, 
-                        pharmacist_name, 
-                        request_data, 
-                        request_id
-                    )
-                    
-                    if notification_sent:
-                        notified_count += 1
-                        logger.info(f"Successfully notified pharmacist: {pharmacist_name}")
-                    else:
+                recipients.append((user_id, pharmacist_name))
+            
+            if recipients:
+                template = self._build_shift_notification(request_data, request_id)
+                # 全宛先を一度に渡し（分割・並行送信はmulticast_message側）、失敗した宛先の薬剤師名を記録
+                failed_chunks = pharmacist_line_bot_service.multicast_message(
+                    [user_id for user_id, _ in recipients], template
+                )
+                failed_user_ids = {user_id for chunk in failed_chunks for user_id in chunk}
+                for user_id, name in recipients:
+                    if user_id in failed_user_ids:
                         failed_count += 1
-                        failed_pharmacists.append({
-                            "name": pharmacist_name,
-                            "reason": "Notification failed"
-                        })
-                        logger.error(f"Failed to notify pharmacist: {pharmacist_name}")
-                        
-                except Exception as e:
-                    failed_count += 1
-                    failed_pharmacists.append({
-                        "name": pharmacist_name,
-                        "reason": str(e)
-                    })
-                    logger.error(f"Error sending notification to pharmacist {pharmacist_name}: {e}")
+                        failed_pharmacists.append({"name": name, "reason": "Notification failed"})
+                    else:
+                        notified_count += 1
+                if failed_count:
+                    logger.error(f"Failed to notify {failed_count} pharmacists")
             
             result = {
                 "total_pharmacists": total_pharmacists,
@@ -88,60 +78,43 @@ class PharmacistNotificationService:
                 "failed_pharmacists": [{"name": p.get("name", "薬剤師"), "reason": str(e)} for p in pharmacists]
             }
 
-    def _send_shift_notification(self, user_id: str, pharmacist_name: str, 
-                                request_data: Dict[str, Any], request_id: str) -> bool:
-        """個別の薬剤師にシフト通知を送信"""
-        try:
-            # 通知メッセージを作成
-            date_text = request_data.get("date_text", "未指定")
-            time_text = request_data.get("time_text", "未指定")
-            count_text = request_data.get("count_text", "未指定")
-            
-            message_text = (
-                f"💼 勤務依頼が届きました！\n\n"
-                f"📅 勤務日: {date_text}\n"
-                f"⏰ 時間帯: {time_text}\n"
-                f"👥 必要人数: {count_text}\n"
-                f"🆔 依頼ID: {request_id}\n\n"
-                f"ご応募をご検討ください。"
-            )
-            
-            # ボタンテンプレートを作成
-            template = TemplateSendMessage(
-                alt_text="勤務依頼",
-                template=ButtonsTemplate(
-                    title="勤務依頼",
-                    text=message_text,
-                    actions=[
-                        PostbackAction(
-                            label="応募する",
-                            data=f"pharmacist_apply:{request_id}"
-                        ),
-                        PostbackAction(
-                            label="辞退する",
-                            data=f"pharmacist_decline:{request_id}"
-                        ),
-                        PostbackAction(
-                            label="詳細を確認",
-                            data=f"pharmacist_details:{request_id}"
-                        )
-                    ]
-                )
+    def _build_shift_notification(self, request_data: Dict[str, Any], request_id: str) -> TemplateSendMessage:
+        """薬剤師に送るシフト通知（全員共通）を作成"""
+        date_text = request_data.get("date_text", "未指定")
+        time_text = request_data.get("time_text", "未指定")
+        count_text = request_data.get("count_text", "未指定")
+        
+        message_text = (
+            f"💼 勤務依頼が届きました！\n\n"
+            f"📅 勤務日: {date_text}\n"
+            f"⏰ 時間帯: {time_text}\n"
+            f"👥 必要人数: {count_text}\n"
+            f"🆔 依頼ID: {request_id}\n\n"
+            f"ご応募をご検討ください。"
+        )
+        
+        # ボタンテンプレートを作成
+        return TemplateSendMessage(
+            alt_text="勤務依頼",
+            template=ButtonsTemplate(
+                title="勤務依頼",
+                text=message_text,
+                actions=[
+                    PostbackAction(
+                        label="応募する",
+                        data=f"pharmacist_apply:{request_id}"
+                    ),
+                    PostbackAction(
+                        label="辞退する",
+                        data=f"pharmacist_decline:{request_id}"
+                    ),
+                    PostbackAction(
+                        label="詳細を確認",
+                        data=f"pharmacist_details:{request_id}"
+                    )
+                ]
             )
-            
-            # メッセージを送信
-            success = pharmacist_line_bot_service.send_template_message(user_id, template)
-            
-            if success:
-                logger.info(f"Sent shift notification to {pharmacist_name} ({user_id})")
-                return True
-            else:
-                logger.error(f"Failed to send shift notification to {pharmacist_name} ({user_id})")
-                return False
-                
-        except Exception as e:
-            logger.error(f"Error sending shift notification to {pharmacist_name}: {e}")
-            return False
+        )
 
     def handle_pharmacist_response(self, user_id: str, pharmacist_name: str, 
                                  response_type: str, request_id: str) -> Dict[str, Any]:
@@ -3,13 +3,13 @@
 薬剤師Bot独立起動スクリプト
 """
 import uvicorn
-import os
 from pharmacist_bot.main import app
+from pharmacist_bot.config import pharmacist_settings
 
 if __name__ == "__main__":
-    # Railwayの環境変数に対応
-    port = int(os.getenv("PORT", 8002))
-    host = os.getenv("HOST", "0.0.0.0")
+    # RailwayのPORT/HOST環境変数は設定クラスが読み込み済み
+    port = pharmacist_settings.port
+    host = pharmacist_settings.host
     
     print(f"🚀 薬剤師Botを起動中...")
     print(f"📍 ホスト: {host}")
@@ -20,5 +20,8 @@ if __name__ == "__main__":
         "pharmacist_bot.main:app",
         host=host,
         port=port,
-        reload=True
+        loop="uvloop",
+        http="httptools",
+        # 自動リロードは開発環境のみ
+        reload=pharmacist_settings.is_development
     ) 
\ No newline at end of file
@@ -3,13 +3,14 @@
 店舗Bot独立起動スクリプト
 """
 import uvicorn
-import os
 from store_bot.main import app
+from store_bot.config import get_store_settings
 
 if __name__ == "__main__":
-    # Railwayの環境変数に対応
-    port = int(os.getenv("PORT", 8001))
-    host = os.getenv("HOST", "0.0.0.0")
+    store_settings = get_store_settings()
+    # RailwayのPORT/HOST環境変数は設定クラスが読み込み済み
+    port = store_settings.port
+    host = store_settings.host
     
     print(f"🏪 店舗Botを起動中...")
     print(f"📍 ホスト: {host}")
@@ -20,5 +21,8 @@ if __name__ == "__main__":
         "store_bot.main:app",
         host=host,
         port=port,
-        reload=True
+        loop="uvloop",
+        http="httptools",
+        # 自動リロードは開発環境のみ
+        reload=store_settings.is_development
     ) 
\ No newline at end of file
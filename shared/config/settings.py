@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 from typing import Optional
 from pydantic_settings import BaseSettings
 
@@ -45,5 +46,11 @@ class Settings(BaseSettings):
         env_file = ".env"
 
 
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """共有設定を取得（環境変数・.envの読み込みはプロセス内で一度だけ）"""
+    return Settings()
+
+
 # 共有設定インスタンス
-shared_settings = Settings() 
\ No newline at end of file
+shared_settings = get_settings() 
\ No newline at end of file
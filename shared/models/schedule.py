@@ -1,6 +1,6 @@
+from dataclasses import dataclass
 from datetime import datetime, date
 from typing import Optional, List
-from pydantic import BaseModel, Field
 from enum import Enum
 
 
@@ -17,36 +17,52 @@ class ResponseStatus(str, Enum):
     CONDITIONAL = "conditional"
 
 
-class ShiftRequest(BaseModel):
+# Bot内部でのみ受け渡すモデルのため、Pydanticの検証を通さないdataclassで定義する
+# （HTTP APIの入出力はapp.models.scheduleのPydanticモデルを使用）
+@dataclass(slots=True)
+class ShiftRequest:
     id: str
     store_id: str
     date: date
     time_slot: TimeSlot
-    required_count: int = Field(ge=1, le=3)
-    notes: Optional[str] = None
-    status: str = "pending"  # pending, processing, completed, cancelled
+    required_count: int
     created_at: datetime
     updated_at: datetime
+    notes: Optional[str] = None
+    status: str = "pending"  # pending, processing, completed, cancelled
+
+    def __post_init__(self):
+        self.time_slot = TimeSlot(self.time_slot)
+        if not 1 <= self.required_count <= 3:
+            raise ValueError(f"required_count must be between 1 and 3: {self.required_count}")
 
 
-class PharmacistResponse(BaseModel):
+@dataclass(slots=True)
+class PharmacistResponse:
     id: str
     shift_request_id: str
     pharmacist_id: str
     response: ResponseStatus
-    conditions: Optional[str] = None
     response_time: datetime
     created_at: datetime
+    conditions: Optional[str] = None
+
+    def __post_init__(self):
+        self.response = ResponseStatus(self.response)
 
 
-class Schedule(BaseModel):
+@dataclass(slots=True)
+class Schedule:
     id: str
     shift_request_id: str
     pharmacist_id: str
     store_id: str
     date: date
     time_slot: TimeSlot
+    created_at: datetime
+    updated_at: datetime
     notes: Optional[str] = None
     status: str = "confirmed"  # confirmed, completed, cancelled
-    created_at: datetime
-    updated_at: datetime 
\ No newline at end of file
+
+    def __post_init__(self):
+        self.time_slot = TimeSlot(self.time_slot) 
\ No newline at end of file
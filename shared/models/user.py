@@ -1,6 +1,6 @@
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Optional, List
-from pydantic import BaseModel, Field
 from enum import Enum
 
 
@@ -10,7 +10,10 @@ class UserType(str, Enum):
     ADMIN = "admin"
 
 
-class User(BaseModel):
+# Bot内部でのみ受け渡すモデルのため、Pydanticの検証を通さないdataclassで定義する
+# （HTTP APIの入出力はapp.models.userのPydanticモデルを使用）
+@dataclass(slots=True)
+class User:
     id: str
     line_user_id: str
     user_type: UserType
@@ -20,27 +23,29 @@ class User(BaseModel):
     is_active: bool = True
 
 
-class Store(BaseModel):
+@dataclass(slots=True)
+class Store:
     id: str
     user_id: str
     store_number: str
     store_name: str
+    created_at: datetime
+    updated_at: datetime
     address: Optional[str] = None
     phone: Optional[str] = None
     contact_person: Optional[str] = None
-    created_at: datetime
-    updated_at: datetime
 
 
-class Pharmacist(BaseModel):
+@dataclass(slots=True)
+class Pharmacist:
     id: str
     user_id: str
     name: str
+    created_at: datetime
+    updated_at: datetime
     phone: Optional[str] = None
     email: Optional[str] = None
-    preferred_areas: List[str] = []
-    preferred_time_slots: List[str] = []
+    preferred_areas: List[str] = field(default_factory=list)
+    preferred_time_slots: List[str] = field(default_factory=list)
     priority_level: int = 1  # 1: 高, 2: 中, 3: 低
     is_available: bool = True
-    created_at: datetime
-    updated_at: datetime 
\ No newline at end of file
@@ -0,0 +1,61 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List
+
+logger = logging.getLogger(__name__)
+
+
+class BatchWorker:
+    """キューに積まれた項目を件数または時間で区切ってまとめて処理するワーカー"""
+
+    def __init__(self, name: str, handler: Callable[[List[Any]], Any],
+                 max_batch_size: int = 20, flush_interval: float = 0.5):
+        self.name = name
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        logger.info("Batch worker started: %s", name)
+
+    def add(self, item: Any) -> "Future[bool]":
+        """項目をキューに積む（呼び出し元はすぐに戻る）
+
+        Returns:
+            項目を含むバッチの処理が終わると完了するFuture（成功時True）。
+            書き込み結果を確認してから応答する処理だけが待てばよい。
+        """
+        future: "Future[bool]" = Future()
+        self._queue.put((item, future))
+        return future
+
+    def join(self):
+        """キューに積まれた項目がすべて処理されるまで待つ"""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            # 最初の1件が届いてからflush_interval秒、またはmax_batch_size件まで集める
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            # ハンドラーが例外を送出するかFalseを返した場合はバッチ全体を失敗とする
+            try:
+                succeeded = self.handler([item for item, _ in batch]) is not False
+            except Exception as e:
+                logger.error("[%s] Batch of %d items failed: %s", self.name, len(batch), e)
+                succeeded = False
+            for _, future in batch:
+                future.set_result(succeeded)
+                self._queue.task_done()
@@ -0,0 +1,66 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class EventDeduplicator:
+    """処理済みWebhookイベントを一定時間記録し、LINEの再送による二重処理を防ぐ"""
+
+    def __init__(self, ttl_seconds: float = 300, maxsize: int = 10_000):
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+        self._seen: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def event_key(event) -> Optional[Hashable]:
+        """イベントの重複判定キーを取得（webhook_event_idがなければ内容から組み立てる）"""
+        webhook_event_id = getattr(event, 'webhook_event_id', None)
+        if webhook_event_id:
+            return webhook_event_id
+        reply_token = getattr(event, 'reply_token', None)
+        if not reply_token:
+            return None
+        user_id = getattr(event.source, 'user_id', None) if event.source else None
+        postback = getattr(event, 'postback', None)
+        return (user_id, postback.data if postback else None, reply_token)
+
+    def is_duplicate(self, event) -> bool:
+        """処理済みのイベントならTrue、初回ならキーを記録してFalseを返す"""
+        key = self.event_key(event)
+        if key is None:
+            return False
+
+        now = time.monotonic()
+        with self._lock:
+            # 期限切れのキーを古い順に削除
+            while self._seen:
+                if next(iter(self._seen.values())) > now:
+                    break
+                self._seen.popitem(last=False)
+
+            if key in self._seen:
+                self.hits += 1
+                return True
+
+            self.misses += 1
+            self._seen[key] = now + self.ttl_seconds
+            if len(self._seen) > self.maxsize:
+                self._seen.popitem(last=False)
+            return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """重複判定の統計を取得"""
+        with self._lock:
+            size = len(self._seen)
+        return {
+            "duplicates": self.hits,
+            "unique": self.misses,
+            "size": size,
+        }
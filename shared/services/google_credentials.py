@@ -0,0 +1,47 @@
+import os
+from functools import lru_cache
+import httplib2
+import orjson
+from google.oauth2.service_account import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build, build_from_document
+
+# Sheets APIの応答を待つ秒数（応答がないまま処理スレッドを占有し続けないようにする）
+SHEETS_HTTP_TIMEOUT = 10
+
+
+@lru_cache(maxsize=1)
+def load_sheets_credentials() -> Credentials:
+    """Google Sheets用のサービスアカウント認証情報を一度だけ読み込んで使い回す
+
+    GOOGLE_SHEETS_CREDENTIALS_JSONがあればその内容を、なければcredentials.jsonを使う。
+    読み込みに失敗した場合はキャッシュされず、次の呼び出しで再試行する。
+    """
+    credentials_json = os.environ.get("GOOGLE_SHEETS_CREDENTIALS_JSON")
+    if credentials_json:
+        return Credentials.from_service_account_info(orjson.loads(credentials_json))
+    return Credentials.from_service_account_file("credentials.json")
+
+
+@lru_cache(maxsize=1)
+def _load_sheets_discovery_doc() -> bytes:
+    """googleapiclientに同梱されているSheets v4のディスカバリードキュメントを一度だけ読み込む"""
+    content = discovery_cache.get_static_doc("sheets", "v4")
+    return content.encode() if content else b""
+
+
+def build_sheets_service(credentials: Credentials):
+    """Google Sheets APIサービスを作成
+
+    ディスカバリードキュメントはプロセス内で一度だけ読み込み、作成のたびに
+    orjsonで展開する（googleapiclientが展開結果を書き換えるため共有しない）。
+    httplib2.Httpはスレッドセーフではないため、サービス自体は呼び出し元で
+    スレッドごとに保持する。サービスごとに認証済みのHttpを一つ持ち、
+    同じスレッドの呼び出しではTLS接続をkeep-aliveで再利用する。
+    """
+    http = AuthorizedHttp(credentials, http=httplib2.Http(timeout=SHEETS_HTTP_TIMEOUT))
+    discovery_doc = _load_sheets_discovery_doc()
+    if not discovery_doc:
+        return build('sheets', 'v4', http=http, cache_discovery=False)
+    return build_from_document(orjson.loads(discovery_doc), http=http)
@@ -1,120 +1,272 @@
-import os
-import json
+import re
+import sys
+import threading
+import time
 from typing import List, Dict, Optional, Tuple, Any
 from datetime import datetime, date
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 import logging
+from functools import lru_cache
+from cachetools import TTLCache
 
 from shared.config.settings import shared_settings
-from shared.models.schedule import Schedule, TimeSlot
+from shared.models.schedule import Schedule, TimeSlot, ShiftRequest
 from shared.models.user import Store, Pharmacist
+from shared.utils.sheet_columns import column_letter
+from shared.utils.clock import today_date
+from shared.services.pharmacist_registry import pharmacist_registry
+from shared.services.google_credentials import load_sheets_credentials, build_sheets_service
 
 logger = logging.getLogger(__name__)
 
+# スケジュール欄の勤務不可キーワード（「勤務不可」は「不可」に含まれる）
+_UNAVAILABLE_RE = re.compile("×|休み|不可")
+
+# シートの行・列の配置（薬剤師の行番号、日付の列番号）を使い回す秒数
+SHEET_LAYOUT_CACHE_TTL = 60
+# 日付の列番号を使い回す秒数（ヘッダー行は月ごとのシート作成時にしか変わらない）
+DAY_COLUMN_CACHE_TTL = 600
+# 空き薬剤師の検索結果を(日付, 時間帯)ごとに使い回す秒数と最大件数（同じ枠への依頼が続いたときにシートを読み直さない）
+AVAILABLE_PHARMACISTS_CACHE_TTL = 30
+AVAILABLE_PHARMACISTS_CACHE_SIZE = 256
+
+# postbackの時間帯 → モックデータのavailabilityの値
+_SLOT_MAP: Dict[str, str] = {
+    "time_morning": "morning",
+    "time_afternoon": "afternoon",
+    "time_evening": "evening",
+    "time_full_day": "full_day",
+}
+
+# 開発用のモック薬剤師データ（呼び出しごとに組み立て直さない）
+_MOCK_PHARMACISTS: Tuple[Dict[str, Any], ...] = (
+    {
+        "id": "pharm_001",
+        "user_id": "",  # 開発用: 空文字列でスキップ
+        "name": "田中薬剤師",
+        "phone": "090-1234-5678",
+        "availability": ["morning", "afternoon"],
+        "rating": 4.5,
+        "experience_years": 5
+    },
+    {
+        "id": "pharm_002",
+        "user_id": "",  # 開発用: 空文字列でスキップ
+        "name": "佐藤薬剤師",
+        "phone": "090-2345-6789",
+        "availability": ["afternoon", "evening"],
+        "rating": 4.2,
+        "experience_years": 3
+    },
+    {
+        "id": "pharm_003",
+        "user_id": "",  # 開発用: 空文字列でスキップ
+        "name": "鈴木薬剤師",
+        "phone": "090-3456-7890",
+        "availability": ["morning", "full_day"],
+        "rating": 4.8,
+        "experience_years": 7
+    },
+)
+
+
+@lru_cache(maxsize=64)
+def _sheet_name_for(target_date: date) -> str:
+    """日付からシート名を生成（同じ日付の変換結果は使い回す）"""
+    return target_date.strftime("%Y-%m")
+
 
 class GoogleSheetsService:
     def __init__(self):
         self.credentials = None
-        self.service = None
+        # googleapiclientが使うhttplib2.Httpはスレッドセーフではないため、
+        # APIサービスはスレッドごとに作成して使い回す
+        self._thread_local = threading.local()
+        self._shared_service = None
         self.spreadsheet_id = shared_settings.spreadsheet_id
+        # シート名ごとの (読み込み時刻, 薬剤師ID→行番号)
+        self._pharmacist_row_cache: Dict[str, Tuple[float, Dict[str, int]]] = {}
+        # シート名ごとの (読み込み時刻, "月/日"→列番号)
+        self._day_column_cache: Dict[str, Tuple[float, Dict[str, int]]] = {}
+        # (日付, 時間帯) → 空き薬剤師一覧（Webhookはスレッドプールで処理されるためロックで保護する）
+        self._available_cache: "TTLCache[Tuple[date, str], List[Dict[str, Any]]]" = TTLCache(
+            maxsize=AVAILABLE_PHARMACISTS_CACHE_SIZE, ttl=AVAILABLE_PHARMACISTS_CACHE_TTL
+        )
+        self._available_lock = threading.Lock()
         self._initialize_service()
 
     def _initialize_service(self):
         """Google Sheets APIサービスの初期化"""
         try:
-            credentials_json = os.environ.get("GOOGLE_SHEETS_CREDENTIALS_JSON")
-            if credentials_json:
-                creds = Credentials.from_service_account_info(json.loads(credentials_json))
-            else:
-                creds = Credentials.from_service_account_file("credentials.json")
-            
-            self.service = build('sheets', 'v4', credentials=creds)
+            # 認証情報はプロセス内で一度だけ読み込み、全インスタンスで共有する
+            self.credentials = load_sheets_credentials()
+            # 初期化時に一度作成し、認証情報とAPI定義に問題がないことを確認する
+            self._thread_local.service = self._build_service()
             logger.info("Google Sheets API service initialized successfully")
             
         except Exception as e:
-            logger.error(f"Failed to initialize Google Sheets service: {e}")
+            logger.error("Failed to initialize Google Sheets service: %s", e)
             raise
 
+    def _build_service(self):
+        return build_sheets_service(self.credentials)
+
+    @property
+    def service(self):
+        """呼び出し元スレッド専用のGoogle Sheets APIサービス（認証情報がなければNone）"""
+        if self._shared_service is not None:
+            return self._shared_service
+        service = getattr(self._thread_local, 'service', None)
+        if service is None and self.credentials is not None:
+            service = self._build_service()
+            self._thread_local.service = service
+        return service
+
+    @service.setter
+    def service(self, value):
+        # 明示的に設定したサービスは全スレッドで共有する
+        self._shared_service = value
+
     def get_sheet_name(self, target_date: date) -> str:
         """日付からシート名を生成（例：2025-06）"""
-        return target_date.strftime("%Y-%m")
+        return _sheet_name_for(target_date)
 
     def get_available_pharmacists(self, target_date: date, time_slot: str) -> List[Dict[str, Any]]:
-        """指定日時で空きのある薬剤師を取得"""
+        """指定日時で空きのある薬剤師を取得
+
+        シートから読み込んだ結果は(日付, 時間帯)ごとに短時間キャッシュする（モックデータはキャッシュしない）。
+        """
+        key = (target_date, time_slot)
+        with self._available_lock:
+            cached = self._available_cache.get(key)
+        if cached is not None:
+            return list(cached)
+        available_pharmacists = self._read_available_pharmacists(target_date, time_slot)
+        if available_pharmacists is None:
+            return self._get_mock_pharmacists(target_date, time_slot)
+        with self._available_lock:
+            self._available_cache[key] = available_pharmacists
+        return list(available_pharmacists)
+
+    def invalidate_available_pharmacists(self, target_date: Optional[date] = None):
+        """シフトの割り当てが変わったときに空き薬剤師の検索結果を破棄（日付の指定がなければ全件）"""
+        with self._available_lock:
+            if target_date is None:
+                self._available_cache.clear()
+                return
+            for key in [key for key in self._available_cache if key[0] == target_date]:
+                self._available_cache.pop(key, None)
+
+    def _read_available_pharmacists(self, target_date: date, time_slot: str) -> Optional[List[Dict[str, Any]]]:
+        """シートから指定日時で空きのある薬剤師を読み込む（読み込めなければNone）"""
         try:
             if not self.service:
                 logger.warning("Google Sheets service not available, using mock data")
-                return self._get_mock_pharmacists(target_date, time_slot)
+                return None
             
             # 実際のGoogle Sheetsからデータを取得
             sheet_name = self.get_sheet_name(target_date)
-            day_column = self._get_day_column(target_date, sheet_name)
             
-            # 薬剤師リストとスケジュールを取得
-            pharmacists = self._get_pharmacist_list(sheet_name)
+            if self._cached_day_columns(sheet_name) is not None and pharmacist_registry.is_fresh(sheet_name):
+                # 列の配置と薬剤師一覧が手元にあれば、指定日の列だけを読み込む
+                day_column = self._get_day_column(target_date, sheet_name)
+                pharmacists = pharmacist_registry.list_active(self, sheet_name)
+                last_row = max((p["row_number"] for p in pharmacists), default=1)
+                schedule_data = self.service.spreadsheets().values().get(
+                    spreadsheetId=self.spreadsheet_id,
+                    range=f"{sheet_name}!{column_letter(day_column)}2:{column_letter(day_column)}{last_row}"
+                ).execute()
+                schedule_rows = schedule_data.get('values', [])
+                day_index = 0
+            else:
+                # ヘッダー行・薬剤師一覧・スケジュールを1回のbatchGetでまとめて読み込む
+                schedule_rows = self._read_sheet_rows(sheet_name)
+                day_column = self._get_day_column(target_date, sheet_name)
+                pharmacists = pharmacist_registry.list_active(self, sheet_name)
+                day_index = day_column
+            
             if not pharmacists:
                 logger.warning("No pharmacists found in sheet")
-                return self._get_mock_pharmacists(target_date, time_slot)
-            
-            # 指定日のスケジュールを取得
-            schedule_range = f"{sheet_name}!{chr(65 + day_column)}2:{chr(65 + day_column)}{len(pharmacists) + 1}"
-            schedule_data = self.service.spreadsheets().values().get(
-                spreadsheetId=self.spreadsheet_id,
-                range=schedule_range
-            ).execute()
-            
-            schedules = schedule_data.get('values', [])
+                return None
             
-            # 空き薬剤師をフィルタリング
-            available_pharmacists = []
-            for i, pharmacist in enumerate(pharmacists):
-                schedule = schedules[i][0] if i < len(schedules) and schedules[i] else ""
-                
-                if self._is_available_for_schedule(schedule, time_slot):
-                    available_pharmacists.append(pharmacist)
+            # 勤務不可の行番号を指定日の列から一度に拾い、薬剤師は行番号の集合で振り分ける
+            unavailable = _UNAVAILABLE_RE.search
+            unavailable_rows = {
+                i + 2 for i, row in enumerate(schedule_rows)
+                if day_index < len(row) and unavailable(row[day_index])
+            }
+            available_pharmacists = [
+                pharmacist for pharmacist in pharmacists
+                if pharmacist["row_number"] not in unavailable_rows
+            ]
             
-            logger.info(f"Found {len(available_pharmacists)} available pharmacists for {target_date} {time_slot}")
+            logger.info("Found %d available pharmacists for %s %s", len(available_pharmacists), target_date, time_slot)
             return available_pharmacists
             
         except Exception as e:
-            logger.error(f"Error getting available pharmacists: {e}")
-            # エラー時はモックデータを返す
-            return self._get_mock_pharmacists(target_date, time_slot)
+            logger.error("Error getting available pharmacists: %s", e)
+            # エラー時は呼び出し元でモックデータを返す
+            return None
     
     def _get_pharmacist_list(self, sheet_name: str) -> List[Dict[str, Any]]:
         """薬剤師リストを取得"""
         try:
             # 薬剤師情報の範囲を取得（A列: 名前, B列: LINE ID, C列: 電話番号, D列: user_type）
             range_name = f"{sheet_name}!A2:D100"  # 最大100名まで
+            # 末尾の空行はAPI側で省かれるため、応答からrange等のメタデータだけを除く
             result = self.service.spreadsheets().values().get(
                 spreadsheetId=self.spreadsheet_id,
-                range=range_name
+                range=range_name,
+                fields='values'
             ).execute()
             
-            values = result.get('values', [])
-            pharmacists = []
-            
-            for i, row in enumerate(values):
-                if len(row) >= 1 and row[0].strip():  # 名前が存在する場合
-                    pharmacist = {
-                        "id": f"pharm_{i+1:03d}",
-                        "name": row[0].strip(),
-                        "user_id": row[1].strip() if len(row) > 1 else "",
-                        "phone": row[2].strip() if len(row) > 2 else "",
-                        "user_type": row[3].strip() if len(row) > 3 else "pharmacist",  # デフォルトはpharmacist
-                        "row_number": i + 2  # 実際の行番号（ヘッダー行を考慮）
-                    }
-                    pharmacists.append(pharmacist)
-            
-            logger.info(f"Found {len(pharmacists)} pharmacists in sheet {sheet_name}")
+            pharmacists = self._parse_pharmacist_rows(result.get('values', []))
+            logger.info("Found %d pharmacists in sheet %s", len(pharmacists), sheet_name)
             return pharmacists
             
         except Exception as e:
-            logger.error(f"Error getting pharmacist list: {e}")
+            logger.error("Error getting pharmacist list: %s", e)
             return []
 
+    @staticmethod
+    def _parse_pharmacist_rows(values: List[List[str]]) -> List[Dict[str, Any]]:
+        """2行目以降の行データから薬剤師リストを作成"""
+        pharmacists = []
+        for i, row in enumerate(values):
+            if len(row) >= 1 and row[0].strip():  # 名前が存在する場合
+                pharmacist = {
+                    "id": sys.intern(f"pharm_{i+1:03d}"),
+                    "name": sys.intern(row[0].strip()),
+                    "user_id": row[1].strip() if len(row) > 1 else "",
+                    "phone": row[2].strip() if len(row) > 2 else "",
+                    "user_type": row[3].strip() if len(row) > 3 else "pharmacist",  # デフォルトはpharmacist
+                    "row_number": i + 2  # 実際の行番号（ヘッダー行を考慮）
+                }
+                pharmacists.append(pharmacist)
+        return pharmacists
+
+    def _read_sheet_rows(self, sheet_name: str) -> List[List[str]]:
+        """ヘッダー行と薬剤師の行を1回のbatchGetで読み込み、列・薬剤師一覧のキャッシュを更新
+
+        Returns:
+            2行目以降の行データ（A列始まり）
+        """
+        result = self.service.spreadsheets().values().batchGet(
+            spreadsheetId=self.spreadsheet_id,
+            ranges=[f"{sheet_name}!1:1", f"{sheet_name}!A2:ZZ100"],
+            majorDimension='ROWS',
+            fields='valueRanges(values)'
+        ).execute()
+        value_ranges = result.get('valueRanges', [])
+        header_values = value_ranges[0].get('values', []) if value_ranges else []
+        rows = value_ranges[1].get('values', []) if len(value_ranges) > 1 else []
+        
+        self._store_day_columns(sheet_name, header_values[0] if header_values else [])
+        pharmacists = self._parse_pharmacist_rows(rows)
+        pharmacist_registry.prime(sheet_name, pharmacists)
+        logger.info("Found %d pharmacists in sheet %s", len(pharmacists), sheet_name)
+        return rows
+
     def get_user_type_from_sheets(self, user_id: str) -> Optional[str]:
         """Google Sheetsからuser_typeを取得"""
         try:
@@ -123,27 +275,27 @@ class GoogleSheetsService:
                 return None
             
             # 薬剤師リストから検索
-            today = datetime.now().date()
+            today = today_date()
             sheet_name = self.get_sheet_name(today)
             pharmacists = self._get_pharmacist_list(sheet_name)
             
             for pharmacist in pharmacists:
                 if pharmacist["user_id"] == user_id:
-                    logger.info(f"Found user_type in pharmacist list: {pharmacist['user_type']}")
+                    logger.info("Found user_type in pharmacist list: %s", pharmacist['user_type'])
                     return pharmacist["user_type"]
             
             # 店舗リストから検索
             stores = self.get_store_list("店舗登録")
             for store in stores:
                 if store["user_id"] == user_id:
-                    logger.info(f"Found user_type in store list: store")
+                    logger.info("Found user_type in store list: store")
                     return "store"
             
-            logger.info(f"User type not found for user_id: {user_id}")
+            logger.info("User type not found for user_id: %s", user_id)
             return None
             
         except Exception as e:
-            logger.error(f"Error getting user type from sheets: {e}")
+            logger.error("Error getting user type from sheets: %s", e)
             return None
 
     def set_user_type_in_sheets(self, user_id: str, user_type: str) -> bool:
@@ -154,7 +306,7 @@ class GoogleSheetsService:
                 return False
             
             # 薬剤師リストから検索して更新
-            today = datetime.now().date()
+            today = today_date()
             sheet_name = self.get_sheet_name(today)
             pharmacists = self._get_pharmacist_list(sheet_name)
             
@@ -169,7 +321,7 @@ class GoogleSheetsService:
                         valueInputOption='RAW',
                         body=body
                     ).execute()
-                    logger.info(f"Updated user_type for pharmacist {pharmacist['name']}: {user_type}")
+                    logger.info("Updated user_type for pharmacist %s: %s", pharmacist['name'], user_type)
                     return True
             
             # 店舗リストから検索して更新
@@ -185,14 +337,14 @@ class GoogleSheetsService:
                         valueInputOption='RAW',
                         body=body
                     ).execute()
-                    logger.info(f"Updated user_type for store {store['name']}: {user_type}")
+                    logger.info("Updated user_type for store %s: %s", store['name'], user_type)
                     return True
             
-            logger.warning(f"User not found for user_id: {user_id}")
+            logger.warning("User not found for user_id: %s", user_id)
             return False
             
         except Exception as e:
-            logger.error(f"Error setting user type in sheets: {e}")
+            logger.error("Error setting user type in sheets: %s", e)
             return False
     
     def _is_available_for_schedule(self, schedule: str, time_slot: str) -> bool:
@@ -200,83 +352,25 @@ class GoogleSheetsService:
         if not schedule or schedule.strip() == "":
             return True
         
-        # 勤務不可の場合は利用不可
-        if any(keyword in schedule for keyword in ["勤務不可", "×", "休み", "不可"]):
-            return False
-        
-        # 時間帯のマッピング
-        time_mapping = {
-            "time_morning": ["AM", "午前", "9:00", "9時"],
-            "time_afternoon": ["PM", "午後", "13:00", "13時"],
-            "time_evening": ["夜間", "17:00", "17時"],
-            "time_full_day": ["終日", "フル", "全日"]
-        }
-        
-        requested_keywords = time_mapping.get(time_slot, [])
-        
-        # スケジュールに指定時間帯のキーワードが含まれているかチェック
-        for keyword in requested_keywords:
-            if keyword in schedule:
-                return True
-        
-        # 時間帯が指定されていない場合は利用可能
-        return True
+        # 勤務不可の場合は利用不可、それ以外（時間帯の記載の有無によらず）は利用可能
+        return _UNAVAILABLE_RE.search(schedule) is None
 
     def _get_mock_pharmacists(self, target_date: date, time_slot: str) -> List[Dict[str, Any]]:
         """モック薬剤師データを返す（開発用）"""
-        # 実際の実装では、Google Sheetsから取得したデータを処理
-        mock_pharmacists = [
-            {
-                "id": "pharm_001",
-                "user_id": "",  # 開発用: 空文字列でスキップ
-                "name": "田中薬剤師",
-                "phone": "090-1234-5678",
-                "availability": ["morning", "afternoon"],
-                "rating": 4.5,
-                "experience_years": 5
-            },
-            {
-                "id": "pharm_002", 
-                "user_id": "",  # 開発用: 空文字列でスキップ
-                "name": "佐藤薬剤師",
-                "phone": "090-2345-6789",
-                "availability": ["afternoon", "evening"],
-                "rating": 4.2,
-                "experience_years": 3
-            },
-            {
-                "id": "pharm_003",
-                "user_id": "",  # 開発用: 空文字列でスキップ
-                "name": "鈴木薬剤師", 
-                "phone": "090-3456-7890",
-                "availability": ["morning", "full_day"],
-                "rating": 4.8,
-                "experience_years": 7
-            }
+        # 時間帯に基づいてフィルタリング（定数のdictをコピーせずに返す）
+        available_pharmacists = [
+            pharmacist for pharmacist in _MOCK_PHARMACISTS
+            if self._is_available_for_timeslot(pharmacist, time_slot)
         ]
         
-        # 時間帯に基づいてフィルタリング
-        available_pharmacists = []
-        for pharmacist in mock_pharmacists:
-            if self._is_available_for_timeslot(pharmacist, time_slot):
-                available_pharmacists.append(pharmacist)
-        
-        logger.info(f"Found {len(available_pharmacists)} available pharmacists for {target_date} {time_slot}")
+        logger.info("Found %d available pharmacists for %s %s", len(available_pharmacists), target_date, time_slot)
         return available_pharmacists
     
     def _is_available_for_timeslot(self, pharmacist: Dict[str, Any], time_slot: str) -> bool:
         """薬剤師が指定時間帯で利用可能かチェック"""
         availability = pharmacist.get("availability", [])
         
-        # 時間帯のマッピング
-        time_mapping = {
-            "time_morning": "morning",
-            "time_afternoon": "afternoon", 
-            "time_evening": "evening",
-            "time_full_day": "full_day"
-        }
-        
-        requested_slot = time_mapping.get(time_slot, "")
+        requested_slot = _SLOT_MAP.get(time_slot, "")
         
         # 利用可能かチェック
         if requested_slot == "full_day":
@@ -300,27 +394,19 @@ class GoogleSheetsService:
             # 薬剤師の行を特定
             pharmacist_row = self._find_pharmacist_row(schedule.pharmacist_id, sheet_name)
             if not pharmacist_row:
-                logger.error(f"Pharmacist {schedule.pharmacist_id} not found in sheet")
+                logger.error("Pharmacist %s not found in sheet", schedule.pharmacist_id)
                 return False
             
             # スケジュールを更新
-            range_name = f"{sheet_name}!{chr(65 + day_column)}{pharmacist_row}"
-            body = {
-                'values': [[schedule_entry]]
-            }
-            
-            self.service.spreadsheets().values().update(
-                spreadsheetId=self.spreadsheet_id,
-                range=range_name,
-                valueInputOption='RAW',
-                body=body
-            ).execute()
+            range_name = f"{sheet_name}!{column_letter(day_column)}{pharmacist_row}"
+            self._write_cells([(range_name, schedule_entry)])
+            self.invalidate_available_pharmacists(schedule.target_date)
             
-            logger.info(f"Updated schedule for pharmacist {schedule.pharmacist_id} on {schedule.target_date}")
+            logger.info("Updated schedule for pharmacist %s on %s", schedule.pharmacist_id, schedule.target_date)
             return True
             
         except Exception as e:
-            logger.error(f"Error updating schedule: {e}")
+            logger.error("Error updating schedule: %s", e)
             return False
 
     def _create_schedule_entry(self, schedule: Schedule, store: Store) -> str:
@@ -330,43 +416,68 @@ class GoogleSheetsService:
         end = getattr(schedule, 'end_time_label', None)
         if start and end:
             return f"{start}〜{end} {store.store_name}"
-        time_slot_text = schedule.time_slot.value if hasattr(schedule.time_slot, 'value') else str(schedule.time_slot)
-        return f"{time_slot_text} - {store.store_name}"
+        # time_slotは__post_init__でTimeSlotに変換済み
+        return f"{schedule.time_slot.value} - {store.store_name}"
 
     def _find_pharmacist_row(self, pharmacist_id: str, sheet_name: str) -> Optional[int]:
         """薬剤師の行番号を取得"""
+        now = time.monotonic()
+        cached = self._pharmacist_row_cache.get(sheet_name)
+        if cached and now - cached[0] < SHEET_LAYOUT_CACHE_TTL:
+            return cached[1].get(pharmacist_id)
+
         try:
-            # 薬剤師リストを取得してIDで検索
-            pharmacists = self._get_pharmacist_list(sheet_name)
-            for pharmacist in pharmacists:
-                if pharmacist["id"] == pharmacist_id:
-                    return pharmacist["row_number"]
-            return None
+            # 行番号の特定には名前列（A列）だけあれば十分なので、A列のみ読み込む
+            result = self.service.spreadsheets().values().get(
+                spreadsheetId=self.spreadsheet_id,
+                range=f"{sheet_name}!A2:A100"
+            ).execute()
+            rows = {}
+            for i, row in enumerate(result.get('values', [])):
+                if row and row[0].strip():
+                    # IDと行番号の対応は_get_pharmacist_listと同じ
+                    rows[f"pharm_{i+1:03d}"] = i + 2
+            if rows:
+                self._pharmacist_row_cache[sheet_name] = (now, rows)
+            return rows.get(pharmacist_id)
         except Exception as e:
-            logger.error(f"Error finding pharmacist row: {e}")
+            logger.error("Error finding pharmacist row: %s", e)
             return None
 
     def record_application(self, request_id: str, pharmacist_id: str, pharmacist_name: str, 
                           store_name: str, date: date, time_slot: str) -> bool:
         """応募記録をGoogle Sheetsに記録"""
+        return self.record_applications([{
+            'request_id': request_id,
+            'pharmacist_id': pharmacist_id,
+            'pharmacist_name': pharmacist_name,
+            'store_name': store_name,
+            'date': date,
+            'time_slot': time_slot,
+        }])
+
+    def record_applications(self, applications: List[Dict[str, Any]]) -> bool:
+        """複数の応募記録を1回のAPI呼び出しでGoogle Sheetsに記録"""
         try:
             if not self.service:
                 logger.warning("Google Sheets service not available")
                 return False
             
-            # 応募記録シートに記録
-            record_data = [
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                request_id,
-                pharmacist_id,
-                pharmacist_name,
-                store_name,
-                date.strftime("%Y-%m-%d"),
-                time_slot
-            ]
-            
+            # 応募記録シートに記録（1応募1行）
+            recorded_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             body = {
-                'values': [record_data]
+                'values': [
+                    [
+                        recorded_at,
+                        application['request_id'],
+                        application['pharmacist_id'],
+                        application['pharmacist_name'],
+                        application['store_name'],
+                        application['date'].strftime("%Y-%m-%d"),
+                        application['time_slot']
+                    ]
+                    for application in applications
+                ]
             }
             
             # 応募記録シートに追加（シートが存在しない場合は作成を試行）
@@ -381,7 +492,7 @@ class GoogleSheetsService:
             except Exception as e:
                 if "Unable to parse range" in str(e):
                     # シートが存在しない場合、デフォルトシートに記録
-                    logger.warning(f"ApplicationRecords sheet not found, using default sheet: {e}")
+                    logger.warning("ApplicationRecords sheet not found, using default sheet: %s", e)
                     self.service.spreadsheets().values().append(
                         spreadsheetId=self.spreadsheet_id,
                         range="Sheet1!A:G",  # デフォルトシート名
@@ -392,53 +503,125 @@ class GoogleSheetsService:
                 else:
                     raise e
             
-            logger.info(f"Recorded application for {pharmacist_name} (request: {request_id})")
+            for application in applications:
+                logger.info("Recorded application for %s (request: %s)", application['pharmacist_name'], application['request_id'])
             return True
             
         except Exception as e:
-            logger.error(f"Error recording application: {e}")
+            logger.error("Error recording applications: %s", e)
+            return False
+
+    def record_shift_requests(self, shift_requests: List[ShiftRequest]) -> bool:
+        """複数のシフト依頼を1回のAPI呼び出しでGoogle Sheetsに記録"""
+        try:
+            if not self.service:
+                logger.warning("Google Sheets service not available")
+                return False
+            
+            # 依頼記録シートに記録（1依頼1行）
+            body = {
+                'values': [
+                    [
+                        shift_request.id,
+                        shift_request.store_id,
+                        shift_request.date.strftime("%Y-%m-%d"),
+                        shift_request.time_slot.value,
+                        shift_request.required_count,
+                        shift_request.notes or "",
+                        shift_request.status,
+                        shift_request.created_at.strftime("%Y-%m-%d %H:%M:%S")
+                    ]
+                    for shift_request in shift_requests
+                ]
+            }
+            self.service.spreadsheets().values().append(
+                spreadsheetId=self.spreadsheet_id,
+                range="ShiftRequests!A:H",
+                valueInputOption='RAW',
+                insertDataOption='INSERT_ROWS',
+                body=body
+            ).execute()
+            
+            logger.info("Recorded %d shift request(s)", len(shift_requests))
+            return True
+            
+        except Exception as e:
+            logger.error("Error recording shift requests: %s", e)
             return False
 
     def update_application_status(self, request_id: str, pharmacist_name: str, status: str) -> bool:
         """応募状況を更新"""
+        return self.update_application_statuses([{
+            'request_id': request_id,
+            'pharmacist_name': pharmacist_name,
+            'status': status,
+        }])
+
+    def update_application_statuses(self, updates: List[Dict[str, Any]]) -> bool:
+        """複数の応募状況をまとめて更新（書き込みはvalues.batchUpdateの1リクエストにまとめる）"""
         try:
             if not self.service:
                 logger.warning("Google Sheets service not available")
                 return False
             
             # 応募記録シートから該当レコードを検索して更新
-            # 実際の実装では、より詳細な検索・更新ロジックが必要
-            logger.info(f"Updated application status for {pharmacist_name} (request: {request_id}) to {status}")
+            # 実際の実装では、更新対象のセルを集めて_write_cellsで一度に書き込む
+            for update in updates:
+                logger.info("Updated application status for %s (request: %s) to %s", update['pharmacist_name'], update['request_id'], update['status'])
+            # 確定した応募の日時は応募状況から分からないため、空き薬剤師の検索結果はすべて破棄する
+            self.invalidate_available_pharmacists()
             return True
             
         except Exception as e:
-            logger.error(f"Error updating application status: {e}")
+            logger.error("Error updating application statuses: %s", e)
             return False
 
     def _get_day_column(self, target_date: date, sheet_name: str) -> int:
         """日付から列番号を取得（A列=0, B列=1, ...）"""
-        # 1行目の値を取得
-        result = self.service.spreadsheets().values().get(
-            spreadsheetId=self.spreadsheet_id,
-            range=f"{sheet_name}!1:1"
-        ).execute()
-        header_row = result.get('values', [[]])[0]
+        day_columns = self._cached_day_columns(sheet_name)
+        if day_columns is None:
+            # 1行目の値を取得し、日付→列番号の対応を作る
+            result = self.service.spreadsheets().values().get(
+                spreadsheetId=self.spreadsheet_id,
+                range=f"{sheet_name}!1:1"
+            ).execute()
+            day_columns = self._store_day_columns(sheet_name, result.get('values', [[]])[0])
         # "7/7"形式に変換
         request_date_str = f"{target_date.month}/{target_date.day}"
-        for idx, cell in enumerate(header_row):
-            if cell.strip() == request_date_str:
-                return idx  # 0始まり
+        if request_date_str in day_columns:
+            return day_columns[request_date_str]  # 0始まり
         raise ValueError(f"日付 {request_date_str} がシートに見つかりません")
 
+    def _cached_day_columns(self, sheet_name: str) -> Optional[Dict[str, int]]:
+        """TTL内に読み込んだ"月/日"→列番号の対応を取得（なければNone）"""
+        cached = self._day_column_cache.get(sheet_name)
+        if cached and time.monotonic() - cached[0] < DAY_COLUMN_CACHE_TTL:
+            return cached[1]
+        return None
+
+    def _store_day_columns(self, sheet_name: str, header_row: List[str]) -> Dict[str, int]:
+        """ヘッダー行から"月/日"→列番号の対応を作ってキャッシュ"""
+        day_columns: Dict[str, int] = {}
+        for idx, cell in enumerate(header_row):
+            day_columns.setdefault(cell.strip(), idx)
+        self._day_column_cache[sheet_name] = (time.monotonic(), day_columns)
+        return day_columns
+
+    def _write_cells(self, data: List[Tuple[str, Any]]):
+        """(範囲, 値) のリストをvalues.batchUpdateの1リクエストで書き込む"""
+        self.service.spreadsheets().values().batchUpdate(
+            spreadsheetId=self.spreadsheet_id,
+            body={
+                'valueInputOption': 'RAW',
+                'data': [{'range': range_name, 'values': [[value]]} for range_name, value in data]
+            }
+        ).execute()
+
     def _is_available(self, schedule: str, time_slot: TimeSlot) -> bool:
         """スケジュールが利用可能かチェック"""
         if not schedule or schedule.strip() == "":
             return True
         
-        # 勤務不可の場合は利用不可
-        if any(keyword in schedule for keyword in ["勤務不可", "×", "休み", "不可"]):
-            return False
-        
         # 時間帯に基づいてチェック
         time_slot_text = time_slot.value if hasattr(time_slot, 'value') else str(time_slot)
         return self._is_available_for_schedule(schedule, time_slot_text)
@@ -455,28 +638,20 @@ class GoogleSheetsService:
             pharmacist_row = self._find_pharmacist_row(pharmacist_id, sheet_name)
             
             if not pharmacist_row:
-                logger.error(f"Pharmacist {pharmacist_id} not found")
+                logger.error("Pharmacist %s not found", pharmacist_id)
                 return False
             
             # 利用可能性を更新
             status = "利用可能" if is_available else "勤務不可"
-            range_name = f"{sheet_name}!{chr(65 + day_column)}{pharmacist_row}"
-            body = {
-                'values': [[status]]
-            }
+            range_name = f"{sheet_name}!{column_letter(day_column)}{pharmacist_row}"
+            self._write_cells([(range_name, status)])
+            self.invalidate_available_pharmacists(date)
             
-            self.service.spreadsheets().values().update(
-                spreadsheetId=self.spreadsheet_id,
-                range=range_name,
-                valueInputOption='RAW',
-                body=body
-            ).execute()
-            
-            logger.info(f"Updated availability for pharmacist {pharmacist_id} on {date}")
+            logger.info("Updated availability for pharmacist %s on %s", pharmacist_id, date)
             return True
             
         except Exception as e:
-            logger.error(f"Error updating pharmacist availability: {e}")
+            logger.error("Error updating pharmacist availability: %s", e)
             return False
 
     def register_pharmacist(self, pharmacist_data: Dict[str, Any]) -> bool:
@@ -510,11 +685,11 @@ class GoogleSheetsService:
                 body=body
             ).execute()
             
-            logger.info(f"Registered pharmacist: {pharmacist_data.get('name')}")
+            logger.info("Registered pharmacist: %s", pharmacist_data.get('name'))
             return True
             
         except Exception as e:
-            logger.error(f"Error registering pharmacist: {e}")
+            logger.error("Error registering pharmacist: %s", e)
             return False
 
     def register_pharmacist_user_id(self, name: str, phone: str, user_id: str, sheet_name: Optional[str] = None) -> bool:
@@ -523,46 +698,45 @@ class GoogleSheetsService:
         sheet_nameを省略した場合は今月のシート名を自動で使用
         """
         try:
-            logger.info(f"Starting pharmacist user_id registration: name='{name}', phone='{phone}', user_id='{user_id}'")
+            logger.info("Starting pharmacist user_id registration: name='%s', phone='%s', user_id='%s'", name, phone, user_id)
             
             if not self.service:
                 logger.warning("Google Sheets service not available, skipping user_id registration")
                 return False
                 
             if not sheet_name:
-                today = datetime.now().date()
+                today = today_date()
                 sheet_name = self.get_sheet_name(today)
-                logger.info(f"Using auto-generated sheet_name: {sheet_name}")
+                logger.info("Using auto-generated sheet_name: %s", sheet_name)
             else:
-                logger.info(f"Using provided sheet_name: {sheet_name}")
+                logger.info("Using provided sheet_name: %s", sheet_name)
                 
-            # 薬剤師リストを取得
-            logger.info(f"Fetching pharmacist list from sheet: {sheet_name}")
-            pharmacists = self._get_pharmacist_list(sheet_name)
-            logger.info(f"Found {len(pharmacists)} pharmacists in sheet")
+            # 共有の薬剤師一覧（TTL付き）の名前＋電話番号索引から引く
+            pharmacist = pharmacist_registry.by_name_phone(self, sheet_name, name, phone)
+            if pharmacist is None:
+                # シートに追加されたばかりの行がまだ一覧にない可能性があるため、読み直して再検索
+                logger.info("Pharmacist not in cached list, reloading sheet: %s", sheet_name)
+                pharmacist_registry.invalidate(sheet_name)
+                pharmacist = pharmacist_registry.by_name_phone(self, sheet_name, name, phone)
             
             # デバッグ用：薬剤師リストの内容をログ出力
-            for i, pharm in enumerate(pharmacists[:5]):  # 最初の5件のみ
-                logger.info(f"Pharmacist {i+1}: name='{pharm.get('name', 'N/A')}', phone='{pharm.get('phone', 'N/A')}', user_id='{pharm.get('user_id', 'N/A')}'")
-            
-            target_row = None
-            for pharmacist in pharmacists:
-                logger.info(f"Checking pharmacist: name='{pharmacist.get('name', 'N/A')}' vs '{name}', phone='{pharmacist.get('phone', 'N/A')}' vs '{phone}'")
-                if pharmacist["name"] == name and pharmacist["phone"] == phone:
-                    target_row = pharmacist["row_number"]
-                    logger.info(f"Found matching pharmacist at row {target_row}")
-                    break
+            if logger.isEnabledFor(logging.DEBUG):
+                for i, pharm in enumerate(pharmacist_registry.list_active(self, sheet_name)[:5]):  # 最初の5件のみ
+                    logger.debug("Pharmacist %d: name='%s', phone='%s', user_id='%s'", i+1, pharm.get('name', 'N/A'), pharm.get('phone', 'N/A'), pharm.get('user_id', 'N/A'))
                     
-            if not target_row:
-                logger.warning(f"Pharmacist not found for name='{name}', phone='{phone}' in sheet {sheet_name}")
+            if pharmacist is None:
+                logger.warning("Pharmacist not found for name='%s', phone='%s' in sheet %s", name, phone, sheet_name)
+                pharmacists = pharmacist_registry.list_active(self, sheet_name)
                 pharmacist_info = [f"{p.get('name', 'N/A')}({p.get('phone', 'N/A')})" for p in pharmacists]
-                logger.warning(f"Available pharmacists: {pharmacist_info}")
+                logger.warning("Available pharmacists: %s", pharmacist_info)
                 return False
+            target_row = pharmacist["row_number"]
+            logger.info("Found matching pharmacist at row %s", target_row)
                 
             # user_idを書き込む（B列: 2列目）
             range_name = f"{sheet_name}!B{target_row}"
             body = {'values': [[user_id]]}
-            logger.info(f"Updating range: {range_name} with user_id: {user_id}")
+            logger.info("Updating range: %s with user_id: %s", range_name, user_id)
             
             result = self.service.spreadsheets().values().update(
                 spreadsheetId=self.spreadsheet_id,
@@ -571,13 +745,14 @@ class GoogleSheetsService:
                 body=body
             ).execute()
             
-            logger.info(f"Successfully registered user_id for pharmacist {name} ({phone}) at row {target_row}: {user_id}")
-            logger.info(f"Google Sheets API response: {result}")
+            pharmacist_registry.invalidate(sheet_name)
+            logger.info("Successfully registered user_id for pharmacist %s (%s) at row %s: %s", name, phone, target_row, user_id)
+            logger.info("Google Sheets API response: %s", result)
             return True
             
         except Exception as e:
-            logger.error(f"Error registering pharmacist user_id: {e}")
-            logger.error(f"Exception details: {type(e).__name__}: {str(e)}")
+            logger.error("Error registering pharmacist user_id: %s", e)
+            logger.error("Exception details: %s: %s", type(e).__name__, str(e))
             return False
 
     def get_store_list(self, sheet_name: str = "店舗登録") -> List[Dict[str, Any]]:
@@ -603,10 +778,10 @@ class GoogleSheetsService:
                         "row_number": i + 2
                     }
                     stores.append(store)
-            logger.info(f"Found {len(stores)} stores in sheet {sheet_name}")
+            logger.info("Found %d stores in sheet %s", len(stores), sheet_name)
             return stores
         except Exception as e:
-            logger.error(f"Error getting store list: {e}")
+            logger.error("Error getting store list: %s", e)
             return []
 
     def register_store_user_id(self, store_number: str, store_name: str, user_id: str, sheet_name: str = "店舗登録") -> bool:
@@ -625,7 +800,7 @@ class GoogleSheetsService:
                     target_row = store["row_number"]
                     break
             if not target_row:
-                logger.warning(f"Store not found for number={store_number}, name={store_name} in sheet {sheet_name}")
+                logger.warning("Store not found for number=%s, name=%s in sheet %s", store_number, store_name, sheet_name)
                 return False
             range_name = f"{sheet_name}!C{target_row}"
             body = {'values': [[user_id]]}
@@ -635,8 +810,17 @@ class GoogleSheetsService:
                 valueInputOption='RAW',
                 body=body
             ).execute()
-            logger.info(f"Registered user_id for store {store_number} {store_name} at row {target_row}: {user_id}")
+            logger.info("Registered user_id for store %s %s at row %s: %s", store_number, store_name, target_row, user_id)
             return True
         except Exception as e:
-            logger.error(f"Error registering store user_id: {e}")
-            return False 
\ No newline at end of file
+            logger.error("Error registering store user_id: %s", e)
+            return False 
+
+
+@lru_cache(maxsize=1)
+def get_google_sheets_service() -> GoogleSheetsService:
+    """GoogleSheetsServiceを初回呼び出し時に一度だけ生成して使い回す
+
+    初期化に失敗した場合はキャッシュされず、次の呼び出しで再試行する。
+    """
+    return GoogleSheetsService()
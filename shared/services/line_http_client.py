@@ -0,0 +1,168 @@
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Union
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from linebot import LineBotApi
+from linebot.exceptions import LineBotApiError
+from linebot.http_client import RequestsHttpClient, RequestsHttpResponse
+
+logger = logging.getLogger(__name__)
+
+# LINE API向けコネクションプール設定
+POOL_CONNECTIONS = 4   # 接続先ホスト数（api.line.me / api-data.line.me）
+POOL_MAXSIZE = 64      # ホストごとに保持するkeep-alive接続数（同期ハンドラのスレッド40＋push送信分）
+PUSH_WORKERS = 8       # push送信を並行して行うスレッド数
+LINE_API_TIMEOUT = (2, 5)  # (接続, 読み込み)のタイムアウト秒数
+LINE_API_ENDPOINT = "https://api.line.me"
+# 再試行設定：接続失敗と429（レート制限、リクエストは処理されていない）のみ短い間隔で再試行する
+# 読み込みタイムアウトや5xxはLINE側で処理済みの可能性があり、pushの再送で重複通知になるため再試行しない
+LINE_API_RETRY = Retry(
+    total=3,
+    read=0,
+    backoff_factor=0.2,
+    status_forcelist=(429,),
+    allowed_methods=None,
+    raise_on_status=False,
+)
+
+
+def _create_session() -> requests.Session:
+    """コネクションプール付きのセッションを作成"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        max_retries=LINE_API_RETRY,
+    )
+    session.mount("https://", adapter)
+    return session
+
+
+# プロセス全体で共有するセッション（TLS接続をkeep-aliveで再利用）
+line_session = _create_session()
+
+
+class PooledHttpClient(RequestsHttpClient):
+    """共有セッション経由でLINE APIを呼び出すHTTPクライアント
+
+    標準のRequestsHttpClientは呼び出しごとに新しい接続を張るため、
+    共有セッションのコネクションプールを使うように差し替える。
+    """
+
+    def get(self, url, headers=None, params=None, stream=False, timeout=None):
+        if timeout is None:
+            timeout = self.timeout
+        response = line_session.get(
+            url, headers=headers, params=params, stream=stream, timeout=timeout
+        )
+        return RequestsHttpResponse(response)
+
+    def post(self, url, headers=None, data=None, timeout=None):
+        if timeout is None:
+            timeout = self.timeout
+        response = line_session.post(
+            url, headers=headers, data=data, timeout=timeout
+        )
+        return RequestsHttpResponse(response)
+
+    def delete(self, url, headers=None, data=None, timeout=None):
+        if timeout is None:
+            timeout = self.timeout
+        response = line_session.delete(
+            url, headers=headers, data=data, timeout=timeout
+        )
+        return RequestsHttpResponse(response)
+
+    def put(self, url, headers=None, data=None, timeout=None):
+        if timeout is None:
+            timeout = self.timeout
+        response = line_session.put(
+            url, headers=headers, data=data, timeout=timeout
+        )
+        return RequestsHttpResponse(response)
+
+
+def warm_up_line_session():
+    """LINE APIへの接続を事前に確立し、最初の返信でTCP/TLSの接続待ちが起きないようにする
+
+    応答内容は使わないため、認証不要のURLに問い合わせて接続だけをプールに残す。
+    """
+    try:
+        line_session.head(LINE_API_ENDPOINT, timeout=LINE_API_TIMEOUT)
+    except requests.RequestException as e:
+        logger.warning(f"LINE API warm-up failed: {e}")
+
+
+def create_line_bot_api(channel_access_token: str) -> LineBotApi:
+    """共有コネクションプールを使うLineBotApiを作成
+
+    接続確立が詰まったときは読み込みより短い時間で諦め、Webhookの応答を遅らせない。
+    """
+    return LineBotApi(channel_access_token, timeout=LINE_API_TIMEOUT, http_client=PooledHttpClient)
+
+
+def push_raw_messages(line_bot_api: LineBotApi, to: str, messages: Union[List[Dict[str, Any]], orjson.Fragment]):
+    """組み立て済みのメッセージdict（またはエンコード済みJSON）をSDKのモデルを経由せずにpush送信"""
+    line_bot_api._post(
+        '/v2/bot/message/push',
+        data=orjson.dumps({'to': to, 'messages': messages})
+    )
+
+
+def multicast_raw_messages(line_bot_api: LineBotApi, to: List[str], messages: Union[List[Dict[str, Any]], orjson.Fragment]):
+    """組み立て済みのメッセージdict（またはエンコード済みJSON）をSDKのモデルを経由せずに複数の宛先へmulticast送信（宛先は500件まで）"""
+    line_bot_api._post(
+        '/v2/bot/message/multicast',
+        data=orjson.dumps({'to': to, 'messages': messages})
+    )
+
+
+def is_unprocessed_error(error: Exception) -> bool:
+    """LINE側でリクエストが処理されていないことが確実な失敗かどうか
+
+    4xxのAPIエラーと接続の失敗（接続タイムアウトを含む）だけをTrueとする。
+    読み込みタイムアウトや5xxは送信済みの可能性があり、再送すると重複通知になる。
+    """
+    if isinstance(error, LineBotApiError):
+        return 400 <= error.status_code < 500
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    return isinstance(error, requests.ConnectionError) and not isinstance(error, requests.Timeout)
+
+
+def reply_or_push(line_bot_api: LineBotApi, reply_token: str, user_id: str, messages):
+    """reply_tokenで返信し、返信できなかった場合だけpushで送る
+
+    Reply APIは無料で1往復で済むため優先し、期限切れ・使用済みの
+    トークンで失敗したときのみPush APIにフォールバックする。
+    """
+    if reply_token:
+        try:
+            line_bot_api.reply_message(reply_token, messages)
+            return
+        except LineBotApiError as e:
+            logger.warning(f"Reply failed, falling back to push for {user_id}: {e}")
+    line_bot_api.push_message(user_id, messages)
+
+
+# Webhookの応答後に行うpush送信用のスレッドプール
+line_push_executor = ThreadPoolExecutor(max_workers=PUSH_WORKERS, thread_name_prefix="line-push")
+
+
+def submit_line_call(func: Callable[..., Any], *args, description: str = "", **kwargs) -> Future:
+    """LINE API呼び出しをスレッドプールで実行（呼び出し元はすぐに戻る）"""
+    description = description or getattr(func, '__name__', str(func))
+    future = line_push_executor.submit(func, *args, **kwargs)
+
+    def _log_result(done: Future):
+        error = done.exception()
+        if error:
+            logger.error(f"LINE API call failed ({description}): {error}")
+        else:
+            logger.info(f"LINE API call completed ({description})")
+
+    future.add_done_callback(_log_result)
+    return future
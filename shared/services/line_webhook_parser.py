@@ -0,0 +1,100 @@
+import base64
+import hashlib
+import hmac
+import logging
+from typing import Union
+import orjson
+from linebot import WebhookParser
+from linebot.exceptions import InvalidSignatureError
+from linebot.webhook import WebhookPayload
+from linebot.models.events import (
+    MessageEvent,
+    FollowEvent,
+    UnfollowEvent,
+    JoinEvent,
+    LeaveEvent,
+    PostbackEvent,
+    BeaconEvent,
+    AccountLinkEvent,
+    MemberJoinedEvent,
+    MemberLeftEvent,
+    ThingsEvent,
+    UnsendEvent,
+    VideoPlayCompleteEvent,
+    UnknownEvent,
+)
+
+logger = logging.getLogger(__name__)
+
+# Webhookイベントのtypeとイベントクラスの対応表（messageは別処理）
+_EVENT_TYPES = {
+    'follow': FollowEvent,
+    'unfollow': UnfollowEvent,
+    'join': JoinEvent,
+    'leave': LeaveEvent,
+    'postback': PostbackEvent,
+    'beacon': BeaconEvent,
+    'accountLink': AccountLinkEvent,
+    'memberJoined': MemberJoinedEvent,
+    'memberLeft': MemberLeftEvent,
+    'things': ThingsEvent,
+    'unsend': UnsendEvent,
+    'videoPlayComplete': VideoPlayCompleteEvent,
+}
+
+
+class PrimedSignatureValidator:
+    """チャネルシークレットで初期化済みのHMACを使い回す署名検証
+
+    SDK標準のSignatureValidatorはリクエストごとにhmac.newで鍵から
+    HMACを組み立てるため、初期化済みのオブジェクトをcopyして使う。
+    """
+
+    def __init__(self, channel_secret: str):
+        self._base_mac = hmac.new(channel_secret.encode('utf-8'), None, hashlib.sha256)
+
+    def validate(self, body: Union[bytes, str], signature: str) -> bool:
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        mac = self._base_mac.copy()
+        mac.update(body)
+        return hmac.compare_digest(
+            signature.encode('utf-8'), base64.b64encode(mac.digest())
+        )
+
+
+class FastWebhookParser(WebhookParser):
+    """初期化済みHMACで署名検証し、orjsonで本文を解析するWebhookParser
+
+    bodyはリクエストの生バイト列のままでも文字列でも受け付ける。
+    """
+
+    def __init__(self, channel_secret: str):
+        super().__init__(channel_secret)
+        self.signature_validator = PrimedSignatureValidator(channel_secret)
+
+    def parse(self, body, signature, as_payload=False, use_raw_message=False):
+        if not self.signature_validator.validate(body, signature):
+            raise InvalidSignatureError('Invalid signature. signature=' + signature)
+
+        body_json = orjson.loads(body)
+        events = []
+        for event in body_json['events']:
+            event_type = event['type']
+            if event_type == 'message':
+                events.append(MessageEvent.new_from_json_dict(event, use_raw_message=use_raw_message))
+                continue
+            event_class = _EVENT_TYPES.get(event_type)
+            if event_class is None:
+                logger.info(f"Unknown event type. type={event_type}")
+                event_class = UnknownEvent
+            events.append(event_class.new_from_json_dict(event))
+
+        if as_payload:
+            return WebhookPayload(events=events, destination=body_json.get('destination'))
+        return events
+
+
+def create_webhook_parser(channel_secret: str) -> WebhookParser:
+    """初期化済みHMAC・orjsonを使うWebhookParserを作成"""
+    return FastWebhookParser(channel_secret)
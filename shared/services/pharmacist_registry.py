@@ -0,0 +1,92 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# シートから読み込んだ薬剤師一覧を使い回す秒数
+PHARMACIST_REGISTRY_TTL = 60
+
+
+class PharmacistRegistry:
+    """シートごとの薬剤師一覧をメモリに保持し、user_idで引けるようにする
+
+    一覧はGoogleSheetsServiceの_get_pharmacist_listで読み込み、TTLの間は
+    シートを読み直さない。登録でシートが変わったときはinvalidateで破棄する。
+    """
+
+    def __init__(self, ttl_seconds: float = PHARMACIST_REGISTRY_TTL):
+        self.ttl_seconds = ttl_seconds
+        # シート名 → (読み込み時刻, 薬剤師一覧, user_id→薬剤師, 薬剤師ID→薬剤師, (名前, 電話番号)→薬剤師)
+        self._sheets: Dict[str, Tuple[float, List[Dict[str, Any]], Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]], Dict[Tuple[str, str], Dict[str, Any]]]] = {}
+        self._lock = threading.Lock()
+
+    def list_active(self, sheets_service, sheet_name: str) -> List[Dict[str, Any]]:
+        """シートに登録されている薬剤師一覧を取得"""
+        return self._get(sheets_service, sheet_name)[1]
+
+    def by_user_id(self, sheets_service, sheet_name: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """user_idに対応する薬剤師を取得（見つからなければNone）"""
+        return self._get(sheets_service, sheet_name)[2].get(user_id)
+
+    def by_id(self, sheets_service, sheet_name: str, pharmacist_id: str) -> Optional[Dict[str, Any]]:
+        """薬剤師ID（pharm_001形式）に対応する薬剤師を取得（見つからなければNone）"""
+        return self._get(sheets_service, sheet_name)[3].get(pharmacist_id)
+
+    def by_name_phone(self, sheets_service, sheet_name: str, name: str, phone: str) -> Optional[Dict[str, Any]]:
+        """名前＋電話番号に対応する薬剤師を取得（見つからなければNone）"""
+        return self._get(sheets_service, sheet_name)[4].get((name, phone))
+
+    def is_fresh(self, sheet_name: str) -> bool:
+        """TTL内の一覧を保持しているかどうか"""
+        with self._lock:
+            cached = self._sheets.get(sheet_name)
+        return bool(cached) and time.monotonic() - cached[0] < self.ttl_seconds
+
+    def prime(self, sheet_name: str, pharmacists: List[Dict[str, Any]]):
+        """別の読み込みで取得済みの薬剤師一覧を登録（シートを読み直さない）"""
+        if pharmacists:
+            entry = self._build_entry(time.monotonic(), pharmacists)
+            with self._lock:
+                self._sheets[sheet_name] = entry
+
+    def invalidate(self, sheet_name: Optional[str] = None):
+        """薬剤師の登録内容が変わったときに保持している一覧を破棄"""
+        with self._lock:
+            if sheet_name is None:
+                self._sheets.clear()
+            else:
+                self._sheets.pop(sheet_name, None)
+
+    def _get(self, sheets_service, sheet_name: str):
+        now = time.monotonic()
+        with self._lock:
+            cached = self._sheets.get(sheet_name)
+        if cached and now - cached[0] < self.ttl_seconds:
+            return cached
+
+        pharmacists = sheets_service._get_pharmacist_list(sheet_name)
+        entry = self._build_entry(now, pharmacists)
+        # 読み込み失敗時も空リストが返るため、空の結果は保持しない
+        if pharmacists:
+            with self._lock:
+                self._sheets[sheet_name] = entry
+        return entry
+
+    @staticmethod
+    def _build_entry(loaded_at: float, pharmacists: List[Dict[str, Any]]):
+        index: Dict[str, Dict[str, Any]] = {}
+        for pharmacist in pharmacists:
+            # 同じuser_idが複数行にある場合は上の行を優先
+            if pharmacist.get("user_id"):
+                index.setdefault(pharmacist["user_id"], pharmacist)
+        by_id = {pharmacist["id"]: pharmacist for pharmacist in pharmacists}
+        by_name_phone: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for pharmacist in pharmacists:
+            by_name_phone.setdefault((pharmacist["name"], pharmacist["phone"]), pharmacist)
+        return (loaded_at, pharmacists, index, by_id, by_name_phone)
+
+
+# グローバルインスタンス
+pharmacist_registry = PharmacistRegistry()
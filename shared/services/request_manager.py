@@ -1,16 +1,31 @@
 import logging
-from typing import Dict, Any, Optional
-from datetime import datetime
+from types import MappingProxyType
+from typing import Dict, Any, List, Mapping, Optional
+from datetime import datetime, date
+import orjson
+import redis
+
+from shared.config.settings import shared_settings
 
 logger = logging.getLogger(__name__)
 
+# Redisに保存した依頼内容の保持期間（秒）
+REQUEST_TTL_SECONDS = 86400
+# 起動時にRedisへ接続できるか確認する際のタイムアウト（秒）
+REDIS_CONNECT_TIMEOUT = 1
+# 接続後の各コマンドのタイムアウト（秒）。Redisが応答しなくなってもWebhook処理を止めない
+REDIS_SOCKET_TIMEOUT = 1
+
 
 class RequestManager:
     """依頼内容をrequest_idで管理するサービス"""
     
     def __init__(self):
-        # 実際の運用ではRedisやDBを使用
+        # 単一プロセス用のメモリ上の保存先（複数ワーカーではRedisRequestManagerを使用）
         self._requests: Dict[str, Dict[str, Any]] = {}
+        # get_requestのヒット/ミス統計
+        self.hits = 0
+        self.misses = 0
     
     def save_request(self, request_id: str, request_data: Dict[str, Any]) -> bool:
         """依頼内容を保存"""
@@ -20,10 +35,10 @@ class RequestManager:
                 "created_at": datetime.now().isoformat(),
                 "status": "pending"
             }
-            logger.info(f"Request saved: {request_id}")
+            logger.info("Request saved: %s", request_id)
             return True
         except Exception as e:
-            logger.error(f"Failed to save request {request_id}: {e}")
+            logger.error("Failed to save request %s: %s", request_id, e)
             return False
     
     def get_request(self, request_id: str) -> Optional[Dict[str, Any]]:
@@ -31,12 +46,15 @@ class RequestManager:
         try:
             request = self._requests.get(request_id)
             if request:
-                logger.info(f"Request retrieved: {request_id}")
+                self.hits += 1
+                # 応募ボタンのたびに呼ばれるため、取得成功のログはdebugに留める
+                logger.debug("Request retrieved: %s", request_id)
             else:
-                logger.warning(f"Request not found: {request_id}")
+                self.misses += 1
+                logger.warning("Request not found: %s", request_id)
             return request
         except Exception as e:
-            logger.error(f"Failed to get request {request_id}: {e}")
+            logger.error("Failed to get request %s: %s", request_id, e)
             return None
     
     def update_request_status(self, request_id: str, status: str) -> bool:
@@ -45,13 +63,13 @@ class RequestManager:
             if request_id in self._requests:
                 self._requests[request_id]["status"] = status
                 self._requests[request_id]["updated_at"] = datetime.now().isoformat()
-                logger.info(f"Request status updated: {request_id} -> {status}")
+                logger.info("Request status updated: %s -> %s", request_id, status)
                 return True
             else:
-                logger.warning(f"Request not found for status update: {request_id}")
+                logger.warning("Request not found for status update: %s", request_id)
                 return False
         except Exception as e:
-            logger.error(f"Failed to update request status {request_id}: {e}")
+            logger.error("Failed to update request status %s: %s", request_id, e)
             return False
     
     def delete_request(self, request_id: str) -> bool:
@@ -59,45 +77,212 @@ class RequestManager:
         try:
             if request_id in self._requests:
                 del self._requests[request_id]
-                logger.info(f"Request deleted: {request_id}")
+                logger.info("Request deleted: %s", request_id)
                 return True
             else:
-                logger.warning(f"Request not found for deletion: {request_id}")
+                logger.warning("Request not found for deletion: %s", request_id)
                 return False
         except Exception as e:
-            logger.error(f"Failed to delete request {request_id}: {e}")
+            logger.error("Failed to delete request %s: %s", request_id, e)
             return False
     
-    def get_all_requests(self) -> Dict[str, Dict[str, Any]]:
-        """全依頼内容を取得（デバッグ用）"""
-        return self._requests.copy()
+    def get_all_requests(self) -> Mapping[str, Dict[str, Any]]:
+        """全依頼内容を取得（デバッグ用）
+
+        コピーせず読み取り専用のビューを返すため、内容は保存・削除に追従する。
+        走査中に削除する場合は呼び出し側でlist()等に取り出してから行うこと。
+        """
+        return MappingProxyType(self._requests)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """get_requestのヒット/ミス統計を取得"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "size": len(self._requests)
+        }
 
     def add_applicant(self, request_id: str, user_id: str):
         """応募者を追加"""
         if request_id not in self._requests:
             return
-        applicants = self._requests[request_id].setdefault("applicants", [])
-        if user_id not in applicants:
-            applicants.append(user_id)
+        # 追加順を保ったまま重複を除くため、値を持たないdictを順序付き集合として使う
+        self._requests[request_id].setdefault("applicants", {})[user_id] = None
 
     def add_confirmed(self, request_id: str, user_id: str):
         """確定者を追加"""
         if request_id not in self._requests:
             return
-        confirmed = self._requests[request_id].setdefault("confirmed", [])
-        if user_id not in confirmed:
-            confirmed.append(user_id)
+        self._requests[request_id].setdefault("confirmed", {})[user_id] = None
 
-    def get_applicants(self, request_id: str):
+    def get_applicants(self, request_id: str) -> List[str]:
         if request_id not in self._requests:
             return []
-        return self._requests[request_id].get("applicants", [])
+        return list(self._requests[request_id].get("applicants", ()))
 
-    def get_confirmed(self, request_id: str):
+    def get_confirmed(self, request_id: str) -> List[str]:
         if request_id not in self._requests:
             return []
-        return self._requests[request_id].get("confirmed", [])
+        return list(self._requests[request_id].get("confirmed", ()))
+
+
+class RedisRequestManager(RequestManager):
+    """依頼内容をRedisに保存し、複数ワーカー間で共有するRequestManager
+
+    依頼内容は req:{request_id} のハッシュ（値はJSON）に、応募者・確定者は
+    req:{request_id}:applicants / req:{request_id}:confirmed のセットに保存する。
+    """
+
+    def __init__(self, redis_client: "redis.Redis", ttl_seconds: int = REQUEST_TTL_SECONDS):
+        super().__init__()
+        self.redis_client = redis_client
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def _key(request_id: str, suffix: str = "") -> str:
+        return f"req:{request_id}{suffix}"
+
+    @staticmethod
+    def _decode(raw: Dict[bytes, bytes]) -> Dict[str, Any]:
+        request = {k.decode(): orjson.loads(v) for k, v in raw.items()}
+        # 日付はISO形式の文字列で保存されるため、読み出し時にdateへ戻す
+        if isinstance(request.get("date"), str):
+            try:
+                request["date"] = date.fromisoformat(request["date"])
+            except ValueError:
+                pass
+        return request
+
+    def save_request(self, request_id: str, request_data: Dict[str, Any]) -> bool:
+        """依頼内容を保存"""
+        try:
+            mapping = {
+                **request_data,
+                "created_at": datetime.now().isoformat(),
+                "status": "pending"
+            }
+            key = self._key(request_id)
+            pipe = self.redis_client.pipeline()
+            pipe.delete(key)
+            pipe.hset(key, mapping={k: orjson.dumps(v, default=str) for k, v in mapping.items()})
+            pipe.expire(key, self.ttl_seconds)
+            pipe.execute()
+            logger.info("Request saved: %s", request_id)
+            return True
+        except Exception as e:
+            logger.error("Failed to save request %s: %s", request_id, e)
+            return False
+
+    def get_request(self, request_id: str) -> Optional[Dict[str, Any]]:
+        """依頼内容を取得"""
+        try:
+            raw = self.redis_client.hgetall(self._key(request_id))
+            if raw:
+                self.hits += 1
+                logger.debug("Request retrieved: %s", request_id)
+                return self._decode(raw)
+            self.misses += 1
+            logger.warning("Request not found: %s", request_id)
+            return None
+        except Exception as e:
+            logger.error("Failed to get request %s: %s", request_id, e)
+            return None
+
+    def update_request_status(self, request_id: str, status: str) -> bool:
+        """依頼ステータスを更新"""
+        try:
+            key = self._key(request_id)
+            if not self.redis_client.exists(key):
+                logger.warning("Request not found for status update: %s", request_id)
+                return False
+            self.redis_client.hset(key, mapping={
+                "status": orjson.dumps(status),
+                "updated_at": orjson.dumps(datetime.now().isoformat())
+            })
+            logger.info("Request status updated: %s -> %s", request_id, status)
+            return True
+        except Exception as e:
+            logger.error("Failed to update request status %s: %s", request_id, e)
+            return False
+
+    def delete_request(self, request_id: str) -> bool:
+        """依頼内容を削除"""
+        try:
+            deleted = self.redis_client.delete(
+                self._key(request_id),
+                self._key(request_id, ":applicants"),
+                self._key(request_id, ":confirmed")
+            )
+            if deleted:
+                logger.info("Request deleted: %s", request_id)
+                return True
+            logger.warning("Request not found for deletion: %s", request_id)
+            return False
+        except Exception as e:
+            logger.error("Failed to delete request %s: %s", request_id, e)
+            return False
+
+    def get_all_requests(self) -> Mapping[str, Dict[str, Any]]:
+        """全依頼内容を取得（デバッグ用）"""
+        requests = {}
+        for key in self.redis_client.scan_iter(match="req:*"):
+            key = key.decode()
+            if key.endswith((":applicants", ":confirmed")):
+                continue
+            raw = self.redis_client.hgetall(key)
+            if raw:
+                requests[key[len("req:"):]] = self._decode(raw)
+        return requests
+
+    def get_stats(self) -> Dict[str, Any]:
+        """get_requestのヒット/ミス統計を取得（件数はRedis側のため含めない）"""
+        stats = super().get_stats()
+        stats["size"] = None
+        return stats
+
+    def _add_member(self, request_id: str, suffix: str, user_id: str):
+        # 依頼が存在する場合のみ追加し、セットの期限を依頼内容に揃える
+        if not self.redis_client.exists(self._key(request_id)):
+            return
+        key = self._key(request_id, suffix)
+        pipe = self.redis_client.pipeline()
+        pipe.sadd(key, user_id)
+        pipe.expire(key, self.ttl_seconds)
+        pipe.execute()
+
+    def add_applicant(self, request_id: str, user_id: str):
+        """応募者を追加"""
+        self._add_member(request_id, ":applicants", user_id)
+
+    def add_confirmed(self, request_id: str, user_id: str):
+        """確定者を追加"""
+        self._add_member(request_id, ":confirmed", user_id)
+
+    def get_applicants(self, request_id: str) -> List[str]:
+        return [m.decode() for m in self.redis_client.smembers(self._key(request_id, ":applicants"))]
+
+    def get_confirmed(self, request_id: str) -> List[str]:
+        return [m.decode() for m in self.redis_client.smembers(self._key(request_id, ":confirmed"))]
+
+
+def create_request_manager(redis_url: Optional[str] = None) -> RequestManager:
+    """Redisに接続できればRedisRequestManager、できなければメモリ上のRequestManagerを作成"""
+    if redis_url:
+        try:
+            client = redis.from_url(
+                redis_url,
+                socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+                socket_timeout=REDIS_SOCKET_TIMEOUT,
+            )
+            client.ping()
+            logger.info("Request manager backed by Redis")
+            return RedisRequestManager(client)
+        except Exception as e:
+            logger.warning("Redis not available, keeping requests in memory: %s", e)
+    return RequestManager()
 
 
 # グローバルインスタンス
-request_manager = RequestManager() 
\ No newline at end of file
+request_manager = create_request_manager(shared_settings.redis_url) 
\ No newline at end of file
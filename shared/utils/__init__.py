@@ -1,6 +1,12 @@
-from .text_parser import parse_shift_request, parse_pharmacist_response
+from .text_parser import ParsedShiftRequest, parse_shift_request, parse_pharmacist_response
+from .sheet_columns import column_letter
+from .clock import now_minute_str, today_date
 
 __all__ = [
+    "ParsedShiftRequest",
     "parse_shift_request",
-    "parse_pharmacist_response"
+    "parse_pharmacist_response",
+    "column_letter",
+    "now_minute_str",
+    "today_date"
 ] 
\ No newline at end of file
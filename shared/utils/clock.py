@@ -0,0 +1,26 @@
+import time
+from datetime import date, datetime
+from typing import Tuple
+
+# 分単位の現在時刻文字列（同じ分のあいだは整形済みの文字列を使い回す）
+_minute_cache: Tuple[int, str] = (-1, "")
+# 秒単位の今日の日付（同じ秒のあいだは同じdateを使い回す）
+_today_cache: Tuple[int, date] = (-1, date.min)
+
+
+def now_minute_str() -> str:
+    """現在時刻を「YYYY/MM/DD HH:MM」形式で取得"""
+    global _minute_cache
+    minute = int(time.time() // 60)
+    if _minute_cache[0] != minute:
+        _minute_cache = (minute, datetime.fromtimestamp(minute * 60).strftime('%Y/%m/%d %H:%M'))
+    return _minute_cache[1]
+
+
+def today_date() -> date:
+    """今日の日付を取得（1秒以内の呼び出しでは時刻の取得とdateの生成を省く）"""
+    global _today_cache
+    second = int(time.time())
+    if _today_cache[0] != second:
+        _today_cache = (second, date.fromtimestamp(second))
+    return _today_cache[1]
@@ -0,0 +1,19 @@
+from linebot.models import TextSendMessage
+
+# 未登録ユーザー向けの利用案内（店舗Bot・薬剤師Bot・統合版で共通）
+GUIDE_TEXT = (
+    "\U0001F3E5 薬局シフト管理Botへようこそ！\n\n"
+    "このBotは薬局の勤務シフト管理を効率化します。\n\n"
+    "\U0001F4CB 利用方法を選択してください：\n\n"
+    "\U0001F3EA 【店舗の方】\n"
+    "• 店舗登録がお済みでない方は、\n"
+    "店舗登録、 店舗番号、店舗名を送信してください！\n"
+    "例：店舗登録 002 サンライズ薬局\n\n"
+    "\U0001F48A 【薬剤師の方】\n"
+    "• 登録がお済みでない方は、\n"
+    "お名前、電話番号を送信してください！\n"
+    "例：田中薬剤師,090-1234-5678\n\n"
+    "登録は簡単で、すぐに利用開始できます！"
+)
+# 案内メッセージはimport時に一度だけ生成して使い回す（送信時に書き換えられないため共有できる）
+GUIDE_MESSAGE = TextSendMessage(text=GUIDE_TEXT)
@@ -0,0 +1,24 @@
+from typing import Tuple
+
+# 事前に計算しておく列数（A〜ZZ列。シートの読み込み範囲もZZ列まで）
+_PRECOMPUTED_COLUMNS = 26 + 26 * 26
+
+
+def _to_column_letter(index: int) -> str:
+    """0始まりの列番号をA1形式の列名に変換（0→A, 25→Z, 26→AA）"""
+    letters = ""
+    index += 1
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+_COLUMN_LETTERS: Tuple[str, ...] = tuple(_to_column_letter(i) for i in range(_PRECOMPUTED_COLUMNS))
+
+
+def column_letter(index: int) -> str:
+    """0始まりの列番号からA1形式の列名を取得（Z列より右にも対応）"""
+    if 0 <= index < _PRECOMPUTED_COLUMNS:
+        return _COLUMN_LETTERS[index]
+    return _to_column_letter(index)
@@ -1,20 +1,75 @@
 import re
 import logging
-from datetime import datetime, date
-from typing import Dict, Optional, Any
+from functools import lru_cache
+from datetime import date
+from typing import Dict, NamedTuple, Optional, Any
 import dateparser
 from dateutil import parser as date_parser
 
 from app.models.schedule import TimeSlot
+from shared.utils.clock import today_date
 
 logger = logging.getLogger(__name__)
 
+# 入力テキストごとに保持する解析結果の件数
+PARSE_CACHE_SIZE = 1024
+
+# 登録メッセージの区切り文字（空白・カンマ・読点・全角空白）
+_SPLIT_RE = re.compile(r'[ ,、\u3000]+')
+
+# シフト依頼
+_DATE_MD_RE = re.compile(r'(\d{1,2})[/\-](\d{1,2})')
+# 日付・時間帯・人数・備考を1回の走査で取り出すためのパターン
+_SHIFT_RE = re.compile(
+    r'(?P<date>(?P<month>\d{1,2})[/\-](?P<day>\d{1,2}))'
+    r'|(?P<time_morning>午前|AM|am|9:00|10:00|11:00|12:00)'
+    r'|(?P<time_afternoon>午後|PM|pm|13:00|14:00|15:00|16:00|17:00)'
+    r'|(?P<time_evening>夜間|18:00|19:00|20:00|21:00)'
+    r'|(?P<count>\d+)名'
+    r'|(?:備考|メモ)[:：]\s*(?P<notes>.+)'
+)
+# 複数の時間帯が書かれている場合の優先順
+_SLOT_PRIORITY = ("time_morning", "time_afternoon", "time_evening")
+
+# 日付
+_FLEXIBLE_DATE_PATTERNS = (
+    _DATE_MD_RE,                                       # 4/15, 4-15
+    re.compile(r'(\d{1,2})月(\d{1,2})日'),              # 4月15日
+    re.compile(r'(\d{4})[/\-](\d{1,2})[/\-](\d{1,2})'),  # 2024/4/15
+)
+
+# 日付らしい文字（数字・年月日・区切り）を含まないテキストはライブラリでの解析まで進めない
+_DATE_HINT_RE = re.compile(r'[\d年月日/\-]')
+
+# parse_time_slotのキーワード（小文字化したテキストに対して上から順に判定）
+_TIME_SLOT_KEYWORDS = (
+    (TimeSlot.AM, ("am", "午前", "朝")),
+    (TimeSlot.PM, ("pm", "午後", "夕方")),
+    (TimeSlot.FULL_DAY, ("終日", "フル", "一日")),
+)
+
+# 薬剤師の応答
+_ACCEPT_RE = re.compile(r'\bはい\b|\b承諾\b|\bOK\b|\b可\b', re.IGNORECASE)
+_DECLINE_RE = re.compile(r'\bいいえ\b|\b辞退\b|\b不可\b|\b×\b', re.IGNORECASE)
+_CONDITIONAL_RE = re.compile(r'\b条件付き\b|\b条件\b|\bただし\b')
+_TIME_CONDITION_RE = re.compile(r'(\d{1,2}:\d{2}|\d{1,2}時).*?(以降|から|より)')
+_CONDITION_RE = re.compile(r'条件[：:]\s*(.+)')
+# 上の正規表現を実行する前の絞り込み用キーワード（承諾・辞退は小文字化したテキストと比較）
+_ACCEPT_KW = ("はい", "承諾", "ok", "可")
+_DECLINE_KW = ("いいえ", "辞退", "不可", "×")
+_CONDITIONAL_KW = ("条件", "ただし")
+
+# 店舗情報
+_STORE_NUMBER_RE = re.compile(r'店舗[番号]*[：:]\s*(\d+)')
+_STORE_NAME_RE = re.compile(r'店舗名[：:]\s*(.+)')
+_PHARMACY_NAME_RE = re.compile(r'(.+薬局)')
+
 
 def parse_pharmacist_registration(text: str) -> Optional[Dict[str, Any]]:
     """薬剤師登録情報を解析（柔軟な区切り文字対応）"""
     try:
         # 柔軟な区切り文字対応
-        parts = re.split(r'[ ,、\u3000]+', text.strip())
+        parts = _SPLIT_RE.split(text.strip())
         if len(parts) >= 2:
             return {
                 "name": parts[0],
@@ -32,7 +87,7 @@ def parse_store_registration(text: str) -> Optional[Dict[str, Any]]:
         text = text.replace("店舗登録", "").strip()
         
         # 柔軟な区切り文字対応
-        parts = re.split(r'[ ,、\u3000]+', text)
+        parts = _SPLIT_RE.split(text)
         if len(parts) >= 2:
             return {
                 "number": parts[0],
@@ -42,65 +97,108 @@ def parse_store_registration(text: str) -> Optional[Dict[str, Any]]:
         pass
     return None
 
-def parse_shift_request(text: str) -> Optional[Dict[str, Any]]:
-    """シフト依頼を解析"""
+class ParsedShiftRequest(NamedTuple):
+    """シフト依頼テキストの解析結果（変更不可のためキャッシュした結果をそのまま返せる）"""
+    date: date
+    time_slot: str
+    required_count: int
+    notes: str
+
+
+def parse_shift_request(text: str) -> Optional[ParsedShiftRequest]:
+    """シフト依頼を解析
+
+    解析結果は入力テキストごとにキャッシュする。
+    """
+    return _parse_shift_request(text, today_date())
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_shift_request(text: str, today: date) -> Optional[ParsedShiftRequest]:
     try:
-        # 日付の抽出
-        date_match = re.search(r'(\d{1,2})[/\-](\d{1,2})', text)
-        if not date_match:
+        # 日付の区切り（「/」か「-」）がなければシフト依頼として解析できない
+        if "/" not in text and "-" not in text:
             return None
         
-        month, day = map(int, date_match.groups())
-        year = datetime.now().year
-        target_date = date(year, month, day)
-        
-        # 時間帯の抽出
-        time_slot = None
-        if re.search(r'午前|AM|am|9:00|10:00|11:00|12:00', text):
-            time_slot = "time_morning"
-        elif re.search(r'午後|PM|pm|13:00|14:00|15:00|16:00|17:00', text):
-            time_slot = "time_afternoon"
-        elif re.search(r'夜間|18:00|19:00|20:00|21:00', text):
-            time_slot = "time_evening"
-        else:
-            time_slot = "time_full_day"
+        date_match = None
+        slots = set()
+        required_count = None
+        notes = ""
+        for match in _SHIFT_RE.finditer(text):
+            kind = match.lastgroup
+            if kind == "date":
+                # 日付は最初に現れたものを使う
+                if date_match is None:
+                    date_match = match
+            elif kind == "count":
+                if required_count is None:
+                    required_count = int(match.group("count"))
+            elif kind == "notes":
+                notes = match.group("notes").strip()
+            else:
+                slots.add(kind)
         
-        # 人数の抽出
-        count_match = re.search(r'(\d+)名?', text)
-        required_count = int(count_match.group(1)) if count_match else 1
+        if date_match is None:
+            return None
+        target_date = date(today.year, int(date_match.group("month")), int(date_match.group("day")))
         
-        # 備考の抽出
-        notes = ""
-        if "備考" in text or "メモ" in text:
-            notes_match = re.search(r'(備考|メモ)[:：]\s*(.+)', text)
-        if notes_match:
-                notes = notes_match.group(2).strip()
+        # 時間帯の指定がなければ終日
+        time_slot = next((slot for slot in _SLOT_PRIORITY if slot in slots), "time_full_day")
         
-        return {
-            "date": target_date,
-            "time_slot": time_slot,
-            "required_count": required_count,
-            "notes": notes
-        }
+        # 人数は1〜3名（指定がなければ1名）
+        required_count = min(max(required_count or 1, 1), 3)
+        
+        return ParsedShiftRequest(target_date, time_slot, required_count, notes)
     except Exception:
         return None
 
 
+def get_parse_cache_stats() -> Dict[str, Any]:
+    """シフト依頼の解析キャッシュの統計を取得"""
+    info = _parse_shift_request.cache_info()
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "maxsize": info.maxsize,
+    }
+
+
+def _contains_any(text: str, keywords) -> bool:
+    """いずれかのキーワードを部分文字列として含むか"""
+    for keyword in keywords:
+        if keyword in text:
+            return True
+    return False
+
+
 def parse_pharmacist_response(text: str) -> Optional[Dict[str, Any]]:
-    """薬剤師の応答テキストを解析"""
+    """薬剤師の応答テキストを解析
+
+    解析結果は入力テキストごとにキャッシュし、呼び出し元には浅いコピーを返す。
+    """
+    result = _parse_pharmacist_response(text)
+    return dict(result) if result else None
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_pharmacist_response(text: str) -> Optional[Dict[str, Any]]:
     try:
         # 応答の種類を判定
         response_type = None
         conditions = None
         
+        # キーワードを含まないテキストでは正規表現（単語境界の確認）を実行しない
+        lowered = text.lower()
+        
         # 承諾
-        if re.search(r'\bはい\b|\b承諾\b|\bOK\b|\b可\b', text, re.IGNORECASE):
+        if _contains_any(lowered, _ACCEPT_KW) and _ACCEPT_RE.search(text):
             response_type = "accepted"
         # 辞退
-        elif re.search(r'\bいいえ\b|\b辞退\b|\b不可\b|\b×\b', text, re.IGNORECASE):
+        elif _contains_any(lowered, _DECLINE_KW) and _DECLINE_RE.search(text):
             response_type = "declined"
         # 条件付き
-        elif re.search(r'\b条件付き\b|\b条件\b|\bただし\b', text):
+        elif _contains_any(text, _CONDITIONAL_KW) and _CONDITIONAL_RE.search(text):
             response_type = "conditional"
         else:
             return None
@@ -108,13 +206,13 @@ def parse_pharmacist_response(text: str) -> Optional[Dict[str, Any]]:
         # 条件の抽出
         if response_type == "conditional":
             # 時間条件
-            time_condition = re.search(r'(\d{1,2}:\d{2}|\d{1,2}時).*?(以降|から|より)', text)
+            time_condition = _TIME_CONDITION_RE.search(text)
             if time_condition:
                 conditions = f"{time_condition.group(1)}以降"
             
             # その他の条件
             if not conditions:
-                condition_match = re.search(r'条件[：:]\s*(.+)', text)
+                condition_match = _CONDITION_RE.search(text)
                 if condition_match:
                     conditions = condition_match.group(1).strip()
         
@@ -130,20 +228,23 @@ def parse_pharmacist_response(text: str) -> Optional[Dict[str, Any]]:
 
 def parse_date_flexible(text: str) -> Optional[date]:
     """柔軟な日付解析"""
+    # 年の推定に今日の日付を使うため、日付もキャッシュのキーに含める
+    return _parse_date_flexible(text, today_date())
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_date_flexible(text: str, today: date) -> Optional[date]:
     try:
+        if not text or not _DATE_HINT_RE.search(text):
+            return None
+        
         # 様々な日付形式に対応
-        date_patterns = [
-            r'(\d{1,2})[/\-](\d{1,2})',  # 4/15, 4-15
-            r'(\d{1,2})月(\d{1,2})日',   # 4月15日
-            r'(\d{4})[/\-](\d{1,2})[/\-](\d{1,2})',  # 2024/4/15
-        ]
-        
-        for pattern in date_patterns:
-            match = re.search(pattern, text)
+        for pattern in _FLEXIBLE_DATE_PATTERNS:
+            match = pattern.search(text)
             if match:
                 if len(match.groups()) == 2:
                     month, day = map(int, match.groups())
-                    year = datetime.now().year
+                    year = today.year
                     return date(year, month, day)
                 elif len(match.groups()) == 3:
                     year, month, day = map(int, match.groups())
@@ -155,17 +256,15 @@ def parse_date_flexible(text: str) -> Optional[date]:
         return None
 
 
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
 def parse_time_slot(text: str) -> Optional[TimeSlot]:
     """時間帯を解析"""
     try:
         text_lower = text.lower()
         
-        if any(word in text_lower for word in ['am', '午前', '朝']):
-            return TimeSlot.AM
-        elif any(word in text_lower for word in ['pm', '午後', '夕方']):
-            return TimeSlot.PM
-        elif any(word in text_lower for word in ['終日', 'フル', '一日']):
-            return TimeSlot.FULL_DAY
+        for time_slot, keywords in _TIME_SLOT_KEYWORDS:
+            if any(word in text_lower for word in keywords):
+                return time_slot
         
         return None
         
@@ -178,14 +277,14 @@ def extract_store_info(text: str) -> Optional[Dict[str, Any]]:
     """店舗情報を抽出"""
     try:
         # 店舗番号
-        store_number_match = re.search(r'店舗[番号]*[：:]\s*(\d+)', text)
+        store_number_match = _STORE_NUMBER_RE.search(text)
         store_number = store_number_match.group(1) if store_number_match else None
         
         # 店舗名
-        store_name_match = re.search(r'店舗名[：:]\s*(.+)', text)
+        store_name_match = _STORE_NAME_RE.search(text)
         if not store_name_match:
             # 薬局名のパターン
-            store_name_match = re.search(r'(.+薬局)', text)
+            store_name_match = _PHARMACY_NAME_RE.search(text)
         
         store_name = store_name_match.group(1).strip() if store_name_match else None
         
@@ -202,31 +301,29 @@ def extract_store_info(text: str) -> Optional[Dict[str, Any]]:
         return None
 
 
-def validate_shift_request_data(data: Dict[str, Any]) -> bool:
+# time_slotとして受け付ける値
+_VALID_SLOTS = frozenset(slot.value for slot in TimeSlot)
+
+
+def validate_shift_request_data(data: ParsedShiftRequest) -> bool:
     """シフト依頼データの妥当性を検証"""
     try:
-        required_fields = ["date", "time_slot", "required_count"]
-        
-        for field in required_fields:
-            if field not in data:
-                return False
-        
         # 日付の妥当性
-        if not isinstance(data["date"], date):
+        if not isinstance(data.date, date):
             return False
         
-        if data["date"] < date.today():
+        if data.date < today_date():
             return False
         
         # 時間帯の妥当性
-        if data["time_slot"] not in [slot.value for slot in TimeSlot]:
+        if data.time_slot not in _VALID_SLOTS:
             return False
         
         # 人数の妥当性
-        if not isinstance(data["required_count"], int):
+        if not isinstance(data.required_count, int):
             return False
         
-        if data["required_count"] < 1 or data["required_count"] > 3:
+        if data.required_count < 1 or data.required_count > 3:
             return False
         
         return True
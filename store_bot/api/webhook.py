@@ -1,7 +1,10 @@
+import asyncio
 import logging
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
 from datetime import datetime, timedelta
-from fastapi import APIRouter, Request, HTTPException
+from fastapi import APIRouter, Request, HTTPException, BackgroundTasks, Response
+from fastapi.concurrency import run_in_threadpool
 from linebot.exceptions import InvalidSignatureError
 from linebot.models import (
     TextMessage, 
@@ -15,176 +18,327 @@ from linebot.models import (
     UnfollowEvent
 )
 import re
+import orjson
 
-from store_bot.config import store_settings
-from store_bot.services.line_bot_service import store_line_bot_service
-from store_bot.services.schedule_service import store_schedule_service
+from store_bot.services.line_bot_service import get_store_line_bot_service
+from store_bot.services.schedule_service import get_store_schedule_service
+from store_bot.services.temp_store import get_store_temp_store
 from shared.models.user import Store
-from shared.utils.text_parser import parse_shift_request
+from shared.utils.text_parser import ParsedShiftRequest, parse_shift_request
+from shared.utils.clock import today_date
+from shared.utils.messages import GUIDE_MESSAGE
+from shared.services.line_http_client import reply_or_push, submit_line_call
+from shared.services.event_deduplicator import EventDeduplicator
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/store", tags=["store"])
 
-# 店舗ユーザーの一時データ保存
-store_temp_data: Dict[str, Dict[str, Any]] = {}
-
-GUIDE_TEXT = (
-    "\U0001F3E5 薬局シフト管理Botへようこそ！\n\n"
-    "このBotは薬局の勤務シフト管理を効率化します。\n\n"
-    "\U0001F4CB 利用方法を選択してください：\n\n"
-    "\U0001F3EA 【店舗の方】\n"
-    "• 店舗登録がお済みでない方は、\n"
-    "店舗登録、 店舗番号、店舗名を送信してください！\n"
-    "例：店舗登録 002 サンライズ薬局\n\n"
-    "\U0001F48A 【薬剤師の方】\n"
-    "• 登録がお済みでない方は、\n"
-    "お名前、電話番号を送信してください！\n"
-    "例：田中薬剤師,090-1234-5678\n\n"
-    "登録は簡単で、すぐに利用開始できます！"
+# Webhookへの応答本文（Responseはバックグラウンド処理を保持するため共有せず、本文だけ使い回す）
+_OK_BODY = orjson.dumps({"status": "ok"})
+
+# 処理済みWebhookイベント（LINEの再送による二重の依頼確定を防ぐ）
+store_event_deduplicator = EventDeduplicator()
+
+
+# 依頼フローの選択肢テンプレート（内容が固定のため起動時に一度だけ作成）
+_SHIFT_REQUEST_TEMPLATE = TemplateSendMessage(
+    alt_text="勤務依頼",
+    template=ButtonsTemplate(
+        title="勤務依頼",
+        text="項目を選択してください",
+        actions=[
+            PostbackAction(label="日付選択", data="select_date"),
+            PostbackAction(label="時間帯選択", data="select_time"),
+            PostbackAction(label="人数選択", data="select_count")
+        ]
+    )
+)
+_DATE_TEMPLATE = TemplateSendMessage(
+    alt_text="日付を選択してください",
+    template=ButtonsTemplate(
+        title="勤務日を選択",
+        text="どの日を希望されますか？",
+        actions=[
+            PostbackAction(label="今日", data="date_today"),
+            PostbackAction(label="明日", data="date_tomorrow"),
+            PostbackAction(label="明後日", data="date_day_after_tomorrow"),
+            PostbackAction(label="日付を指定", data="date_custom")
+        ]
+    )
+)
+_TIME_TEMPLATE = TemplateSendMessage(
+    alt_text="時間帯を選択してください",
+    template=ButtonsTemplate(
+        title="勤務時間帯を選択",
+        text="どの時間帯を希望されますか？",
+        actions=[
+            PostbackAction(label="午前 (9:00-13:00)", data="time_morning"),
+            PostbackAction(label="午後 (13:00-17:00)", data="time_afternoon"),
+            PostbackAction(label="夜間 (17:00-21:00)", data="time_evening"),
+            PostbackAction(label="終日 (9:00-18:00)", data="time_full_day")
+        ]
+    )
+)
+_COUNT_TEMPLATE = TemplateSendMessage(
+    alt_text="必要人数を選択してください",
+    template=ButtonsTemplate(
+        title="必要人数を選択",
+        text="何名必要ですか？",
+        actions=[
+            PostbackAction(label="1名", data="count_1"),
+            PostbackAction(label="2名", data="count_2"),
+            PostbackAction(label="3名", data="count_3"),
+            PostbackAction(label="4名以上", data="count_4_plus")
+        ]
+    )
+)
+
+# 依頼フローの固定文言の返信（内容が固定のため起動時に一度だけ作成）
+_CUSTOM_DATE_PROMPT_MSG = TextSendMessage(text="日付を入力してください。\n例: 4/15, 4月15日, 2024/4/15")
+_INVALID_DATE_MSG = TextSendMessage(text="無効な日付選択です。")
+_REQUEST_NOT_FOUND_MSG = TextSendMessage(text="依頼内容が見つかりません。最初からやり直してください。")
+_STORE_NOT_FOUND_MSG = TextSendMessage(text="店舗情報の取得に失敗しました。")
+_PAST_DATE_MSG = TextSendMessage(text="過去の日付では依頼できません。日付を選び直してください。")
+_NO_PHARMACIST_MSG = TextSendMessage(
+    text="⚠️ 依頼を確定しましたが、\n"
+         "空き薬剤師が見つかりませんでした。\n"
+         "別の日時で再度お試しください。"
 )
+_CANCELLED_MSG = TextSendMessage(
+    text="依頼をキャンセルしました。\n"
+         "再度「勤務依頼」と入力して、最初からやり直してください。"
+)
+
+# 例外発生時の返信（処理ごとに文言は固定のため起動時に一度だけ作成）
+_GENERIC_ERROR_MSG = TextSendMessage(text="申し訳ございません。エラーが発生しました。")
+_POSTBACK_ERROR_MSG = TextSendMessage(text="エラーが発生しました。もう一度お試しください。")
+_SHIFT_REQUEST_ERROR_MSG = TextSendMessage(text="シフト依頼処理中にエラーが発生しました。")
+_PARSED_REQUEST_ERROR_MSG = TextSendMessage(text="依頼内容の処理中にエラーが発生しました。")
+_DATE_ERROR_MSG = TextSendMessage(text="日付選択でエラーが発生しました。")
+_TIME_ERROR_MSG = TextSendMessage(text="時間選択でエラーが発生しました。")
+_COUNT_ERROR_MSG = TextSendMessage(text="人数選択でエラーが発生しました。")
+_CONFIRM_ERROR_MSG = TextSendMessage(text="確定処理中にエラーが発生しました。")
+_CANCEL_ERROR_MSG = TextSendMessage(text="キャンセル処理中にエラーが発生しました。")
+
+# 日付の選択肢のポストバック → 今日からの日数
+_DATE_CHOICE_OFFSETS = {
+    "date_today": timedelta(0),
+    "date_tomorrow": timedelta(days=1),
+    "date_day_after_tomorrow": timedelta(days=2)
+}
+# 時間帯・人数の選択肢のポストバック → 表示用ラベル
+_TIME_LABELS = {
+    "time_morning": "午前 (9:00-13:00)",
+    "time_afternoon": "午後 (13:00-17:00)",
+    "time_evening": "夜間 (17:00-21:00)",
+    "time_full_day": "終日 (9:00-18:00)"
+}
+_COUNT_LABELS = {
+    "count_1": "1名",
+    "count_2": "2名",
+    "count_3": "3名",
+    "count_4_plus": "4名以上"
+}
+
+
+def _fmt_ymd(d) -> str:
+    """日付を「YYYY/MM/DD」形式に整形（固定書式のためstrftimeを使わない）"""
+    return f"{d.year:04d}/{d.month:02d}/{d.day:02d}"
+
+
+# タイトル付きButtonsTemplateの本文の最大文字数（LINEの制限）
+BUTTONS_TEXT_MAX_LENGTH = 60
+
+
+def _with_selection_text(base: TemplateSendMessage, text: str) -> List[Any]:
+    """選択肢テンプレートの本文を差し替えたメッセージを作成
+
+    本文が文字数制限を超える場合は、従来どおりテキストと元のテンプレートの2通にする。
+    """
+    if len(text) > BUTTONS_TEXT_MAX_LENGTH:
+        return [TextSendMessage(text=text), base]
+    template = ButtonsTemplate(
+        title=base.template.title,
+        text=text,
+        actions=base.template.actions
+    )
+    return [TemplateSendMessage(alt_text=base.alt_text, template=template)]
+
+
+# 依頼内容の確認メッセージ（テキスト入力とボタン選択の両方で使う）
+_CONFIRM_FMT = (
+    "【依頼内容の確認】\n\n"
+    "📅 日付: {date}\n"
+    "⏰ 時間帯: {time}\n"
+    "👥 人数: {count}\n"
+    "{notes}\n"
+    "この内容で依頼を送信しますか？\n"
+    "「はい」または「いいえ」でお答えください。"
+)
+_CONFIRM_NOTES_FMT = "📝 備考: %s\n"
+
+# 日付・時間帯を選択した後の返信の本文
+_DATE_ACK_FMT = "✅日付: %s\n次に時間帯を選択してください。"
+_TIME_ACK_FMT = "時間帯: %s\n次に必要人数を選択してください。"
+
+
+@lru_cache(maxsize=32)
+def _date_choice_reply(date_text: str) -> Tuple[Any, ...]:
+    """日付選択後の返信（同じ日付では作成済みのメッセージを使い回す）"""
+    return tuple(_with_selection_text(_TIME_TEMPLATE, _DATE_ACK_FMT % date_text))
+
+
+@lru_cache(maxsize=32)
+def _time_choice_reply(time_text: str) -> Tuple[Any, ...]:
+    """時間帯選択後の返信（時間帯ごとに作成済みのメッセージを使い回す）"""
+    return tuple(_with_selection_text(_COUNT_TEMPLATE, _TIME_ACK_FMT % time_text))
+
+
+def dispatch_store_event(event):
+    """解析済みイベントを種類ごとのハンドラーに振り分け"""
+    # 応答後に処理するため、LINEの再送で届いた処理済みイベントはここで除く
+    if store_event_deduplicator.is_duplicate(event):
+        logger.info("Duplicate store event skipped: %s", store_event_deduplicator.event_key(event))
+        return
+    if isinstance(event, FollowEvent):
+        handle_store_follow(event)
+    elif isinstance(event, MessageEvent) and isinstance(event.message, TextMessage):
+        handle_store_text_message(event)
+    elif isinstance(event, PostbackEvent):
+        handle_store_postback(event)
+    else:
+        logger.info("Unhandled store event type: %s", type(event).__name__)
+
+
+def _dispatch_user_events(events: List[Any]):
+    """同じユーザーのイベントを届いた順に処理"""
+    for event in events:
+        try:
+            dispatch_store_event(event)
+        except Exception as e:
+            logger.error("Store webhook handling error: %s", e)
+
+
+async def dispatch_store_events(events: List[Any]):
+    """1回のWebhookで届いたイベントを処理（応答後にバックグラウンドで実行）
+
+    同じユーザーのイベントは順番を保ち、別々のユーザーのイベントは
+    スレッドプールで並行して処理する（LINE APIの応答待ちで他のユーザーを待たせない）。
+    """
+    events_by_user: Dict[Any, List[Any]] = {}
+    for event in events:
+        events_by_user.setdefault(getattr(event.source, "user_id", None), []).append(event)
+    await asyncio.gather(*(
+        run_in_threadpool(_dispatch_user_events, user_events)
+        for user_events in events_by_user.values()
+    ))
 
 
 @router.post("/webhook")
-async def store_webhook(request: Request):
+async def store_webhook(request: Request, background_tasks: BackgroundTasks):
     """店舗Bot Webhook エンドポイント"""
     try:
         # リクエストボディを取得
         body = await request.body()
         signature = request.headers.get('X-Line-Signature', '')
         
-        # 署名を検証
+        # 署名検証と解析だけ済ませてすぐに応答し、イベント処理は応答後に行う
+        # （本文はデコードせずバイト列のままorjsonで解析する）
         try:
-            store_line_bot_service.handler.handle(body.decode('utf-8'), signature)
+            events = get_store_line_bot_service().parser.parse(body, signature)
         except InvalidSignatureError:
             logger.error("Invalid signature")
             raise HTTPException(status_code=400, detail="Invalid signature")
+        background_tasks.add_task(dispatch_store_events, events)
         
-        return {"status": "ok"}
+        # 応答本文は固定のため、エンコード済みのバイト列をそのまま返す
+        return Response(content=_OK_BODY, media_type="application/json")
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Store webhook error: {e}")
+        logger.error("Store webhook error: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
-@store_line_bot_service.handler.add(FollowEvent)
 def handle_store_follow(event):
     """店舗ユーザーの友達追加時の処理"""
     try:
         user_id = event.source.user_id
-        logger.info(f"New store user followed: {user_id}")
-        profile = store_line_bot_service.line_bot_api.get_profile(user_id)
-        user_name = profile.display_name
-        logger.info(f"Store user profile: {user_name} ({user_id})")
-        welcome_message = TextSendMessage(
-            text="\U0001F3E5 薬局シフト管理Botへようこそ！\n\n"
-                 "このBotは薬局の勤務シフト管理を効率化します。\n\n"
-                 "\U0001F4CB 利用方法を選択してください：\n\n"
-                 "\U0001F3EA 【店舗の方】\n"
-                 "• 店舗登録がお済みでない方は、\n"
-                 "店舗登録、 店舗番号、店舗名を送信してください！\n"
-                 "例：店舗登録 002 サンライズ薬局\n\n"
-                 "\U0001F48A 【薬剤師の方】\n"
-                 "• 登録がお済みでない方は、\n"
-                 "お名前、電話番号を送信してください！\n"
-                 "例：田中薬剤師,090-1234-5678\n\n"
-                 "登録は簡単で、すぐに利用開始できます！"
-        )
-        store_line_bot_service.line_bot_api.reply_message(
-            event.reply_token,
-            welcome_message
-        )
-        logger.info(f"Sent welcome message to store user {user_name} ({user_id})")
+        logger.info("New store user followed: %s", user_id)
+        # 案内文はプロフィールに依存しないため先に返信し、プロフィールは記録用に別スレッドで取得する
+        get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, GUIDE_MESSAGE)
+        logger.info("Sent welcome message to store user %s", user_id)
+        submit_line_call(_log_store_profile, user_id, description=f"store profile {user_id}")
     except Exception as e:
-        logger.error(f"Error handling store follow event: {e}")
-        error_message = TextSendMessage(
-            text="\U0001F3E5 薬局シフト管理Botへようこそ！\n\n"
-                 "このBotは薬局の勤務シフト管理を効率化します。\n\n"
-                 "\U0001F4CB 利用方法を選択してください：\n\n"
-                 "\U0001F3EA 【店舗の方】\n"
-                 "• 店舗登録がお済みでない方は、\n"
-                 "店舗登録、 店舗番号、店舗名を送信してください！\n"
-                 "例：店舗登録 002 サンライズ薬局\n\n"
-                 "\U0001F48A 【薬剤師の方】\n"
-                 "• 登録がお済みでない方は、\n"
-                 "お名前、電話番号を送信してください！\n"
-                 "例：田中薬剤師,090-1234-5678\n\n"
-                 "登録は簡単で、すぐに利用開始できます！"
-        )
-        store_line_bot_service.line_bot_api.reply_message(
-            event.reply_token,
-            error_message
-        )
+        logger.error("Error handling store follow event: %s", e)
+        get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, GUIDE_MESSAGE)
+
+
+def _log_store_profile(user_id: str):
+    """友達追加した店舗ユーザーの表示名を記録"""
+    profile = get_store_line_bot_service().line_bot_api.get_profile(user_id)
+    logger.info("Store user profile: %s (%s)", profile.display_name, user_id)
 
 
-@store_line_bot_service.handler.add(MessageEvent, message=TextMessage)
 def handle_store_text_message(event):
     """店舗ユーザーのテキストメッセージ処理"""
     try:
         user_id = event.source.user_id
         message_text = event.message.text
         
-        logger.info(f"Received text message from store user {user_id}: {message_text}")
+        logger.info("Received text message from store user %s: %s", user_id, message_text)
         
-        # 勤務依頼の処理
+        # 勤務依頼の処理（部分一致は短い文字列のためinの方が正規表現より速い）
         if "勤務依頼" in message_text or "シフト" in message_text:
             handle_store_shift_request(event, message_text)
             return
         
-        # 確認応答の処理
-        if message_text in ["はい", "確認", "確定"]:
-            handle_store_confirmation_yes(event)
-            return
-        
-        if message_text in ["いいえ", "キャンセル", "取り消し"]:
-            handle_store_confirmation_no(event)
+        # 確認応答の処理（完全一致は表引き）
+        handler = _STORE_TEXT_HANDLERS.get(message_text)
+        if handler:
+            handler(event)
             return
         
         # その他のメッセージ
         handle_store_other_messages(event, message_text)
         
     except Exception as e:
-        logger.error(f"Error handling store text message: {e}")
-        error_message = TextSendMessage(text="申し訳ございません。エラーが発生しました。")
-        store_line_bot_service.line_bot_api.reply_message(event.reply_token, error_message)
+        logger.error("Error handling store text message: %s", e)
+        get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, _GENERIC_ERROR_MSG)
 
 
-@store_line_bot_service.handler.add(PostbackEvent)
 def handle_store_postback(event):
     """店舗ユーザーのポストバックイベント処理"""
     try:
         user_id = event.source.user_id
         postback_data = event.postback.data
         
-        logger.info(f"Received postback from store user {user_id}: {postback_data}")
-        
-        # ポストバックデータを解析
-        if postback_data == "select_date":
-            handle_store_date_selection(event)
-        elif postback_data == "select_time":
-            handle_store_time_selection(event)
-        elif postback_data == "select_count":
-            handle_store_count_selection(event)
-        elif postback_data.startswith("date_"):
-            handle_store_date_choice(event, postback_data)
-        elif postback_data.startswith("time_"):
-            handle_store_time_choice(event, postback_data)
-        elif postback_data.startswith("count_"):
-            handle_store_count_choice(event, postback_data)
-        else:
-            logger.warning(f"Unknown store postback data: {postback_data}")
+        logger.info("Received postback from store user %s: %s", user_id, postback_data)
+        
+        # ポストバックデータを解析（項目選択は完全一致、選択肢は接頭辞で振り分け）
+        handler = _STORE_POSTBACK_HANDLERS.get(postback_data)
+        if handler:
+            handler(event)
+            return
+        prefix, sep, _ = postback_data.partition("_")
+        choice_handler = _STORE_POSTBACK_PREFIX_HANDLERS.get(prefix) if sep else None
+        if choice_handler:
+            choice_handler(event, postback_data)
+            return
+        logger.warning("Unknown store postback data: %s", postback_data)
             
     except Exception as e:
-        logger.error(f"Error handling store postback: {e}")
-        error_response = TextSendMessage(text="エラーが発生しました。もう一度お試しください。")
-        store_line_bot_service.line_bot_api.reply_message(event.reply_token, error_response)
+        logger.error("Error handling store postback: %s", e)
+        get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, _POSTBACK_ERROR_MSG)
 
 
 def handle_store_shift_request(event, message_text: str):
     """店舗のシフト依頼処理"""
     try:
         user_id = event.source.user_id
-        print(f"[DEBUG] handle_store_shift_request: user_id={user_id}, message_text='{message_text}'")
+        logger.debug("handle_store_shift_request: user_id=%s, message_text='%s'", user_id, message_text)
         
         # メッセージを解析
         parsed_data = parse_shift_request(message_text)
@@ -195,149 +349,93 @@ def handle_store_shift_request(event, message_text: str):
         else:
             # 解析できない場合は選択式のフォームを表示
             template = create_store_shift_request_template()
-            store_line_bot_service.line_bot_api.reply_message(event.reply_token, template)
+            get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, template)
             
     except Exception as e:
-        logger.error(f"Error in handle_store_shift_request: {e}")
-        error_response = TextSendMessage(text="シフト依頼処理中にエラーが発生しました。")
-        store_line_bot_service.line_bot_api.reply_message(event.reply_token, error_response)
+        logger.error("Error in handle_store_shift_request: %s", e)
+        get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, _SHIFT_REQUEST_ERROR_MSG)
 
 
-def handle_store_parsed_shift_request(event, parsed_data):
+def handle_store_parsed_shift_request(event, parsed_data: ParsedShiftRequest):
     """解析済みシフト依頼の処理（店舗）"""
     user_id = event.source.user_id
-    print(f"[DEBUG] handle_store_parsed_shift_request: user_id={user_id}, parsed_data={parsed_data}")
+    logger.debug("handle_store_parsed_shift_request: user_id=%s, parsed_data=%s", user_id, parsed_data)
     try:
         # 依頼内容を一時保存
-        if user_id not in store_temp_data:
-            store_temp_data[user_id] = {}
-        store_temp_data[user_id]["date"] = parsed_data["date"]
-        store_temp_data[user_id]["time_slot"] = parsed_data["time_slot"]
-        store_temp_data[user_id]["required_count"] = parsed_data["required_count"]
-        store_temp_data[user_id]["notes"] = parsed_data.get("notes", "")
+        get_store_temp_store().update(
+            user_id,
+            date=parsed_data.date,
+            time_slot=parsed_data.time_slot,
+            required_count=parsed_data.required_count,
+            notes=parsed_data.notes
+        )
         
         # 依頼内容確認メッセージを見やすく整形
         response = TextSendMessage(
-            text=(
-                "【依頼内容の確認】\n\n"
-                f"📅 日付: {parsed_data['date'].strftime('%Y/%m/%d')}\n"
-                f"⏰ 時間帯: {parsed_data['time_slot']}\n"
-                f"👥 人数: {parsed_data['required_count']}名\n"
-                f"📝 備考: {parsed_data.get('notes', 'なし')}\n\n"
-                "この内容で依頼を送信しますか？\n"
-                "「はい」または「いいえ」でお答えください。"
+            text=_CONFIRM_FMT.format(
+                date=_fmt_ymd(parsed_data.date),
+                time=parsed_data.time_slot,
+                count=f"{parsed_data.required_count}名",
+                notes=_CONFIRM_NOTES_FMT % parsed_data.notes,
             )
         )
-        store_line_bot_service.line_bot_api.reply_message(event.reply_token, response)
+        get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, response)
     except Exception as e:
-        logger.error(f"Error in handle_store_parsed_shift_request: {e}")
-        error_response = TextSendMessage(text="依頼内容の処理中にエラーが発生しました。")
-        store_line_bot_service.line_bot_api.reply_message(event.reply_token, error_response)
+        logger.error("Error in handle_store_parsed_shift_request: %s", e)
+        get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, _PARSED_REQUEST_ERROR_MSG)
 
 
 def create_store_shift_request_template() -> TemplateSendMessage:
-    """店舗用シフト依頼テンプレートを作成"""
-    buttons = [
-        PostbackAction(label="日付選択", data="select_date"),
-        PostbackAction(label="時間帯選択", data="select_time"),
-        PostbackAction(label="人数選択", data="select_count")
-    ]
-    
-    template = ButtonsTemplate(
-        title="勤務依頼",
-        text="項目を選択してください",
-        actions=buttons
-    )
-    
-    return TemplateSendMessage(alt_text="勤務依頼", template=template)
+    """店舗用シフト依頼テンプレートを取得"""
+    return _SHIFT_REQUEST_TEMPLATE
 
 
+@lru_cache(maxsize=1024)
 def get_store_by_user_id(user_id: str) -> Store:
-    """ユーザーIDから店舗情報を取得"""
-    # 簡易実装
+    """ユーザーIDから店舗情報を取得
+
+    user_idごとに店舗は一つなので、取得結果をキャッシュして確定のたびに作り直さない。
+    """
+    # 簡易実装（作成日時と更新日時は同じ時刻にそろえる）
+    now = datetime.now()
     return Store(
         id=f"store_{user_id}",
         user_id=user_id,
         store_number="001",
         store_name="メイプル薬局",
-        created_at=datetime.now(),
-        updated_at=datetime.now()
+        created_at=now,
+        updated_at=now
     )
 
 
 def handle_store_date_selection(event):
     """店舗の日付選択処理"""
     try:
-        template = TemplateSendMessage(
-            alt_text="日付を選択してください",
-            template=ButtonsTemplate(
-                title="勤務日を選択",
-                text="どの日を希望されますか？",
-                actions=[
-                    PostbackAction(label="今日", data="date_today"),
-                    PostbackAction(label="明日", data="date_tomorrow"),
-                    PostbackAction(label="明後日", data="date_day_after_tomorrow"),
-                    PostbackAction(label="日付を指定", data="date_custom")
-                ]
-            )
-        )
-        
-        store_line_bot_service.line_bot_api.reply_message(event.reply_token, template)
+        get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, _DATE_TEMPLATE)
         
     except Exception as e:
-        logger.error(f"Error handling store date selection: {e}")
-        error_response = TextSendMessage(text="日付選択でエラーが発生しました。")
-        store_line_bot_service.line_bot_api.reply_message(event.reply_token, error_response)
+        logger.error("Error handling store date selection: %s", e)
+        get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, _DATE_ERROR_MSG)
 
 
 def handle_store_time_selection(event):
     """店舗の時間選択処理"""
     try:
-        template = TemplateSendMessage(
-            alt_text="時間帯を選択してください",
-            template=ButtonsTemplate(
-                title="勤務時間帯を選択",
-                text="どの時間帯を希望されますか？",
-                actions=[
-                    PostbackAction(label="午前 (9:00-13:00)", data="time_morning"),
-                    PostbackAction(label="午後 (13:00-17:00)", data="time_afternoon"),
-                    PostbackAction(label="夜間 (17:00-21:00)", data="time_evening"),
-                    PostbackAction(label="終日 (9:00-18:00)", data="time_full_day")
-                ]
-            )
-        )
-        
-        store_line_bot_service.line_bot_api.reply_message(event.reply_token, template)
+        get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, _TIME_TEMPLATE)
         
     except Exception as e:
-        logger.error(f"Error handling store time selection: {e}")
-        error_response = TextSendMessage(text="時間選択でエラーが発生しました。")
-        store_line_bot_service.line_bot_api.reply_message(event.reply_token, error_response)
+        logger.error("Error handling store time selection: %s", e)
+        get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, _TIME_ERROR_MSG)
 
 
 def handle_store_count_selection(event):
     """店舗の人数選択処理"""
     try:
-        template = TemplateSendMessage(
-            alt_text="必要人数を選択してください",
-            template=ButtonsTemplate(
-                title="必要人数を選択",
-                text="何名必要ですか？",
-                actions=[
-                    PostbackAction(label="1名", data="count_1"),
-                    PostbackAction(label="2名", data="count_2"),
-                    PostbackAction(label="3名", data="count_3"),
-                    PostbackAction(label="4名以上", data="count_4_plus")
-                ]
-            )
-        )
-        
-        store_line_bot_service.line_bot_api.reply_message(event.reply_token, template)
+        get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, _COUNT_TEMPLATE)
         
     except Exception as e:
-        logger.error(f"Error handling store count selection: {e}")
-        error_response = TextSendMessage(text="人数選択でエラーが発生しました。")
-        store_line_bot_service.line_bot_api.reply_message(event.reply_token, error_response)
+        logger.error("Error handling store count selection: %s", e)
+        get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, _COUNT_ERROR_MSG)
 
 
 def handle_store_date_choice(event, postback_data: str):
@@ -345,50 +443,24 @@ def handle_store_date_choice(event, postback_data: str):
     try:
         user_id = event.source.user_id
         # 選択された日付を取得
-        if postback_data == "date_today":
-            selected_date = datetime.now().date()
-        elif postback_data == "date_tomorrow":
-            selected_date = (datetime.now() + timedelta(days=1)).date()
-        elif postback_data == "date_day_after_tomorrow":
-            selected_date = (datetime.now() + timedelta(days=2)).date()
+        offset = _DATE_CHOICE_OFFSETS.get(postback_data)
+        if offset is not None:
+            selected_date = today_date() + offset
         elif postback_data == "date_custom":
-            response = TextSendMessage(
-                text="日付を入力してください。\n例: 4/15, 4月15日, 2024/4/15"
-            )
-            store_line_bot_service.line_bot_api.reply_message(event.reply_token, response)
+            get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, _CUSTOM_DATE_PROMPT_MSG)
             return
         else:
-            response = TextSendMessage(text="無効な日付選択です。")
-            store_line_bot_service.line_bot_api.reply_message(event.reply_token, response)
+            get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, _INVALID_DATE_MSG)
             return
         # 一時データに日付を保存
-        if user_id not in store_temp_data:
-            store_temp_data[user_id] = {}
-        store_temp_data[user_id]["date"] = selected_date
-        store_temp_data[user_id]["date_text"] = selected_date.strftime('%Y/%m/%d')
-        logger.info(f"Saved date for store user {user_id}: {selected_date}")
-        # 次のステップ（時間選択）に進む
-        response = TextSendMessage(
-            text=f"✅日付: {selected_date.strftime('%Y/%m/%d')}\n次に時間帯を選択してください。"
-        )
-        time_template = TemplateSendMessage(
-            alt_text="時間帯を選択してください",
-            template=ButtonsTemplate(
-                title="勤務時間帯を選択",
-                text="どの時間帯を希望されますか？",
-                actions=[
-                    PostbackAction(label="午前 (9:00-13:00)", data="time_morning"),
-                    PostbackAction(label="午後 (13:00-17:00)", data="time_afternoon"),
-                    PostbackAction(label="夜間 (17:00-21:00)", data="time_evening"),
-                    PostbackAction(label="終日 (9:00-18:00)", data="time_full_day")
-                ]
-            )
-        )
-        store_line_bot_service.line_bot_api.reply_message(event.reply_token, [response, time_template])
+        date_text = _fmt_ymd(selected_date)
+        get_store_temp_store().update(user_id, date=selected_date, date_text=date_text)
+        logger.info("Saved date for store user %s: %s", user_id, selected_date)
+        # 次のステップ（時間選択）に進む（選択内容はテンプレートの本文に含めて1通で返す）
+        get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, _date_choice_reply(date_text))
     except Exception as e:
-        logger.error(f"Error handling store date choice: {e}")
-        error_response = TextSendMessage(text="日付選択でエラーが発生しました。")
-        store_line_bot_service.line_bot_api.reply_message(event.reply_token, error_response)
+        logger.error("Error handling store date choice: %s", e)
+        get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, _DATE_ERROR_MSG)
 
 
 def handle_store_time_choice(event, postback_data: str):
@@ -397,46 +469,19 @@ def handle_store_time_choice(event, postback_data: str):
         user_id = event.source.user_id
         
         # 選択された時間帯を取得
-        time_mapping = {
-            "time_morning": "午前 (9:00-13:00)",
-            "time_afternoon": "午後 (13:00-17:00)",
-            "time_evening": "夜間 (17:00-21:00)",
-            "time_full_day": "終日 (9:00-18:00)"
-        }
-        
-        selected_time = time_mapping.get(postback_data, "不明")
+        selected_time = _TIME_LABELS.get(postback_data, "不明")
         
         # 一時データに時間を保存
-        if user_id not in store_temp_data:
-            store_temp_data[user_id] = {}
-        store_temp_data[user_id]["time"] = postback_data
-        store_temp_data[user_id]["time_text"] = selected_time
+        get_store_temp_store().update(user_id, time=postback_data, time_text=selected_time)
         
-        logger.info(f"Saved time for store user {user_id}: {selected_time}")
+        logger.info("Saved time for store user %s: %s", user_id, selected_time)
         
-        # 次のステップ（人数選択）に進む
-        response = TextSendMessage(
-            text=f"時間帯: {selected_time}\n次に必要人数を選択してください。"
-        )
-        count_template = TemplateSendMessage(
-            alt_text="必要人数を選択してください",
-            template=ButtonsTemplate(
-                title="必要人数を選択",
-                text="何名必要ですか？",
-                actions=[
-                    PostbackAction(label="1名", data="count_1"),
-                    PostbackAction(label="2名", data="count_2"),
-                    PostbackAction(label="3名", data="count_3"),
-                    PostbackAction(label="4名以上", data="count_4_plus")
-                ]
-            )
-        )
-        store_line_bot_service.line_bot_api.reply_message(event.reply_token, [response, count_template])
+        # 次のステップ（人数選択）に進む（選択内容はテンプレートの本文に含めて1通で返す）
+        get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, _time_choice_reply(selected_time))
         
     except Exception as e:
-        logger.error(f"Error handling store time choice: {e}")
-        error_response = TextSendMessage(text="時間選択でエラーが発生しました。")
-        store_line_bot_service.line_bot_api.reply_message(event.reply_token, error_response)
+        logger.error("Error handling store time choice: %s", e)
+        get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, _TIME_ERROR_MSG)
 
 
 def handle_store_count_choice(event, postback_data: str):
@@ -444,84 +489,74 @@ def handle_store_count_choice(event, postback_data: str):
     try:
         user_id = event.source.user_id
         # 選択された人数を取得
-        count_mapping = {
-            "count_1": "1名",
-            "count_2": "2名",
-            "count_3": "3名",
-            "count_4_plus": "4名以上"
-        }
-        selected_count = count_mapping.get(postback_data, "不明")
+        selected_count = _COUNT_LABELS.get(postback_data, "不明")
         # 一時データに人数を保存
-        if user_id not in store_temp_data:
-            store_temp_data[user_id] = {}
-        store_temp_data[user_id]["count"] = postback_data
-        store_temp_data[user_id]["count_text"] = selected_count
-        logger.info(f"Saved count for store user {user_id}: {selected_count}")
+        temp_data = get_store_temp_store().update(user_id, count=postback_data, count_text=selected_count)
+        logger.info("Saved count for store user %s: %s", user_id, selected_count)
         # 保存された依頼内容を取得
-        date = store_temp_data[user_id].get("date")
+        date = temp_data.get("date")
         if date:
-            date_str = date.strftime('%Y/%m/%d')
+            date_str = _fmt_ymd(date)
         else:
             date_str = "未選択"
-        time_text = store_temp_data[user_id].get("time_text", "未選択")
-        # 依頼内容の確認メッセージを見やすく整形
+        time_text = temp_data.get("time_text", "未選択")
+        # 依頼内容の確認メッセージを見やすく整形（ボタン選択では備考は入力されない）
         response = TextSendMessage(
-            text=(
-                "【依頼内容の確認】\n\n"
-                f"📅 日付: {date_str}\n"
-                f"⏰ 時間帯: {time_text}\n"
-                f"👥 人数: {selected_count}\n\n"
-                "この内容で依頼を送信しますか？\n"
-                "「はい」または「いいえ」でお答えください。"
-            )
+            text=_CONFIRM_FMT.format(date=date_str, time=time_text, count=selected_count, notes="")
         )
-        store_line_bot_service.line_bot_api.reply_message(event.reply_token, response)
+        get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, response)
     except Exception as e:
-        logger.error(f"Error handling store count choice: {e}")
-        error_response = TextSendMessage(text="人数選択でエラーが発生しました。")
-        store_line_bot_service.line_bot_api.reply_message(event.reply_token, error_response)
+        logger.error("Error handling store count choice: %s", e)
+        get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, _COUNT_ERROR_MSG)
 
 
 def handle_store_confirmation_yes(event):
     """店舗の依頼内容確定処理"""
     try:
         user_id = event.source.user_id
-        print(f"[DEBUG] handle_store_confirmation_yes: user_id={user_id}")
+        logger.debug("handle_store_confirmation_yes: user_id=%s", user_id)
         
-        # 保存された依頼内容を取得
-        temp_data = store_temp_data.get(user_id, {})
+        # 保存された依頼内容を取り出す（「はい」が連続して届いても依頼は1件だけ処理する）
+        temp_data = get_store_temp_store().pop(user_id)
         date = temp_data.get("date")
         time_slot = temp_data.get("time_slot")
         required_count = temp_data.get("required_count")
         notes = temp_data.get("notes", "")
         
         if not date or not time_slot or not required_count:
-            response = TextSendMessage(text="依頼内容が見つかりません。最初からやり直してください。")
-            store_line_bot_service.line_bot_api.reply_message(event.reply_token, response)
+            get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, _REQUEST_NOT_FOUND_MSG)
             return
         
         # 店舗情報を取得
         store = get_store_by_user_id(user_id)
         if not store:
-            response = TextSendMessage(text="店舗情報の取得に失敗しました。")
-            store_line_bot_service.line_bot_api.reply_message(event.reply_token, response)
+            # やり直せるように依頼内容を戻す
+            get_store_temp_store().update(user_id, **temp_data)
+            get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, _STORE_NOT_FOUND_MSG)
             return
         
         # シフト依頼を作成・処理
-        shift_request = store_schedule_service.create_shift_request(
-            store=store,
-            target_date=date,
-            time_slot=time_slot,
-            required_count=int(required_count) if isinstance(required_count, str) else required_count,
-            notes=notes
-        )
+        try:
+            shift_request = get_store_schedule_service().create_shift_request(
+                store=store,
+                target_date=date,
+                time_slot=time_slot,
+                required_count=int(required_count) if isinstance(required_count, str) else required_count,
+                notes=notes
+            )
+        except ValueError as e:
+            # 確認中に日付が過ぎた場合など。日付を選び直せるように依頼内容を戻す
+            logger.warning("Rejected shift request for user_id=%s: %s", user_id, e)
+            get_store_temp_store().update(user_id, **temp_data)
+            get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, _PAST_DATE_MSG)
+            return
         
-        success = store_schedule_service.process_shift_request(shift_request, store)
+        success = get_store_schedule_service().process_shift_request(shift_request, store)
         
         if success:
             response = TextSendMessage(
                 text=f"✅ 依頼を確定しました！\n\n"
-                     f"📅 日付: {date.strftime('%Y/%m/%d')}\n"
+                     f"📅 日付: {_fmt_ymd(date)}\n"
                      f"⏰ 時間帯: {time_slot}\n"
                      f"👥 人数: {required_count}名\n"
                      f"📝 備考: {notes or 'なし'}\n\n"
@@ -529,22 +564,14 @@ def handle_store_confirmation_yes(event):
                      f"応募があったらご連絡いたします。"
             )
         else:
-            response = TextSendMessage(
-                text=f"⚠️ 依頼を確定しましたが、\n"
-                     f"空き薬剤師が見つかりませんでした。\n"
-                     f"別の日時で再度お試しください。"
-            )
-        
-        # 一時データをクリア
-        if user_id in store_temp_data:
-            del store_temp_data[user_id]
+            response = _NO_PHARMACIST_MSG
         
-        store_line_bot_service.line_bot_api.reply_message(event.reply_token, response)
+        # 薬剤師の検索に時間がかかりreply_tokenが失効した場合はpushで送る
+        reply_or_push(get_store_line_bot_service().line_bot_api, event.reply_token, user_id, response)
         
     except Exception as e:
-        logger.error(f"Error handling store confirmation yes: {e}")
-        error_response = TextSendMessage(text="確定処理中にエラーが発生しました。")
-        store_line_bot_service.line_bot_api.reply_message(event.reply_token, error_response)
+        logger.error("Error handling store confirmation yes: %s", e)
+        get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, _CONFIRM_ERROR_MSG)
 
 
 def handle_store_confirmation_no(event):
@@ -553,48 +580,51 @@ def handle_store_confirmation_no(event):
         user_id = event.source.user_id
         
         # 一時データをクリア
-        if user_id in store_temp_data:
-            del store_temp_data[user_id]
-        logger.info(f"Cleared temp request for store user {user_id}")
+        get_store_temp_store().clear(user_id)
+        logger.info("Cleared temp request for store user %s", user_id)
         
-        response = TextSendMessage(
-            text="依頼をキャンセルしました。\n"
-                 "再度「勤務依頼」と入力して、最初からやり直してください。"
-        )
-        store_line_bot_service.line_bot_api.reply_message(event.reply_token, response)
+        get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, _CANCELLED_MSG)
         
     except Exception as e:
-        logger.error(f"Error handling store confirmation no: {e}")
-        error_response = TextSendMessage(text="キャンセル処理中にエラーが発生しました。")
-        store_line_bot_service.line_bot_api.reply_message(event.reply_token, error_response)
+        logger.error("Error handling store confirmation no: %s", e)
+        get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, _CANCEL_ERROR_MSG)
 
 
 def handle_store_other_messages(event, message_text: str):
     """店舗のその他のメッセージ処理"""
     try:
-        response = TextSendMessage(text=GUIDE_TEXT)
-        
-        store_line_bot_service.line_bot_api.reply_message(event.reply_token, response)
+        get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, GUIDE_MESSAGE)
         
     except Exception as e:
-        logger.error(f"Error handling store other messages: {e}")
-        error_message = TextSendMessage(text="申し訳ございません。エラーが発生しました。")
-        store_line_bot_service.line_bot_api.reply_message(event.reply_token, error_message) 
+        logger.error("Error handling store other messages: %s", e)
+        get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, _GENERIC_ERROR_MSG) 
 
 
 def send_guide_message(event):
-    guide_text = (
-        "\U0001F3E5 薬局シフト管理Botへようこそ！\n\n"
-        "このBotは薬局の勤務シフト管理を効率化します。\n\n"
-        "\U0001F4CB 利用方法を選択してください：\n\n"
-        "\U0001F3EA 【店舗の方】\n"
-        "• 店舗登録がお済みでない方は、\n"
-        "店舗登録、 店舗番号、店舗名を送信してください！\n"
-        "例：店舗登録 002 サンライズ薬局\n\n"
-        "\U0001F48A 【薬剤師の方】\n"
-        "• 登録がお済みでない方は、\n"
-        "お名前、電話番号を送信してください！\n"
-        "例：田中薬剤師,090-1234-5678\n\n"
-        "登録は簡単で、すぐに利用開始できます！"
-    )
-    store_line_bot_service.line_bot_api.reply_message(event.reply_token, TextSendMessage(text=guide_text)) 
\ No newline at end of file
+    """利用案内メッセージを返信"""
+    get_store_line_bot_service().line_bot_api.reply_message(event.reply_token, GUIDE_MESSAGE)
+
+
+# 項目選択ボタンのポストバック → 処理関数
+_STORE_POSTBACK_HANDLERS = {
+    "select_date": handle_store_date_selection,
+    "select_time": handle_store_time_selection,
+    "select_count": handle_store_count_selection,
+}
+
+# 選択肢のポストバックの接頭辞（最初の「_」より前） → 処理関数
+_STORE_POSTBACK_PREFIX_HANDLERS = {
+    "date": handle_store_date_choice,
+    "time": handle_store_time_choice,
+    "count": handle_store_count_choice,
+}
+
+# 確認応答のテキスト（完全一致） → 処理関数
+_STORE_TEXT_HANDLERS = {
+    "はい": handle_store_confirmation_yes,
+    "確認": handle_store_confirmation_yes,
+    "確定": handle_store_confirmation_yes,
+    "いいえ": handle_store_confirmation_no,
+    "キャンセル": handle_store_confirmation_no,
+    "取り消し": handle_store_confirmation_no,
+}
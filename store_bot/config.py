@@ -1,9 +1,13 @@
 import os
+from functools import lru_cache
 from typing import Optional
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class StoreBotSettings(BaseSettings):
+    # .envは一度だけ読み込み、店舗Botで使わない他Bot用の変数は無視する
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
     # LINE Bot設定（店舗専用）
     store_line_channel_access_token: str = ""
     store_line_channel_secret: str = ""
@@ -36,9 +40,9 @@ class StoreBotSettings(BaseSettings):
     @property
     def is_development(self) -> bool:
         return self.environment.lower() == "development"
-    
-    class Config:
-        env_file = ".env"
 
 
-store_settings = StoreBotSettings() 
\ No newline at end of file
+@lru_cache(maxsize=1)
+def get_store_settings() -> StoreBotSettings:
+    """店舗Bot設定を取得（プロセス内で同一インスタンスを返す）"""
+    return StoreBotSettings()
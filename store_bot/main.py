@@ -1,9 +1,14 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 import logging
 
-from store_bot.api.webhook import router as store_webhook_router
-from store_bot.config import store_settings
+from store_bot.api.webhook import router as store_webhook_router, store_event_deduplicator
+from store_bot.config import get_store_settings
+from store_bot.services.schedule_service import get_store_schedule_service
+from store_bot.services.temp_store import get_store_temp_store
+from shared.services.line_http_client import line_push_executor, warm_up_line_session
+from shared.utils.text_parser import get_parse_cache_stats
 
 # ログ設定
 logging.basicConfig(
@@ -15,7 +20,8 @@ logging.basicConfig(
 app = FastAPI(
     title="薬局シフト管理Bot（店舗版）",
     description="薬局の勤務依頼管理を効率化するLINE Bot",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS設定
@@ -30,6 +36,27 @@ app.add_middleware(
 # ルーターの追加
 app.include_router(store_webhook_router)
 
+@app.on_event("startup")
+def warm_up_connections():
+    # DEBUG設定時のみ店舗Botのデバッグログを出力（本番のINFOレベルではlogger.debugの整形も行われない）
+    if get_store_settings().debug:
+        logging.getLogger("store_bot").setLevel(logging.DEBUG)
+    # 一時データの保存先（Redisの接続確認を含む）は最初のWebhookを待たずに起動時に作成
+    get_store_temp_store()
+    # Google Sheetsの認証情報の読み込みも最初の依頼確定を待たずに済ませる
+    get_store_schedule_service()
+    # 最初のWebhookの返信でLINE APIとの接続確立を待たないよう、起動時に接続しておく
+    line_push_executor.submit(warm_up_line_session)
+
+@app.on_event("shutdown")
+def flush_background_tasks():
+    # 未記録のシフト依頼・応募の確定をGoogle Sheetsに反映してから終了
+    store_schedule_service = get_store_schedule_service()
+    store_schedule_service.shift_request_batcher.join()
+    store_schedule_service.application_status_batcher.join()
+    # 送信待ちのLINE通知を完了させる
+    line_push_executor.shutdown(wait=True)
+
 @app.get("/")
 async def root():
     return {
@@ -42,11 +69,22 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def metrics():
+    return {
+        "shift_request_parse_cache": get_parse_cache_stats(),
+        "event_deduplicator": store_event_deduplicator.get_stats()
+    }
+
 if __name__ == "__main__":
+    store_settings = get_store_settings()
     import uvicorn
     uvicorn.run(
         "store_bot.main:app",
         host=store_settings.host,
         port=store_settings.port,
-        reload=store_settings.debug
+        loop="uvloop",
+        http="httptools",
+        # 自動リロードは開発環境のみ
+        reload=store_settings.is_development
     ) 
\ No newline at end of file
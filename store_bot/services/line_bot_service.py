@@ -1,5 +1,5 @@
 import logging
-from linebot import LineBotApi, WebhookHandler
+from functools import lru_cache
 from linebot.exceptions import InvalidSignatureError
 from linebot.models import (
     TextSendMessage,
@@ -8,47 +8,53 @@ from linebot.models import (
     PostbackAction
 )
 
-from store_bot.config import store_settings
+from store_bot.config import get_store_settings
+from shared.services.line_http_client import create_line_bot_api
+from shared.services.line_webhook_parser import create_webhook_parser
 
 logger = logging.getLogger(__name__)
 
 
 class StoreLineBotService:
     def __init__(self):
-        self.line_bot_api = LineBotApi(store_settings.store_line_channel_access_token)
-        self.handler = WebhookHandler(store_settings.store_line_channel_secret)
+        store_settings = get_store_settings()
+        self.line_bot_api = create_line_bot_api(store_settings.store_line_channel_access_token)
+        # 署名検証・イベント解析は初期化済みHMACとorjsonを使うパーサーで行う
+        self.parser = create_webhook_parser(store_settings.store_line_channel_secret)
         logger.info("Store Line Bot service initialized")
 
     def send_message(self, user_id: str, message: TextSendMessage):
         """メッセージを送信"""
         try:
             self.line_bot_api.push_message(user_id, message)
-            logger.info(f"Message sent to store user: {user_id}")
+            logger.info("Message sent to store user: %s", user_id)
             return True
         except Exception as e:
-            logger.error(f"Failed to send message to store user {user_id}: {e}")
+            logger.error("Failed to send message to store user %s: %s", user_id, e)
             return False
 
     def send_template_message(self, user_id: str, template: TemplateSendMessage):
         """テンプレートメッセージを送信"""
         try:
             self.line_bot_api.push_message(user_id, template)
-            logger.info(f"Template message sent to store user: {user_id}")
+            logger.info("Template message sent to store user: %s", user_id)
             return True
         except Exception as e:
-            logger.error(f"Failed to send template message to store user {user_id}: {e}")
+            logger.error("Failed to send template message to store user %s: %s", user_id, e)
             return False
 
     def reply_message(self, reply_token: str, message):
         """リプライメッセージを送信"""
         try:
             self.line_bot_api.reply_message(reply_token, message)
-            logger.info(f"Reply message sent to store user")
+            logger.info("Reply message sent to store user")
             return True
         except Exception as e:
-            logger.error(f"Failed to send reply message: {e}")
+            logger.error("Failed to send reply message: %s", e)
             return False
 
 
-# グローバルインスタンス
-store_line_bot_service = StoreLineBotService() 
\ No newline at end of file
+@lru_cache(maxsize=1)
+def get_store_line_bot_service() -> StoreLineBotService:
+    """StoreLineBotServiceを初回呼び出し時に一度だけ生成して使い回す"""
+    return StoreLineBotService()
@@ -1,127 +1,177 @@
 import logging
+import secrets
+import threading
+from functools import lru_cache
 from typing import Dict, Any, List, Optional
 from datetime import datetime, date
-from shared.services.google_sheets_service import GoogleSheetsService
+from cachetools import TTLCache
+from shared.services.background_worker import BatchWorker
+from shared.services.google_sheets_service import get_google_sheets_service
+from shared.services.line_http_client import submit_line_call
 from shared.models.schedule import Schedule, TimeSlot, ShiftRequest
 from shared.models.user import Store
+from shared.utils.clock import today_date
 
 logger = logging.getLogger(__name__)
 
+# 依頼状況の取得結果を使い回す秒数と最大件数（画面から同じ依頼を繰り返し確認されてもシートを読み直さない）
+REQUEST_STATUS_CACHE_TTL = 5
+REQUEST_STATUS_CACHE_SIZE = 1024
+# シフト依頼をまとめて記録するまでの待ち時間（秒）と1回に記録する最大件数（続けて届いた依頼を1回のappendにまとめる）
+SHIFT_REQUEST_FLUSH_INTERVAL = 0.05
+SHIFT_REQUEST_BATCH_SIZE = 50
+# 応募の確定をまとめて記録するまでの待ち時間（秒）と1回に記録する最大件数
+APPLICATION_STATUS_FLUSH_INTERVAL = 0.2
+APPLICATION_STATUS_BATCH_SIZE = 100
+
 
 class StoreScheduleService:
     def __init__(self):
-        self.google_sheets_service = GoogleSheetsService()
+        self.google_sheets_service = get_google_sheets_service()
+        # 依頼ID → 依頼状況（確定時に該当する依頼の分を破棄する）
+        self._status_cache: "TTLCache[str, Dict[str, Any]]" = TTLCache(
+            maxsize=REQUEST_STATUS_CACHE_SIZE, ttl=REQUEST_STATUS_CACHE_TTL
+        )
+        self._status_lock = threading.Lock()
+        # シフト依頼の記録（作成時はキューに積むだけで、書き込みはバックグラウンドで行う）
+        self.shift_request_batcher = BatchWorker(
+            "store-shift-requests",
+            self.google_sheets_service.record_shift_requests,
+            max_batch_size=SHIFT_REQUEST_BATCH_SIZE,
+            flush_interval=SHIFT_REQUEST_FLUSH_INTERVAL
+        )
+        # 応募の確定の記録（確定の返信をGoogle Sheetsへの書き込みの完了まで待たせない）
+        self.application_status_batcher = BatchWorker(
+            "store-application-statuses",
+            self.google_sheets_service.update_application_statuses,
+            max_batch_size=APPLICATION_STATUS_BATCH_SIZE,
+            flush_interval=APPLICATION_STATUS_FLUSH_INTERVAL
+        )
         logger.info("Store schedule service initialized")
 
     def create_shift_request(self, store: Store, target_date: date, time_slot: str, 
                            required_count: int, notes: str = None) -> ShiftRequest:
-        """シフト依頼を作成"""
-        request_id = f"store_req_{store.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        """シフト依頼を作成（過去の日付の依頼はValueError、人数の範囲はShiftRequest側で検証）"""
+        if target_date < today_date():
+            raise ValueError(f"target_date must not be in the past: {target_date}")
+        now = datetime.now()
+        # 同じ店舗から同じ秒に複数の依頼が届いてもIDが重複しないよう、ランダムな接尾辞を付ける
+        request_id = f"store_req_{store.id}_{now.strftime('%Y%m%d_%H%M%S')}_{secrets.token_hex(3)}"
         
         shift_request = ShiftRequest(
             id=request_id,
             store_id=store.id,
-            store_name=store.store_name,
-            target_date=target_date,
+            date=target_date,
             time_slot=time_slot,
             required_count=required_count,
             notes=notes,
             status="pending",
-            created_at=datetime.now()
+            created_at=now,
+            updated_at=now
         )
         
-        logger.info(f"Created shift request: {request_id} for store {store.store_name}")
+        self.shift_request_batcher.add(shift_request)
+        logger.info("Created shift request: %s for store %s", request_id, store.store_name)
         return shift_request
 
     def process_shift_request(self, shift_request: ShiftRequest, store: Store) -> bool:
         """シフト依頼を処理"""
+        # 処理できない依頼はシートを読み込む前に弾く（作成後に日付が変わった場合など）
+        if shift_request.required_count <= 0 or shift_request.date < today_date():
+            logger.warning("Skipping invalid shift request %s (date=%s, required_count=%s)",
+                           shift_request.id, shift_request.date, shift_request.required_count)
+            return False
+        
+        # 空き薬剤師を検索（シートの読み込みエラーはGoogleSheetsService側で処理される）
+        available_pharmacists = self.google_sheets_service.get_available_pharmacists(
+            shift_request.date, 
+            shift_request.time_slot
+        )
+        
+        if not available_pharmacists:
+            logger.warning("No available pharmacists found for request %s", shift_request.id)
+            return False
+        
+        # 薬剤師Botへの通知は送信用スレッドプールで行い、店舗への確定の返信を通知の完了まで待たせない
+        # （実際の実装では、薬剤師BotのAPIを呼び出す）
         try:
-            # 空き薬剤師を検索
-            available_pharmacists = self.google_sheets_service.get_available_pharmacists(
-                shift_request.target_date, 
-                shift_request.time_slot
+            submit_line_call(
+                self._notify_pharmacist_bot, shift_request, available_pharmacists,
+                description=f"notify pharmacists of {shift_request.id}"
             )
-            
-            if not available_pharmacists:
-                logger.warning(f"No available pharmacists found for request {shift_request.id}")
-                return False
-            
-            # 薬剤師Botに通知を送信（実際の実装では、薬剤師BotのAPIを呼び出す）
-            notification_sent = self._notify_pharmacist_bot(shift_request, available_pharmacists)
-            
-            if notification_sent:
-                logger.info(f"Shift request {shift_request.id} processed successfully")
-                return True
-            else:
-                logger.error(f"Failed to process shift request {shift_request.id}")
-                return False
-                
-        except Exception as e:
-            logger.error(f"Error processing shift request: {e}")
+        except RuntimeError as e:
+            # 終了処理で送信用スレッドプールが停止している場合
+            logger.error("Error processing shift request: %s", e)
             return False
+        logger.info("Shift request %s processed successfully", shift_request.id)
+        return True
 
     def _notify_pharmacist_bot(self, shift_request: ShiftRequest, 
                               available_pharmacists: List[Dict[str, Any]]) -> bool:
-        """薬剤師Botに通知を送信"""
-        try:
-            # 実際の実装では、薬剤師BotのAPIエンドポイントを呼び出す
-            # ここでは簡易的にログ出力のみ
-            pharmacist_names = [p["name"] for p in available_pharmacists]
-            logger.info(f"Notifying pharmacist bot for request {shift_request.id}")
-            logger.info(f"Available pharmacists: {pharmacist_names}")
-            
-            # TODO: 薬剤師BotのAPIを呼び出して通知を送信
-            # pharmacist_bot_api.notify_pharmacists(shift_request, available_pharmacists)
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error notifying pharmacist bot: {e}")
-            return False
+        """薬剤師Botに通知を送信（例外は送信用スレッドプールの完了時にログ出力される）"""
+        # 実際の実装では、薬剤師BotのAPIエンドポイントを呼び出す
+        # ここでは簡易的にログ出力のみ
+        # 依頼IDと通知先を1件のログにまとめる（名前の連結は薬剤師数に比例するため、INFOが出力されるときだけ行う）
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Notifying pharmacist bot for request %s, available pharmacists: %s",
+                shift_request.id, ", ".join(p["name"] for p in available_pharmacists)
+            )
+        
+        # TODO: 薬剤師BotのAPIを呼び出して通知を送信
+        # pharmacist_bot_api.notify_pharmacists(shift_request, available_pharmacists)
+        
+        return True
 
     def get_request_status(self, request_id: str) -> Optional[Dict[str, Any]]:
-        """依頼状況を取得"""
-        try:
-            # Google Sheetsから応募状況を取得
-            # 実際の実装では、応募記録シートから該当依頼の状況を取得
-            logger.info(f"Getting status for request: {request_id}")
-            
-            # モックデータ
-            status_data = {
-                "request_id": request_id,
-                "status": "pending",
-                "applications": 0,
-                "confirmed": 0,
-                "created_at": datetime.now().isoformat()
-            }
-            
-            return status_data
-            
-        except Exception as e:
-            logger.error(f"Error getting request status: {e}")
-            return None
+        """依頼状況を取得（短時間キャッシュし、呼び出し元にはコピーを返す）"""
+        with self._status_lock:
+            cached = self._status_cache.get(request_id)
+        if cached is not None:
+            return dict(cached)
+        status_data = self._read_request_status(request_id)
+        with self._status_lock:
+            self._status_cache[request_id] = status_data
+        return dict(status_data)
+
+    def _read_request_status(self, request_id: str) -> Dict[str, Any]:
+        """依頼状況を読み込む"""
+        # Google Sheetsから応募状況を取得
+        # 実際の実装では、応募記録シートから該当依頼の状況を取得
+        logger.info("Getting status for request: %s", request_id)
+        
+        # モックデータ
+        return {
+            "request_id": request_id,
+            "status": "pending",
+            "applications": 0,
+            "confirmed": 0,
+            "created_at": datetime.now().isoformat()
+        }
 
     def confirm_application(self, request_id: str, pharmacist_id: str) -> bool:
         """応募を確定"""
-        try:
-            # Google Sheetsに確定情報を記録
-            success = self.google_sheets_service.update_application_status(
-                request_id, 
-                "薬剤師名",  # 実際は薬剤師名を取得
-                "confirmed"
-            )
-            
-            if success:
-                logger.info(f"Application confirmed for request {request_id}, pharmacist {pharmacist_id}")
-                return True
-            else:
-                logger.error(f"Failed to confirm application for request {request_id}")
-                return False
-                
-        except Exception as e:
-            logger.error(f"Error confirming application: {e}")
-            return False
+        return self.confirm_applications(request_id, [pharmacist_id])
+
+    def confirm_applications(self, request_id: str, pharmacist_ids: List[str]) -> bool:
+        """複数の応募をまとめて確定
+
+        Google Sheetsへの記録はバックグラウンドで行い、続けて確定された分と1回の呼び出しにまとめる
+        （書き込みエラーはGoogleSheetsService側で処理される）。
+        """
+        for _ in pharmacist_ids:
+            self.application_status_batcher.add({
+                "request_id": request_id,
+                "pharmacist_name": "薬剤師名",  # 実際は薬剤師名を取得
+                "status": "confirmed",
+            })
+        with self._status_lock:
+            self._status_cache.pop(request_id, None)
+        logger.info("Application confirmed for request %s, pharmacists %s", request_id, pharmacist_ids)
+        return True
 
 
-# グローバルインスタンス
-store_schedule_service = StoreScheduleService() 
\ No newline at end of file
+@lru_cache(maxsize=1)
+def get_store_schedule_service() -> StoreScheduleService:
+    """StoreScheduleServiceを初回呼び出し時に一度だけ生成して使い回す（Google Sheetsサービスは全Botで共有）"""
+    return StoreScheduleService()
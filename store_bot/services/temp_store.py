@@ -0,0 +1,129 @@
+import logging
+import threading
+from functools import lru_cache
+from datetime import date
+from typing import Any, Dict, Optional
+import orjson
+import redis
+from cachetools import TTLCache
+
+from store_bot.config import get_store_settings
+
+logger = logging.getLogger(__name__)
+
+# 入力途中の依頼内容を保持する秒数と最大ユーザー数（放置されたフローは自動で破棄）
+STORE_TEMP_TTL = 1800
+STORE_TEMP_MAXSIZE = 10_000
+# 起動時にRedisへ接続できるか確認する際のタイムアウト（秒）
+REDIS_CONNECT_TIMEOUT = 1
+# 接続後の各コマンドのタイムアウト（秒）。Redisが応答しなくなってもWebhook処理を止めない
+REDIS_SOCKET_TIMEOUT = 1
+
+
+class StoreTempStore:
+    """店舗ユーザーが入力途中の依頼内容をuser_idごとに保持するサービス
+
+    単一プロセス用のメモリ上の保存先（複数ワーカーではRedisStoreTempStoreを使用）。
+    Webhookはスレッドプールで処理されるためロックで保護する。
+    """
+
+    def __init__(self, ttl_seconds: int = STORE_TEMP_TTL, maxsize: int = STORE_TEMP_MAXSIZE):
+        self.ttl_seconds = ttl_seconds
+        self._entries: "TTLCache[str, Dict[str, Any]]" = TTLCache(maxsize=maxsize, ttl=ttl_seconds)
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> Dict[str, Any]:
+        """入力途中の依頼内容を取得（なければ空のdict）"""
+        with self._lock:
+            return dict(self._entries.get(user_id, {}))
+
+    def update(self, user_id: str, **fields: Any) -> Dict[str, Any]:
+        """入力内容を追記して有効期限を延長し、追記後の依頼内容を返す"""
+        with self._lock:
+            entry = {**self._entries.get(user_id, {}), **fields}
+            self._entries[user_id] = entry
+            return dict(entry)
+
+    def pop(self, user_id: str) -> Dict[str, Any]:
+        """依頼内容を取り出して破棄（同じ依頼を二重に処理しないため一度だけ取り出せる）"""
+        with self._lock:
+            return self._entries.pop(user_id, {})
+
+    def clear(self, user_id: str):
+        """入力途中の依頼内容を破棄"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+class RedisStoreTempStore(StoreTempStore):
+    """入力途中の依頼内容をRedisに保存し、複数ワーカー間で共有するStoreTempStore
+
+    依頼内容は store_temp:{user_id} のハッシュ（値はJSON）に保存し、更新のたびに有効期限を延長する。
+    """
+
+    def __init__(self, redis_client: "redis.Redis", ttl_seconds: int = STORE_TEMP_TTL):
+        super().__init__(ttl_seconds)
+        self.redis_client = redis_client
+
+    @staticmethod
+    def _key(user_id: str) -> str:
+        return f"store_temp:{user_id}"
+
+    @staticmethod
+    def _decode(raw: Dict[bytes, bytes]) -> Dict[str, Any]:
+        entry = {k.decode(): orjson.loads(v) for k, v in raw.items()}
+        # 日付はISO形式の文字列で保存されるため、読み出し時にdateへ戻す
+        if isinstance(entry.get("date"), str):
+            try:
+                entry["date"] = date.fromisoformat(entry["date"])
+            except ValueError:
+                pass
+        return entry
+
+    def get(self, user_id: str) -> Dict[str, Any]:
+        """入力途中の依頼内容を取得（なければ空のdict）"""
+        return self._decode(self.redis_client.hgetall(self._key(user_id)))
+
+    def update(self, user_id: str, **fields: Any) -> Dict[str, Any]:
+        """入力内容を追記して有効期限を延長し、追記後の依頼内容を返す"""
+        key = self._key(user_id)
+        pipe = self.redis_client.pipeline()
+        pipe.hset(key, mapping={k: orjson.dumps(v, default=str) for k, v in fields.items()})
+        pipe.expire(key, self.ttl_seconds)
+        pipe.hgetall(key)
+        return self._decode(pipe.execute()[-1])
+
+    def pop(self, user_id: str) -> Dict[str, Any]:
+        """依頼内容を取り出して破棄（同じ依頼を二重に処理しないため一度だけ取り出せる）"""
+        key = self._key(user_id)
+        pipe = self.redis_client.pipeline()
+        pipe.hgetall(key)
+        pipe.delete(key)
+        return self._decode(pipe.execute()[0])
+
+    def clear(self, user_id: str):
+        """入力途中の依頼内容を破棄"""
+        self.redis_client.delete(self._key(user_id))
+
+
+def create_store_temp_store(redis_url: Optional[str] = None) -> StoreTempStore:
+    """Redisに接続できればRedisStoreTempStore、できなければメモリ上のStoreTempStoreを作成"""
+    if redis_url:
+        try:
+            client = redis.from_url(
+                redis_url,
+                socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+                socket_timeout=REDIS_SOCKET_TIMEOUT,
+            )
+            client.ping()
+            logger.info("Store temp data backed by Redis")
+            return RedisStoreTempStore(client)
+        except Exception as e:
+            logger.warning("Redis not available, keeping store temp data in memory: %s", e)
+    return StoreTempStore()
+
+
+@lru_cache(maxsize=1)
+def get_store_temp_store() -> StoreTempStore:
+    """StoreTempStoreを初回呼び出し時に一度だけ生成して使い回す（Redisへの接続確認もこのときに行う）"""
+    return create_store_temp_store(get_store_settings().redis_url)
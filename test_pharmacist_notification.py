@@ -17,16 +17,18 @@ def test_pharmacist_notification():
     print("🧪 薬剤師Bot通知機能テスト開始")
     
     # 設定の確認
+    pharmacist_token = settings.pharmacist_line_channel_access_token
+    pharmacist_secret = settings.pharmacist_line_channel_secret
     print(f"\n📋 設定確認:")
-    print(f"薬剤師Botアクセストークン: {'設定済み' if settings.pharmacist_line_channel_access_token else '未設定'}")
-    print(f"薬剤師Botシークレット: {'設定済み' if settings.pharmacist_line_channel_secret else '未設定'}")
+    print(f"薬剤師Botアクセストークン: {'設定済み' if pharmacist_token else '未設定'}")
+    print(f"薬剤師Botシークレット: {'設定済み' if pharmacist_secret else '未設定'}")
     
-    if not settings.pharmacist_line_channel_access_token:
+    if not pharmacist_token:
         print("❌ 薬剤師Botのアクセストークンが設定されていません")
         print("   .envファイルにPHARMACIST_LINE_CHANNEL_ACCESS_TOKENを設定してください")
         return False
     
-    if not settings.pharmacist_line_channel_secret:
+    if not pharmacist_secret:
         print("❌ 薬剤師Botのシークレットが設定されていません")
         print("   .envファイルにPHARMACIST_LINE_CHANNEL_SECRETを設定してください")
         return False